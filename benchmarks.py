@@ -0,0 +1,1163 @@
+"""
+⏱️ VIRALCRYPTOINSIGHTS - BENCHMARKS
+Local stub servers with injected latency (see harness.py) - no network, no Telegram
+--------------------------------------------------------------------
+Usage: python benchmarks.py [benchmark ...]
+"""
+
+import sys
+import time
+import json
+import random
+import resource
+import subprocess
+import tempfile
+import threading
+import os
+import gzip
+import heapq
+import contextlib
+from datetime import datetime
+
+import bot
+from harness import (StubServer, StubWebSocketServer, FakeUpstreams, Faults,
+                     coingecko_fixture, binance_fixture, paprika_fixture, paprika_large_fixture,
+                     telegram_fixture, telegram_flaky_fixture, failing, fgi_fixture,
+                     cryptopanic_fixture, point_price_apis, point_all_apis)
+
+# ============================================================================
+# BENCHMARKS
+# ============================================================================
+def bench_hedged_prices():
+    """Worst-case price fetch: slow failing CoinGecko, slow Binance, fast Paprika"""
+    stub = StubServer()
+    stub.route("/simple/price", failing, latency=2.0)
+    stub.route("/ticker/24hr", binance_fixture, latency=0.3)
+    stub.route("/tickers", paprika_fixture, latency=0.1)
+    point_price_apis(stub)
+
+    for mode in ("sequential", "hedged"):
+        bot.ProductionConfig.PRICE_FETCH_MODE = mode
+        bot.RealTimeAPIs.cache.clear()
+        start = time.perf_counter()
+        prices = bot.RealTimeAPIs.get_crypto_prices()
+        elapsed = time.perf_counter() - start
+        print(f"RESULT hedged_prices mode={mode} seconds={elapsed:.3f} coins={len(prices)}")
+
+    stub.close()
+
+def install_universe(coins):
+    """Swap in a coin universe index; returns the previous one"""
+    with bot.CoinUniverse._lock:
+        previous, bot.CoinUniverse._index = bot.CoinUniverse._index, bot.CoinUniverse.index(coins, "bench")
+    return previous
+
+def bench_binance_batch():
+    """Binance adapter issues one request per BATCH_LIMITS pairs, whatever the symbol count"""
+    stub = StubServer()
+    stub.route("/ticker/24hr", binance_fixture, latency=0.05)
+    point_price_apis(stub)
+
+    for count in (6, 24, 96, 300):
+        previous = install_universe([bot.CoinUniverse.entry(f"C{i}", f"Coin {i}", None, f"C{i}USDT", None)
+                                     for i in range(count)])
+        stub.requests.clear()
+        start = time.perf_counter()
+        prices = bot.RealTimeAPIs.get_binance_prices()
+        elapsed = time.perf_counter() - start
+        print(f"RESULT binance_batch symbols={count} requests={len(stub.requests)} seconds={elapsed:.3f}")
+        install_universe(previous["coins"] if previous else bot.CoinUniverse.defaults())
+    stub.close()
+
+def bench_coin_universe():
+    """Index build vs. cached load, and requests per provider as the universe grows"""
+    with tempfile.TemporaryDirectory() as tmp:
+        for extra in (0, 92, 292, 992):
+            fakes = FakeUpstreams(extra_coins=extra, latency={name: 0.01 for name in FakeUpstreams.PREFIXES})
+            fakes.apply()
+            bot.ProductionConfig.COIN_UNIVERSE = f"top:{extra + 8}"
+            bot.ProductionConfig.COIN_INDEX_PATH = os.path.join(tmp, f"coin_index_{extra}.json")
+            bot.ProductionConfig.HISTORY_DIR = os.path.join(tmp, "history")
+            timings = {}
+            for phase in ("build", "cached"):
+                bot.CoinUniverse.reset()
+                fakes.stub.requests.clear()
+                start = time.perf_counter()
+                coins = bot.CoinUniverse.coins()
+                timings[phase] = (time.perf_counter() - start, len(fakes.stub.requests))
+            mapped = sum(1 for c in coins if c["coingecko"] and c["binance"] and c["paprika"])
+            print(f"RESULT coin_universe coins={len(coins)} fully_mapped={mapped} "
+                  f"build_ms={timings['build'][0] * 1e3:.0f} build_requests={timings['build'][1]} "
+                  f"cached_ms={timings['cached'][0] * 1e3:.1f} cached_requests={timings['cached'][1]}")
+
+            for name, fetch in (("coingecko", bot.RealTimeAPIs.get_coingecko_prices),
+                                ("binance", bot.RealTimeAPIs.get_binance_prices),
+                                ("coinpaprika", bot.RealTimeAPIs.get_coinpaprika_prices)):
+                fakes.stub.requests.clear()
+                start = time.perf_counter()
+                prices = fetch()
+                elapsed = time.perf_counter() - start
+                print(f"RESULT coin_universe coins={len(coins)} provider={name} priced={len(prices or {})} "
+                      f"requests={len(fakes.stub.requests)} ms={elapsed * 1e3:.0f}")
+            fakes.close()
+    bot.ProductionConfig.COIN_UNIVERSE = ""
+    bot.CoinUniverse.reset()
+
+def bench_price_consensus():
+    """Fetch-and-combine time with an outlier provider, and combine cost per symbol"""
+    now = time.time()
+
+    # End to end: Paprika is 10% off on BTC
+    with tempfile.TemporaryDirectory() as tmp:
+        bot.ProductionConfig.HISTORY_DIR = tmp
+        bot.ProductionConfig.PRICE_FETCH_MODE = "consensus"
+        fakes = FakeUpstreams()
+        fakes.apply()
+        fakes.market.skews[("coinpaprika", "BTC")] = 1.10
+        bot.RealTimeAPIs.cache.clear()
+        start = time.perf_counter()
+        prices = bot.RealTimeAPIs.get_crypto_prices()
+        elapsed = time.perf_counter() - start
+        truth = fakes.market.quotes()["BTC"][0]
+        error = abs(prices["BTC"]["price"] / truth - 1) * 100
+        post = bot.ContentGenerator.market_open()
+        print(f"RESULT price_consensus e2e=outlier seconds={elapsed:.3f} coins={len(prices)} "
+              f"btc_error_pct={error:.4f} footer={post.strip().splitlines()[-1]!r}")
+        fakes.close()
+
+    # Cost: three providers quoting every coin
+    for symbols in (100, 300, 1000):
+        quotes = {provider: {f"C{i}": {"price": 100.0 + i + skew, "change": 1.0, "volume_24h": 1e6,
+                                       "updated": now} for i in range(symbols)}
+                  for provider, skew in (("CoinGecko", 0.0), ("Binance", 0.05), ("CoinPaprika", 9.0))}
+        runs = max(1, 30000 // symbols)
+        start = time.perf_counter()
+        for _ in range(runs):
+            prices, flags = bot.PriceConsensus.combine(quotes, now=now)
+        per_symbol = (time.perf_counter() - start) / runs / symbols
+        print(f"RESULT price_consensus symbols={symbols} providers=3 us_per_symbol={per_symbol * 1e6:.2f} "
+              f"outliers={len(flags['CoinPaprika']['outlier'])}")
+
+def bench_connection_reuse():
+    """Connections opened: fresh requests.get per call vs. the shared pool"""
+    import requests
+
+    stub = StubServer()
+    stub.route("/fng/", fgi_fixture)
+    stub.route("/posts/", cryptopanic_fixture)
+    point_all_apis(stub)
+    rounds = 50
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        requests.get(f"{stub.url}/fng/", timeout=5)
+        requests.get(f"{stub.url}/posts/", timeout=5)
+    elapsed = time.perf_counter() - start
+    print(f"RESULT connection_reuse mode=requests.get requests={rounds * 2} "
+          f"connections={stub.connections} seconds={elapsed:.3f}")
+
+    stub.connections = 0
+    bot.HttpTransport.reset()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        bot.RealTimeAPIs.fetch_market_sentiment()
+        bot.RealTimeAPIs.fetch_crypto_news()
+    elapsed = time.perf_counter() - start
+    stats = bot.HttpTransport.connection_stats()
+    print(f"RESULT connection_reuse mode=transport requests={stats['requests']} "
+          f"connections={stub.connections} opened={stats['connections_opened']} "
+          f"reused={stats['connections_reused']} seconds={elapsed:.3f}")
+
+    stub.close()
+
+def paprika_child(mode, url):
+    """Runs in a fresh process so peak RSS reflects a single parse path"""
+    import requests
+
+    start = time.perf_counter()
+    if mode == "full":
+        prices = {}
+        for coin in requests.get(f"{url}/tickers", timeout=30).json():
+            if coin["symbol"] in {"BTC", "ETH", "SOL", "BNB"}:
+                prices[coin["symbol"]] = coin["quotes"]["USD"]["price"]
+    else:
+        bot.ProductionConfig.COINPAPRIKA_API = url
+        prices = bot.RealTimeAPIs.get_coinpaprika_prices()
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"seconds": elapsed, "peak_rss_kb": peak_rss_kb(), "coins": len(prices)}))
+
+def peak_rss_kb():
+    """High-water RSS of this process (VmHWM resets on exec, ru_maxrss does not)"""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def current_rss_kb():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * resource.getpagesize() // 1024
+
+def bench_paprika_stream():
+    """Peak RSS and wall time: full response.json() vs. streamed filter"""
+    stub = StubServer()
+    for coins in (2500, 10000, 40000):
+        payload = paprika_large_fixture(coins)
+        stub.route("/tickers", lambda query, body=payload: (200, body))
+        for mode in ("full", "stream"):
+            out = subprocess.run(
+                [sys.executable, __file__, "--paprika-child", mode, stub.url],
+                capture_output=True, text=True, check=True
+            ).stdout.strip().splitlines()[-1]
+            result = json.loads(out)
+            print(f"RESULT paprika_stream coins={coins} payload_mb={len(payload) / 1e6:.1f} "
+                  f"mode={mode} seconds={result['seconds']:.3f} peak_rss_mb={result['peak_rss_kb'] / 1024:.1f}")
+    stub.close()
+
+def write_kline_dump(path, rows, start=1_600_000_000_000, seed=9):
+    """Header-less Binance-style 1m kline CSV (gzip when path ends in .gz)"""
+    rng = random.Random(seed)
+    opener = (lambda p: gzip.open(p, "wt", compresslevel=1)) if path.endswith(".gz") else (lambda p: open(p, "w"))
+    price = 30000.0
+    with opener(path) as f:
+        for block in range(0, rows, 10000):
+            lines = []
+            for i in range(block, min(block + 10000, rows)):
+                price *= 1 + rng.gauss(0, 0.001)
+                t = start + i * 60000
+                lines.append(f"{t},{price:.2f},{price * 1.001:.2f},{price * 0.999:.2f},{price:.2f},"
+                             f"{rng.random() * 50:.4f},{t + 59999},0,0,0,0,0\n")
+            f.write("".join(lines))
+
+def write_symbol_dump(path, rows, symbols=("BTCUSDT", "ETHUSDT", "SOLUSDT")):
+    """Headered multi-symbol CSV with ISO dates, one row per symbol per minute"""
+    with open(path, "w") as f:
+        f.write("date,symbol,open,high,low,close,volume\n")
+        for i in range(rows // len(symbols)):
+            stamp = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(1_600_000_000 + i * 60))
+            f.write("".join(f"{stamp},{s},1,1,1,{100 + i % 50},{i % 7}\n" for s in symbols))
+
+def backfill_child(path, capacity):
+    """Runs in a fresh process so peak RSS covers one import"""
+    baseline = peak_rss_kb()
+    with tempfile.TemporaryDirectory() as tmp:
+        bot.ProductionConfig.HISTORY_DIR = tmp
+        stats = bot.HistoryImporter.run(path, capacity=int(capacity) or None)
+        for ring in bot.PriceHistory._rings.values():
+            ring.close()
+    print(json.dumps({"rows": stats["rows"], "imported": stats["imported"], "seconds": stats["seconds"],
+                      "baseline_rss_kb": baseline, "peak_rss_kb": peak_rss_kb()}))
+
+def bench_backfill():
+    """Rows/s and peak RSS importing OHLCV dumps (BACKFILL_ROWS, default 5M) in a child process"""
+    rows = int(os.getenv("BACKFILL_ROWS", "5000000"))
+    with tempfile.TemporaryDirectory() as tmp:
+        kline = os.path.join(tmp, "BTCUSDT-1m.csv.gz")
+        plain = os.path.join(tmp, "BTCUSDT-1m.csv")
+        mixed = os.path.join(tmp, "mixed-iso.csv")
+        started = time.perf_counter()
+        write_kline_dump(kline, rows)
+        write_kline_dump(plain, rows)
+        write_symbol_dump(mixed, rows // 5)
+        print(f"RESULT backfill fixtures rows={rows} gz_mb={os.path.getsize(kline) / 1e6:.0f} "
+              f"csv_mb={os.path.getsize(plain) / 1e6:.0f} written_s={time.perf_counter() - started:.0f}")
+
+        for label, path, count, capacity in (("csv.gz", kline, rows, 0), ("csv", plain, rows, 0),
+                                             ("csv", plain, rows, rows), ("iso-multi", mixed, rows // 5, 0)):
+            out = subprocess.run([sys.executable, __file__, "--backfill-child", path, str(capacity)],
+                                 capture_output=True, text=True, check=True).stdout.strip().splitlines()[-1]
+            result = json.loads(out)
+            print(f"RESULT backfill format={label} rows={result['rows']} capacity={capacity or 'default'} "
+                  f"seconds={result['seconds']:.1f} rows_per_s={result['rows'] / result['seconds']:,.0f} "
+                  f"peak_rss_mb={result['peak_rss_kb'] / 1024:.0f} "
+                  f"import_rss_mb={(result['peak_rss_kb'] - result['baseline_rss_kb']) / 1024:.0f}")
+
+def bench_single_flight():
+    """A burst of concurrent callers makes one upstream request per key"""
+    stub = StubServer()
+    stub.route("/simple/price", coingecko_fixture, latency=0.2)
+    stub.route("/ticker/24hr", binance_fixture, latency=0.2)
+    stub.route("/tickers", paprika_fixture, latency=0.2)
+    stub.route("/posts/", cryptopanic_fixture, latency=0.2)
+    point_all_apis(stub)
+    callers = 32
+
+    for name, getter in (("crypto_news", bot.RealTimeAPIs.get_news_feed),
+                         ("crypto_prices", bot.RealTimeAPIs.get_crypto_prices)):
+        bot.RealTimeAPIs.cache.clear()
+        stub.requests.clear()
+        barrier = threading.Barrier(callers)
+        results = []
+
+        def call():
+            barrier.wait()
+            results.append(getter())
+
+        threads = [threading.Thread(target=call) for _ in range(callers)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        print(f"RESULT single_flight key={name} callers={callers} "
+              f"upstream_requests={len(stub.requests)} seconds={elapsed:.3f}")
+
+    stub.close()
+
+def bench_fanout():
+    """One post to many channels through the outbox and a fake Bot API, within rate limits"""
+    stub = StubServer()
+    stub.route("/botTEST/sendMessage", telegram_fixture, latency=0.05)
+    bot.ProductionConfig.TELEGRAM_API = stub.url
+    bot.ProductionConfig.BOT_TOKEN = "TEST"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in (1, 10, 60):
+            channels = [{"chat_id": f"-100{i}", "label": f"ch{i}"} for i in range(count)]
+            bot.FanOutDispatcher.global_bucket = bot.TokenBucket(bot.ProductionConfig.TELEGRAM_GLOBAL_RATE)
+            bot.FanOutDispatcher.chat_buckets.clear()
+            queue = bot.OutboundQueue(os.path.join(tmp, f"outbox_{count}.db"))
+            queue.enqueue("Fan-out benchmark", "news", channels)
+            stub.requests.clear()
+            start = time.perf_counter()
+            while queue.drain_once():
+                pass
+            elapsed = time.perf_counter() - start
+            stats = queue.delivery_stats()
+            print(f"RESULT fanout channels={count} seconds={elapsed:.3f} requests={len(stub.requests)} "
+                  f"p50={stats['latency_p50']:.3f} p99={stats['latency_p99']:.3f} failures={stats['dead']}")
+
+    stub.close()
+
+def bench_outbox():
+    """Drain throughput and delivery latency with a fake server injecting 429s"""
+    stub = StubServer()
+    stub.route("/botTEST/sendMessage", telegram_flaky_fixture(every=3), latency=0.02)
+    bot.ProductionConfig.TELEGRAM_API = stub.url
+    bot.ProductionConfig.BOT_TOKEN = "TEST"
+    bot.FanOutDispatcher.chat_buckets.clear()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = bot.OutboundQueue(os.path.join(tmp, "outbox.db"))
+        channels = [{"chat_id": f"-100{i}", "label": f"ch{i}"} for i in range(50)]
+        messages = 2
+
+        start = time.perf_counter()
+        for n in range(messages):
+            queue.enqueue(f"Outbox benchmark post {n}", "news", channels)
+        queue.enqueue("Outbox benchmark post 0", "news", channels)  # all duplicates
+        queue.start_worker()
+        while queue.delivery_stats()["pending"]:
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - start
+        queue.stop_worker()
+
+        stats = queue.delivery_stats()
+        print(f"RESULT outbox messages={stats['sent']} http_requests={len(stub.requests)} "
+              f"retried={stats['retried']} seconds={elapsed:.3f} "
+              f"msgs_per_sec={stats['sent'] / elapsed:.1f} "
+              f"latency_p50={stats['latency_p50']} latency_p99={stats['latency_p99']}")
+
+        # Restart: pending rows written by one process are delivered by the next
+        queue.enqueue("Survives restart", "news", channels[:3])
+        queue = bot.OutboundQueue(queue.path)
+        queue.start_worker()
+        while queue.delivery_stats()["pending"]:
+            time.sleep(0.05)
+        queue.stop_worker()
+        print(f"RESULT outbox restart_delivered={queue.delivery_stats()['sent']}")
+
+    stub.close()
+
+def bench_prerender():
+    """Trigger-to-delivery per slot: staged ahead vs fetch-and-render at fire time"""
+    stub = StubServer()
+    for path, responder in (("/simple/price", coingecko_fixture), ("/ticker/24hr", binance_fixture),
+                            ("/tickers", paprika_fixture), ("/fng/", fgi_fixture),
+                            ("/posts/", cryptopanic_fixture)):
+        stub.route(path, responder, latency=0.4)
+    stub.route("/botTEST/sendMessage", telegram_fixture, latency=0.02)
+    point_all_apis(stub)
+    bot.ProductionConfig.TELEGRAM_API = stub.url
+    bot.ProductionConfig.BOT_TOKEN = "TEST"
+    bot.FanOutDispatcher.chat_buckets.clear()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bot.ProductionConfig.OUTBOX_PATH = os.path.join(tmp, "outbox.db")
+        bot.ProductionConfig.STATE_PATH = os.path.join(tmp, "state.json")
+        bot.ProductionConfig.SEEN_PATH = os.path.join(tmp, "seen.db")
+        bot.ProductionConfig.HISTORY_DIR = os.path.join(tmp, "history")
+        bot.OutboundQueue._default = None
+        bot.StateStore._default = None
+        outbox = bot.OutboundQueue.default()
+        outbox.start_worker()
+
+        def wait_delivered():
+            while outbox.delivery_stats()["pending"]:
+                time.sleep(0.01)
+
+        for staged in (False, True):
+            # A separate channel per pass so the outbox doesn't dedup repeated posts
+            bot.ProductionConfig.CHANNEL_ID = f"-100{int(staged)}"
+            bot.RealTimeAPIs.cache.clear()
+            for key, (func, post_type) in bot.scheduled_posts().items():
+                bot.FanOutDispatcher.chat_buckets.clear()  # slots are hours apart in production
+                if staged:
+                    bot.PostStager.stage(key, func, post_type)
+                else:
+                    # The old path: fire time pays fetch, render and the natural delay
+                    triggered = time.time()
+                    bot.TelegramPoster.send_message(func(), post_type)
+                    wait_delivered()
+                    bot.PostStager.timings.append({"slot": key, "staged": False, "triggered_at": triggered,
+                                                   "delivery_ms": (time.time() - triggered) * 1e3})
+                    continue
+                bot.PostStager.fire(key, func, post_type)
+                wait_delivered()
+                bot.RealTimeAPIs.cache.clear()  # next slot's staging fetches fresh data
+
+        report = bot.PostStager.report()
+        outbox.stop_worker()
+        for staged in (False, True):
+            rows = [r for r in report if r["staged"] == staged]
+            worst = max(rows, key=lambda r: r["delivery_ms"])
+            mean = sum(r["delivery_ms"] for r in rows) / len(rows)
+            print(f"RESULT prerender staged={staged} slots={len(rows)} mean_delivery_ms={mean:.0f} "
+                  f"worst_delivery_ms={worst['delivery_ms']:.0f} ({worst['slot']})")
+        for row in report:
+            if row["staged"]:
+                print(f"RESULT prerender slot={row['slot']} fetch_ms={row['fetch_ms']:.0f} "
+                      f"render_ms={row['render_ms']:.2f} queue_ms={row['trigger_to_queue_ms']:.2f} "
+                      f"delivery_ms={row['delivery_ms']:.0f}")
+        bot.StateStore.default().flush()
+        bot.OutboundQueue._default = None
+        bot.StateStore._default = None
+    stub.close()
+
+def bench_metrics():
+    """Instrumentation overhead per call, plus a /metrics scrape and JSON span log"""
+    runs = 200000
+    start = time.perf_counter()
+    for _ in range(runs):
+        bot.Metrics.inc("bench_total", kind="x")
+    inc_ns = (time.perf_counter() - start) / runs * 1e9
+    start = time.perf_counter()
+    for i in range(runs):
+        bot.Metrics.observe("bench_seconds", (i % 100) / 1000, kind="x")
+    observe_ns = (time.perf_counter() - start) / runs * 1e9
+    start = time.perf_counter()
+    for _ in range(runs // 4):
+        with bot.Metrics.span("bench"):
+            pass
+    span_ns = (time.perf_counter() - start) / (runs // 4) * 1e9
+    print(f"RESULT metrics inc_ns={inc_ns:.0f} observe_ns={observe_ns:.0f} span_ns={span_ns:.0f}")
+
+    stub = StubServer()
+    stub.route("/simple/price", failing)
+    stub.route("/ticker/24hr", binance_fixture, latency=0.02)
+    stub.route("/tickers", paprika_fixture, latency=0.05)
+    stub.route("/fng/", failing)
+    stub.route("/botTEST/sendMessage", telegram_flaky_fixture(every=2))
+    point_all_apis(stub)
+    bot.ProductionConfig.TELEGRAM_API = stub.url
+    bot.ProductionConfig.BOT_TOKEN = "TEST"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bot.ProductionConfig.JSON_LOG_PATH = os.path.join(tmp, "events.jsonl")
+        bot.ProductionConfig.HISTORY_DIR = os.path.join(tmp, "history")
+        bot.Metrics.reset()
+        bot.RealTimeAPIs.cache.clear()
+        bot.HttpTransport.reset()
+        for _ in range(5):
+            bot.ContentGenerator.market_open()  # sentiment always falls back
+            bot.RealTimeAPIs.cache.clear()
+        for n in range(4):
+            bot.TelegramPoster.post(f"metrics post {n}", "news", "-1001")
+
+        server = bot.MetricsServer.start(port=0)
+        text = bot.requests.get(f"http://127.0.0.1:{server.server_address[1]}/metrics", timeout=5).text
+        server.shutdown()
+        server.server_close()
+        bot.JsonLog._file.close()
+        bot.JsonLog._file = None
+        with open(bot.ProductionConfig.JSON_LOG_PATH) as f:
+            events = [json.loads(line) for line in f]
+        bot.ProductionConfig.JSON_LOG_PATH = ""
+
+    def sample(prefix):
+        return [line for line in text.splitlines() if line.startswith(prefix)]
+    print(f"RESULT metrics scrape_lines={len(text.splitlines())} "
+          f"http_histograms={len(sample('vci_http_request_seconds_count'))}")
+    for line in (sample("vci_fallback_total") + sample("vci_spans_with_fallback_total") +
+                 sample("vci_telegram_errors_total") + sample("vci_price_provider_wins_total") +
+                 sample("vci_cache_hits") + sample("vci_cache_misses")):
+        print(f"RESULT metrics {line}")
+    spans = [e for e in events if e["event"] == "span"]
+    print(f"RESULT metrics json_events={len(events)} spans={len(spans)} "
+          f"example={json.dumps(spans[0], ensure_ascii=False)}")
+    stub.close()
+
+def synthetic_headlines(count, seed=7):
+    """Headline-like titles: one or two hot entities plus long-tail words"""
+    rng = random.Random(seed)
+    entities = ("bitcoin ethereum solana xrp etf sec binance coinbase blackrock tether "
+                "dogecoin cardano").split()
+    vocabulary = [f"w{i}" for i in range(20000)]
+    weights = [1 / (rank + 1) ** 0.8 for rank in range(len(vocabulary))]
+    return [" ".join(rng.sample(entities, rng.randint(1, 2)) +
+                     rng.choices(vocabulary, weights, k=rng.randint(6, 10)))
+            for _ in range(count)]
+
+def cryptopanic_feed_fixture(count, seed=11):
+    """Recorded-shape CryptoPanic results page(s) with `count` items"""
+    rng = random.Random(seed)
+    titles = synthetic_headlines(count, seed)
+    hot = ["breaking", "hack", "sec", "etf", "approval", "crash", "record"]
+    domains = ["coindesk.com", "cointelegraph.com", "decrypt.co", "reuters.com", "u.today", "newsbtc.com"]
+    results = []
+    for i, title in enumerate(titles):
+        if rng.random() < 0.1:
+            title = f"{rng.choice(hot)} {title}"
+        results.append({
+            "id": i, "kind": "news", "title": title, "published_at": "2024-05-01T09:00:00Z",
+            "url": f"https://example.com/{i}",
+            "source": {"title": "News", "domain": rng.choice(domains)},
+            "votes": {"positive": int(rng.expovariate(1 / 12)), "important": int(rng.expovariate(1 / 4)),
+                      "negative": 0, "liked": 0, "disliked": 0, "lol": 0, "toxic": 0, "saved": 0}
+        })
+    return results
+
+def parse_feed(results):
+    return [{"id": r["id"], "title": r["title"], "source": r["source"]["title"],
+             "domain": r["source"]["domain"], "url": r["url"], "published_at": r["published_at"],
+             "votes": r["votes"]["positive"], "important": r["votes"]["important"]}
+            for r in results]
+
+def bench_news_scoring():
+    """Whole-feed scoring cost per item, including vote velocity between polls"""
+    items = parse_feed(cryptopanic_feed_fixture(50000))
+    scorer = bot.BreakingNewsScorer()
+    now = 1_700_000_000
+
+    start = time.perf_counter()
+    first = scorer.rank(items, now)
+    elapsed = time.perf_counter() - start
+    print(f"RESULT news_scoring items={len(items)} us_per_item={elapsed / len(items) * 1e6:.2f} "
+          f"candidates={len(first)}")
+
+    # Second poll 30 minutes later: a few stories pick up votes fast
+    for item in items[::500]:
+        item["votes"] += 80
+    start = time.perf_counter()
+    second = scorer.rank(items, now + 1800)
+    elapsed = time.perf_counter() - start
+    top = second[0]
+    print(f"RESULT news_scoring poll=2 us_per_item={elapsed / len(items) * 1e6:.2f} "
+          f"candidates={len(second)} top_score={top['score']} top_velocity={top['velocity']}")
+
+def simulated_news_day(seed=3):
+    """Story arrival times and BTC path for one day with a two-hour market event"""
+    rng = random.Random(seed)
+    event = (10 * 3600, 12 * 3600)
+    stories = []
+    t = 0.0
+    while t < 86400:
+        rate = 60 if event[0] <= t < event[1] else 3  # stories per hour
+        t += rng.expovariate(rate / 3600)
+        stories.append(t)
+
+    def btc_price(at):
+        # Quiet drift, then a 10% slide across the event
+        if at < event[0]:
+            return 65000 + 50 * ((at // 600) % 3)
+        if at < event[1]:
+            return 65000 * (1 - 0.10 * (at - event[0]) / (event[1] - event[0]))
+        return 58500 + 50 * ((at // 600) % 3)
+    return stories, btc_price, event
+
+def run_poll_schedule(next_interval, stories, btc_price):
+    """Walk a day of simulated clock; returns poll times"""
+    polls = []
+    now = 0.0
+    while now < 86400:
+        polls.append(now)
+        published = [i for i, at in enumerate(stories) if at <= now][-100:]
+        items = [{"id": i, "title": f"story {i}"} for i in published]
+        prices = {"BTC": {"price": btc_price(now), "change": (btc_price(now) / 65000 - 1) * 100}}
+        now += next_interval(items, prices, now)
+    return polls
+
+def detection_latency(stories, polls, window):
+    """Mean seconds from story arrival to the next poll, for stories inside window"""
+    waits = []
+    for at in stories:
+        if window[0] <= at < window[1]:
+            later = [p for p in polls if p >= at]
+            if later:
+                waits.append(later[0] - at)
+    return sum(waits) / len(waits) if waits else 0.0
+
+def bench_adaptive_poll():
+    """Simulated-clock day: fixed 30-minute polling vs the adaptive poller"""
+    stories, btc_price, event = simulated_news_day()
+    quiet = (0, event[0])
+
+    fixed = run_poll_schedule(lambda items, prices, now: bot.ProductionConfig.NEWS_CHECK_INTERVAL,
+                              stories, btc_price)
+    clock = {"now": 0.0}
+    poller = bot.AdaptivePoller(clock=lambda: clock["now"])
+
+    def adaptive(items, prices, now):
+        clock["now"] = now
+        return poller.observe(items, prices)
+    adaptive_polls = run_poll_schedule(adaptive, stories, btc_price)
+
+    for name, polls in (("fixed", fixed), ("adaptive", adaptive_polls)):
+        in_event = sum(1 for p in polls if event[0] <= p < event[1])
+        print(f"RESULT adaptive_poll schedule={name} polls={len(polls)} event_polls={in_event} "
+              f"event_latency_s={detection_latency(stories, polls, event):.0f} "
+              f"quiet_latency_s={detection_latency(stories, polls, quiet):.0f}")
+    metrics = poller.metrics()
+    event_min = min(d["interval"] for d in poller.decisions if event[0] <= d["at"] < event[1])
+    print(f"RESULT adaptive_poll decisions tightened={metrics['tightened']} relaxed={metrics['relaxed']} "
+          f"held={metrics['held']} min_interval={event_min}")
+
+    # Conditional requests: an unchanged feed answers 304 with an empty body
+    stub = StubServer()
+    feed = {"results": cryptopanic_feed_fixture(50), "next": None}
+    etag = '"feed-v1"'
+
+    def conditional_feed(query):
+        if stub.last_headers.get("If-None-Match") == etag:
+            return 304, b"", {"ETag": etag}
+        return 200, feed, {"ETag": etag}
+    stub.route("/posts/", conditional_feed)
+    bot.ProductionConfig.CRYPTOPANIC_API = stub.url
+    bot.RealTimeAPIs.cache.clear()
+    bot.HttpTransport.reset()
+    for _ in range(10):
+        items = bot.RealTimeAPIs.poll_news_feed()
+    stub.close()
+    print(f"RESULT adaptive_poll conditional polls=10 requests={len(stub.requests)} "
+          f"not_modified={bot.HttpTransport.stats.get('news_not_modified', 0)} items={len(items)}")
+
+def mini_ticker_messages(count, seed=5, start=1_700_000_000):
+    """Combined-stream miniTicker events, ~50 per second, with a 10% BTC pump halfway"""
+    rng = random.Random(seed)
+    prices = {"BTCUSDT": 65000.0, "ETHUSDT": 3500.0, "SOLUSDT": 180.0,
+              "BNBUSDT": 580.0, "XRPUSDT": 0.52, "ADAUSDT": 0.45}
+    pairs = list(prices)
+    messages = []
+    for i in range(count):
+        pair = pairs[i % len(pairs)]
+        prices[pair] *= 1 + rng.gauss(0, 0.0002)
+        if pair == "BTCUSDT" and count // 2 <= i < count // 2 + 6000:
+            prices[pair] *= 1.0001  # ~+10% over two minutes
+        messages.append(json.dumps({"stream": f"{pair.lower()}@miniTicker", "data": {
+            "e": "24hrMiniTicker", "E": int((start + i / 50) * 1000), "s": pair,
+            "c": f"{prices[pair]:.8f}", "o": "0", "h": "0", "l": "0", "v": "0", "q": "0"}}))
+    return messages
+
+def bench_price_alerts():
+    """Tick throughput from a recorded file and a local WebSocket server"""
+    messages = mini_ticker_messages(200000)
+
+    # Engine alone
+    ticks = [tick for m in messages for tick in bot.PriceAlertStream.parse_message(m)]
+    engine = bot.PriceAlertEngine(levels={"BTC": [70000.0]})
+    start = time.perf_counter()
+    for symbol, price, ts in ticks:
+        engine.on_tick(symbol, price, ts)
+    elapsed = time.perf_counter() - start
+    print(f"RESULT price_alerts path=engine ticks={len(ticks)} ticks_per_s={len(ticks) / elapsed:,.0f}")
+
+    with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as f:
+        f.write("\n".join(messages))
+        replay_path = f.name
+    sources = [("replay", replay_path), ("websocket", None)]
+    for name, source in sources:
+        if source is None:
+            source = StubWebSocketServer(messages).url
+        engine = bot.PriceAlertEngine(levels={"BTC": [70000.0]})
+        posts = []
+        start = time.perf_counter()
+        try:
+            bot.PriceAlertStream.consume(source, engine, posts.append)
+        except ConnectionError:
+            pass  # server closed after the last frame
+        elapsed = time.perf_counter() - start
+        print(f"RESULT price_alerts path={name} ticks={engine.stats['ticks']} "
+              f"ticks_per_s={engine.stats['ticks'] / elapsed:,.0f} alerts={engine.stats['alerts']} "
+              f"suppressed={engine.stats['suppressed']}")
+    os.unlink(replay_path)
+    print(posts[0] if posts else "no alerts")
+
+def bench_price_history():
+    """Ring append rate, range-query latency and reopen-after-restart"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "BTC.ring")
+        capacity = bot.ProductionConfig.HISTORY_CAPACITY
+        ring = bot.PriceRing(path, capacity)
+        rng = random.Random(1)
+        start_ts = 1_700_000_000
+        samples = capacity * 5  # wraps around several times
+        price = 65000.0
+
+        start = time.perf_counter()
+        for i in range(samples):
+            price *= 1 + rng.gauss(0, 0.001)
+            ring.append(start_ts + i * 60, price, rng.random() * 10)
+        elapsed = time.perf_counter() - start
+        print(f"RESULT price_history appends={samples} appends_per_s={samples / elapsed:,.0f} "
+              f"file_kb={os.path.getsize(path) // 1024}")
+
+        end_ts = start_ts + (samples - 1) * 60
+        for label, span in (("1h", 3600), ("1d", 86400), ("14d", 14 * 86400)):
+            runs = 200
+            start = time.perf_counter()
+            for _ in range(runs):
+                stats = ring.stats(end_ts - span)
+            elapsed = time.perf_counter() - start
+            print(f"RESULT price_history query={label} samples={stats['samples']} "
+                  f"us_per_query={elapsed / runs * 1e6:.1f} return_pct={stats['return_pct']:+.2f}")
+
+        start = time.perf_counter()
+        for i in range(10000):
+            ring.price_at(end_ts - (i % capacity) * 60)
+        print(f"RESULT price_history query=price_at us_per_query={(time.perf_counter() - start) / 10000 * 1e6:.1f}")
+
+        latest = ring.latest()
+        ring.close()
+        reopened = bot.PriceRing(path, capacity)
+        print(f"RESULT price_history reopen count={len(reopened)} latest_matches={reopened.latest() == latest}")
+        reopened.close()
+
+def full_indicators(closes):
+    """Reference from-scratch computation over the whole series"""
+    def ema_series(values, n):
+        alpha = 2 / (n + 1)
+        out = [None] * len(values)
+        if len(values) < n:
+            return out
+        value = sum(values[:n]) / n
+        out[n - 1] = value
+        for i in range(n, len(values)):
+            value += alpha * (values[i] - value)
+            out[i] = value
+        return out
+
+    window = closes[-20:]
+    mean = sum(window) / 20
+    std = (sum((x - mean) ** 2 for x in window) / 20) ** 0.5
+
+    gains = [max(b - a, 0.0) for a, b in zip(closes, closes[1:])]
+    losses = [max(a - b, 0.0) for a, b in zip(closes, closes[1:])]
+    avg_gain, avg_loss = sum(gains[:14]) / 14, sum(losses[:14]) / 14
+    for gain, loss in zip(gains[14:], losses[14:]):
+        avg_gain = (avg_gain * 13 + gain) / 14
+        avg_loss = (avg_loss * 13 + loss) / 14
+
+    fast, slow = ema_series(closes, 12), ema_series(closes, 26)
+    line = [f - s for f, s in zip(fast, slow) if f is not None and s is not None]
+    signal = ema_series(line, 9)[-1]
+    return {
+        "sma20": mean, "ema50": ema_series(closes, 50)[-1],
+        "rsi14": 100 - 100 / (1 + avg_gain / avg_loss),
+        "macd": line[-1] - signal, "upper": mean + 2 * std
+    }
+
+def bench_indicators():
+    """Incremental update per bar vs full recomputation over a year of minute bars
+    
+    The last bar is still open in the IndicatorSet, so the reference runs over
+    the closed ones.
+    """
+    rng = random.Random(2)
+    start_ts = 1_700_000_000
+    closes = []
+    price = 40000.0
+    for _ in range(365 * 1440):
+        price *= 1 + rng.gauss(0, 0.0008)
+        closes.append(price)
+
+    indicators = bot.IndicatorSet(bar=60)
+    start = time.perf_counter()
+    for i, close in enumerate(closes):
+        indicators.update(start_ts + i * 60, close)
+    elapsed = time.perf_counter() - start
+    per_bar = elapsed / len(closes)
+    print(f"RESULT indicators path=incremental bars={len(closes)} us_per_bar={per_bar * 1e6:.2f}")
+
+    start = time.perf_counter()
+    reference = full_indicators(closes[:-1])
+    full = time.perf_counter() - start
+    print(f"RESULT indicators path=full_recompute bars={len(closes)} ms_per_update={full * 1e3:.0f} "
+          f"speedup={full / per_bar:,.0f}x")
+
+    snap = indicators.snapshot()
+    checks = {
+        "sma20": (snap["sma20"], reference["sma20"]),
+        "ema50": (snap["ema50"], reference["ema50"]),
+        "rsi14": (snap["rsi14"], reference["rsi14"]),
+        "macd_hist": (snap["macd"]["histogram"], reference["macd"]),
+        "bb_upper": (snap["bollinger"]["upper"], reference["upper"])
+    }
+    worst = max(abs(a - b) / max(abs(b), 1e-9) for a, b in checks.values())
+    print(f"RESULT indicators matches_reference={worst < 1e-6} max_rel_error={worst:.1e} "
+          f"pivots={ {k: round(v) for k, v in snap['pivots'].items()} }")
+
+def market_open_context():
+    return {
+        "coins": [{"icon": "₿", "symbol": "BTC", "price": 65123.4, "change": 1.23},
+                  {"icon": "Ξ", "symbol": "ETH", "price": 3456.7, "change": -0.45},
+                  {"icon": "◎", "symbol": "SOL", "price": 181.2, "change": 3.1}],
+        "trend": "BTC +2.1% since this morning",
+        "sentiment": {"value": 61, "sentiment": "Greed"},
+        "key_level": "$66,000 (24h high, resistance)",
+        "footer": "Live data • 3-source consensus"
+    }
+
+def fstring_market_open(ctx):
+    """The pre-template f-string version, for comparison"""
+    coins = "\n".join(f"{c['icon']} {c['symbol']}: ${c['price']:,.0f} ({c['change']:+.1f}%)" for c in ctx["coins"])
+    trend = f"\n📅 {ctx['trend']}\n" if ctx["trend"] else ""
+    return f"""📊 **REAL-TIME MARKET UPDATE**
+
+{coins}
+{trend}
+📈 Market Sentiment: {ctx['sentiment']['value']} ({ctx['sentiment']['sentiment']})
+
+Key level to watch: {ctx['key_level']}
+
+{ctx['footer']}"""
+
+def bench_templates():
+    """Compile cost, render throughput, batch render and Telegram HTML validation"""
+    # A second locale so batch rendering has something to fan out to
+    bot.PostTemplates.SOURCES["hi"] = {"market_open": bot.PostTemplates.SOURCES["en"]["market_open"]
+                                       .replace("REAL-TIME MARKET UPDATE", "लाइव मार्केट अपडेट")}
+    start = time.perf_counter()
+    count = bot.Templates.compile_all()
+    print(f"RESULT templates compiled={count} compile_ms={(time.perf_counter() - start) * 1e3:.2f}")
+
+    ctx = market_open_context()
+    runs = 20000
+    template = bot.Templates.get("market_open")
+    start = time.perf_counter()
+    for _ in range(runs):
+        template.render(ctx)
+    rendered = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(runs):
+        fstring_market_open(ctx)
+    baseline = time.perf_counter() - start
+    print(f"RESULT templates render_per_s={runs / rendered:,.0f} fstring_per_s={runs / baseline:,.0f} "
+          f"(render includes escaping and HTML validation)")
+
+    locales = ["en", "hi", "ta"] * 100  # 300 channels, "ta" falls back to English
+    start = time.perf_counter()
+    batch = bot.Templates.render_batch("market_open", ctx, locales)
+    print(f"RESULT templates batch channels={len(locales)} distinct={len(set(batch.values()))} "
+          f"ms={(time.perf_counter() - start) * 1e3:.2f}")
+
+    # Validation: hostile headlines are escaped, oversized posts are cut at a line
+    hostile = bot.Templates.render("global_news", {
+        "headline": {"title": "<script>alert(1)</script> & <b>unclosed", "source": "A&B"},
+        "etf": {"update": "x" * 5000, "source": "y"}})
+    long_lesson = {"day": 1, "title": "LONG", "points": ["point " * 40] * 60, "tip": "t"}
+    long_post = bot.Templates.render("learning_series", {"lesson": long_lesson})
+    print(f"RESULT templates hostile_valid={not bot.TelegramHTML.errors(hostile)} "
+          f"long_visible_len={bot.TelegramHTML.visible_length(long_post)} "
+          f"long_valid={not bot.TelegramHTML.errors(long_post)}")
+    rejected = []
+    for source in ("<b>{{ x }}", "{% for a in b %}", "{{ x | nope }}", "<div>{{ x }}</div>"):
+        try:
+            bot.Template("bad", source).render({"x": 1, "b": []})
+        except bot.TemplateError as e:
+            rejected.append(str(e).split(": ", 1)[1])
+    print(f"RESULT templates rejected={len(rejected)}/4 {rejected}")
+    del bot.PostTemplates.SOURCES["hi"]
+    bot.Templates.compile_all()
+
+def bench_seen_index():
+    """Seen-story index: insert/lookup rate, memory ceiling and near-dup recall at 100k+"""
+    titles = synthetic_headlines(120000)
+    index = bot.SeenStoryIndex(window=10 ** 9, max_entries=150000)
+    now = 1_700_000_000
+
+    rss_before = current_rss_kb()
+    start = time.perf_counter()
+    false_hits = sum(index.check_and_add(title, now) is not None for title in titles)
+    elapsed = time.perf_counter() - start
+    memory = (current_rss_kb() - rss_before) * 1024
+    print(f"RESULT seen_index headlines={len(titles)} us_per_check={elapsed / len(titles) * 1e6:.1f} "
+          f"memory_mb={memory / 1e6:.1f} false_duplicates={false_hits}")
+
+    # Rephrasings: one extra word, or one word dropped
+    rng = random.Random(3)
+    probes = rng.sample(titles, 2000)
+    start = time.perf_counter()
+    caught = 0
+    for title in probes:
+        words = title.split()
+        if rng.random() < 0.5:
+            words.insert(rng.randrange(len(words)), "reportedly")
+        else:
+            words.pop(rng.randrange(len(words) - 1))
+        caught += index.check_and_add(" ".join(words), now) is not None
+    elapsed = time.perf_counter() - start
+    print(f"RESULT seen_index rephrased={len(probes)} caught={caught} "
+          f"us_per_check={elapsed / len(probes) * 1e6:.1f}")
+
+    # Memory ceiling: a small index never holds more than max_entries after expiry
+    capped = bot.SeenStoryIndex(max_entries=5000)
+    for hour, title in enumerate(titles[:50000]):
+        capped.check_and_add(title, now + (hour // 1000) * 3600)
+    print(f"RESULT seen_index capped_entries={len(capped)} max_entries=5000")
+
+    # Persistence: each post writes one row; a restart reloads the rows and rebuilds the bands
+    with tempfile.TemporaryDirectory() as tmp:
+        store = bot.SeenStoryStore(os.path.join(tmp, "seen.db"))
+        capped.journal = store
+        store.put_many([(bucket, exact, signature) for exact, (bucket, signature) in capped._entries.items()])
+        start = time.perf_counter()
+        for i, title in enumerate(titles[50000:50200]):
+            capped.check_and_add(title, now + 50 * 3600 + i)
+        per_add = (time.perf_counter() - start) / 200
+        files = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp))
+        start = time.perf_counter()
+        restored = bot.SeenStoryIndex(max_entries=5000)
+        restored.load(store.rows())
+        reload_ms = (time.perf_counter() - start) * 1e3
+        store.close()
+        print(f"RESULT seen_index persisted_entries={len(restored)} ms_per_add={per_add * 1e3:.2f} "
+              f"reload_ms={reload_ms:.0f} files_kb={files / 1024:.0f}")
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)] if values else 0.0
+
+def simulation_events(days, start, seed):
+    """(sim time, kind, slot) for every slot's staging and firing over `days` days"""
+    rng = random.Random(seed)
+    lead = bot.PostStager.LEAD_MINUTES * 60
+    events = []
+    for day in range(days):
+        midnight = start + day * 86400
+        for key, (base_time, _) in bot.ProductionConfig.SCHEDULE.items():
+            hour, minute = map(int, base_time.split(":"))
+            fire_at = midnight + hour * 3600 + (minute + rng.randint(-5, 5)) * 60
+            events.append((fire_at - lead, "stage", key))
+            events.append((fire_at, "fire", key))
+    return events
+
+def run_simulation(days, seed=1):
+    """Replay `days` of slots and adaptive news polls against the fake upstreams in compressed time"""
+    start = bot.ProductionConfig.TIMEZONE.localize(datetime(2024, 5, 1)).timestamp()
+    clock = bot.VirtualClock(start)
+    previous_clock = bot.Clock.use(clock)
+    faults = {"COINGECKO_API": Faults(error_rate=0.05, seed=seed),
+              "CRYPTOPANIC_API": Faults(error_rate=0.02, seed=seed + 1),
+              "TELEGRAM_API": Faults(throttle_every=40, seed=seed + 2)}
+    fakes = FakeUpstreams(clock=clock.time, stories_per_hour=4.0, seed=seed, faults=faults,
+                          latency={name: 0.002 for name in FakeUpstreams.PREFIXES})
+    fakes.apply()
+    bot.ProductionConfig.CHANNEL_ID = "-1000000000000"
+    bot.ProductionConfig.TELEGRAM_CHAT_RATE = 1000  # hours of posting are compressed into seconds
+    bot.ProductionConfig.OUTBOX_DEDUP_WINDOW = 0
+    bot.FanOutDispatcher.chat_buckets.clear()
+    bot.RealTimeAPIs.cache.clear()
+    bot.RealTimeAPIs._news_validators = {}
+    bot.BreakingNewsMonitor.scorer = bot.BreakingNewsScorer()
+    bot.PostStager.timings.clear()
+    bot.Metrics.reset()
+    bot.HttpTransport.reset()
+
+    tasks = {key: func for key, (func, _) in bot.scheduled_posts().items()}
+    post_types = {key: post_type for key, (_, post_type) in bot.scheduled_posts().items()}
+    queue = simulation_events(days, start, seed) + [(start, "poll", None)]
+    heapq.heapify(queue)
+    end = start + days * 86400
+    latencies = {"stage": [], "fire": [], "poll": []}
+    breaking = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bot.ProductionConfig.OUTBOX_PATH = os.path.join(tmp, "outbox.db")
+        bot.ProductionConfig.STATE_PATH = os.path.join(tmp, "state.json")
+        bot.ProductionConfig.SEEN_PATH = os.path.join(tmp, "seen.db")
+        bot.ProductionConfig.HISTORY_DIR = os.path.join(tmp, "history")
+        bot.OutboundQueue._default = None
+        bot.StateStore._default = None
+        bot.BreakingNewsMonitor._seen = None
+        bot.PriceHistory._rings.clear()
+        bot.IndicatorEngine._sets.clear()
+        outbox = bot.OutboundQueue.default()
+        poller = bot.AdaptivePoller()
+
+        wall_start = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            outbox.start_worker()
+            while queue:
+                at, kind, key = heapq.heappop(queue)
+                if at >= end:
+                    break
+                clock.advance_to(at)
+                began = time.perf_counter()
+                if kind == "stage":
+                    bot.PostStager.stage(key, tasks[key], post_types[key])
+                elif kind == "fire":
+                    bot.PostStager.fire(key, tasks[key], post_types[key])
+                else:
+                    news, interval = poller.poll()
+                    if news:
+                        breaking += 1
+                        bot.TelegramPoster.send_message(bot.BreakingNewsMonitor.create_breaking_post(news),
+                                                        "breaking", natural_delay=False)
+                    heapq.heappush(queue, (clock.time() + interval, "poll", None))
+                latencies[kind].append((time.perf_counter() - began) * 1e3)
+
+            while outbox.delivery_stats()["pending"]:
+                time.sleep(0.01)
+            wall = time.perf_counter() - wall_start
+            outbox.stop_worker()
+        delivery = outbox.delivery_stats()
+        bot.StateStore.default().flush()
+        for ring in bot.PriceHistory._rings.values():
+            ring.close()
+        bot.PriceHistory._rings.clear()
+        bot.IndicatorEngine._sets.clear()
+        bot.OutboundQueue._default = None
+        bot.StateStore._default = None
+
+    events = sum(len(v) for v in latencies.values())
+    label = f"days={days}"
+    print(f"RESULT simulation {label} events={events} wall_s={wall:.1f} events_per_s={events / wall:.0f} "
+          f"sim_speedup={days * 86400 / wall:.0f}x")
+    for kind, values in latencies.items():
+        print(f"RESULT simulation {label} {kind} count={len(values)} p50_ms={percentile(values, 0.5):.1f} "
+              f"p99_ms={percentile(values, 0.99):.1f} max_ms={max(values, default=0):.1f}")
+    queue_ms = [t["trigger_to_queue_ms"] for t in bot.PostStager.timings]
+    print(f"RESULT simulation {label} slot_trigger_to_queue p50_ms={percentile(queue_ms, 0.5):.2f} "
+          f"p99_ms={percentile(queue_ms, 0.99):.2f} outbox_delivery_p50_s={delivery['latency_p50']} "
+          f"p99_s={delivery['latency_p99']} sent={delivery.get('sent')} retried={delivery.get('retried')}")
+    counts = fakes.request_counts()
+    print(f"RESULT simulation {label} requests " +
+          " ".join(f"{name.split('_')[0].lower()}={counts[name]}" for name in FakeUpstreams.PREFIXES))
+    poll_stats = poller.metrics()
+    print(f"RESULT simulation {label} polls={poll_stats['polls']} mean_interval_s={poll_stats['mean_interval']} "
+          f"not_modified={fakes.news.not_modified} poll_errors={poll_stats['errors']} breaking_posts={breaking} "
+          f"stories={len(fakes.news.stories)} telegram_messages={len(fakes.telegram.messages)}")
+    print(f"RESULT simulation {label} injected " +
+          " ".join(f"{name.split('_')[0].lower()}={dict(f.injected)}" for name, f in faults.items()))
+    fallbacks = {labels: value for (name, labels), value in bot.Metrics.counters.items() if name == "fallback_total"}
+    print(f"RESULT simulation {label} fallbacks={sum(fallbacks.values())}" +
+          "".join(f" {dict(labels).get('source')}={value}" for labels, value in sorted(fallbacks.items())))
+    bot.Clock.use(previous_clock)
+    bot.RealTimeAPIs.cache.clear()
+    fakes.close()
+
+def bench_simulated_day():
+    """One day of slots and news polls against fake upstreams, in compressed time"""
+    run_simulation(days=1)
+
+def bench_simulated_month():
+    """Thirty days compressed: throughput, latency percentiles and upstream request counts"""
+    run_simulation(days=30)
+
+def virtual_run(days, seed):
+    """bot.run_virtual against fresh fakes and temp state; (summary, fire schedule, telegram messages)"""
+    start = bot.ProductionConfig.TIMEZONE.localize(datetime(2024, 5, 1)).timestamp()
+    fakes = FakeUpstreams(clock=bot.Clock.time, seed=seed,
+                          faults={"TELEGRAM_API": Faults(throttle_every=40, seed=seed)})
+    fakes.apply()
+    bot.ProductionConfig.CHANNEL_ID = "-1000000000000"
+    bot.ProductionConfig.TELEGRAM_CHAT_RATE = 1000
+    bot.FanOutDispatcher.chat_buckets.clear()
+    bot.RealTimeAPIs._news_validators = {}
+    bot.BreakingNewsMonitor.scorer = bot.BreakingNewsScorer()
+    bot.PostStager.timings.clear()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bot.ProductionConfig.OUTBOX_PATH = os.path.join(tmp, "outbox.db")
+        bot.ProductionConfig.STATE_PATH = os.path.join(tmp, "state.json")
+        bot.ProductionConfig.SEEN_PATH = os.path.join(tmp, "seen.db")
+        bot.ProductionConfig.HISTORY_DIR = os.path.join(tmp, "history")
+        bot.OutboundQueue._default = None
+        bot.StateStore._default = None
+        bot.BreakingNewsMonitor._seen = None
+        bot.PriceHistory._rings.clear()
+        bot.IndicatorEngine._sets.clear()
+        outbox = bot.OutboundQueue.default()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            outbox.start_worker()
+            summary = bot.run_virtual(days, start=start, seed=seed)
+            while outbox.delivery_stats()["pending"]:
+                time.sleep(0.01)
+            outbox.stop_worker()
+        fires = [(t["slot"], round(t["fired_at"] - start)) for t in bot.PostStager.timings]
+        bot.StateStore.default().flush()
+        for ring in bot.PriceHistory._rings.values():
+            ring.close()
+        bot.PriceHistory._rings.clear()
+        bot.IndicatorEngine._sets.clear()
+        bot.OutboundQueue._default = None
+        bot.StateStore._default = None
+    messages = len(fakes.telegram.messages)
+    fakes.close()
+    return summary, fires, messages
+
+def bench_virtual_month():
+    """30 days of the real scheduler and news monitor on a virtual clock; repeatable with a seed"""
+    first, fires, messages = virtual_run(30, seed=7)
+    second, fires_again, _ = virtual_run(30, seed=7)
+    print(f"RESULT virtual_month days=30 wall_s={first['wall_seconds']} jobs={first['jobs_run']} "
+          f"slots_fired={first['slots_fired']} polls={first['polls']} "
+          f"mean_poll_interval_s={first['mean_poll_interval']} telegram_messages={messages}")
+    print(f"RESULT virtual_month learning_series_day={first['learning_series_day']} "
+          f"technical_series_day={first['technical_series_day']}")
+    print(f"RESULT virtual_month same_seed_same_schedule={fires == fires_again} "
+          f"fires={len(fires)} last={fires[-1]}")
+
+BENCHMARKS = {
+    "hedged_prices": bench_hedged_prices,
+    "binance_batch": bench_binance_batch,
+    "coin_universe": bench_coin_universe,
+    "price_consensus": bench_price_consensus,
+    "connection_reuse": bench_connection_reuse,
+    "paprika_stream": bench_paprika_stream,
+    "backfill": bench_backfill,
+    "single_flight": bench_single_flight,
+    "fanout": bench_fanout,
+    "outbox": bench_outbox,
+    "seen_index": bench_seen_index,
+    "news_scoring": bench_news_scoring,
+    "adaptive_poll": bench_adaptive_poll,
+    "price_alerts": bench_price_alerts,
+    "price_history": bench_price_history,
+    "indicators": bench_indicators,
+    "templates": bench_templates,
+    "prerender": bench_prerender,
+    "metrics": bench_metrics,
+    "simulated_day": bench_simulated_day,
+    "simulated_month": bench_simulated_month,
+    "virtual_month": bench_virtual_month
+}
+
+def main():
+    if sys.argv[1:2] == ["--paprika-child"]:
+        return paprika_child(*sys.argv[2:4])
+    if sys.argv[1:2] == ["--backfill-child"]:
+        return backfill_child(*sys.argv[2:4])
+
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        print(f"\n⏱️ {name}")
+        BENCHMARKS[name]()
+
+if __name__ == "__main__":
+    main()
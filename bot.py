@@ -6,15 +6,45 @@ Real-time APIs + Breaking News + Structured Series
 
 import os
 import requests
-import schedule
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool
 import time
 import random
 import hashlib
+import re
+import codecs
+import html
 from datetime import datetime, timedelta
 import pytz
 from dotenv import load_dotenv
 import threading
 import json
+import math
+import itertools
+from array import array
+import atexit
+import signal
+import sys
+import sqlite3
+import asyncio
+import contextvars
+import functools
+import bisect
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import socket
+import ipaddress
+import ssl
+import base64
+import struct
+import mmap
+import gzip
+import csv
+import operator
+import argparse
+from urllib.parse import urlparse
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED, TimeoutError as FuturesTimeout
 
 load_dotenv()
 
@@ -26,6 +56,8 @@ class ProductionConfig:
     
     BOT_TOKEN = os.getenv('BOT_TOKEN')
     CHANNEL_ID = os.getenv('CHANNEL_ID')
+    # Extra fan-out channels: "chat_id[:label],chat_id[:label],..."
+    CHANNEL_IDS = os.getenv('CHANNEL_IDS', '')
     TIMEZONE = pytz.timezone('Asia/Kolkata')
     
     # Schedule
@@ -39,12 +71,2020 @@ class ProductionConfig:
         "good_night": ("21:00", "wrap")
     }
     
-    # Series tracking
+    # Series tracking (starting days; progress is kept in the state file)
     LEARNING_SERIES_DAY = 1
     TECHNICAL_SERIES_DAY = 1
+    STATE_PATH = os.getenv('STATE_PATH', 'bot_state.json')
+    SEEN_PATH = os.getenv('SEEN_PATH', 'seen_stories.db')  # breaking-news dedup index
     
-    # News check interval (seconds)
-    NEWS_CHECK_INTERVAL = 1800  # 30 minutes
+    # News check interval (seconds): adaptive between the floor and NEWS_CHECK_INTERVAL
+    NEWS_CHECK_INTERVAL = 1800  # 30 minutes, used when the feed and prices are quiet
+    NEWS_CHECK_MIN_INTERVAL = 120
+    BREAKING_COOLDOWN = 7200     # quiet period after a breaking post
+    NEWS_FEED_PAGES = 2          # CryptoPanic pages scored per check
+    NEWS_ERROR_BACKOFF = 300     # wait after a monitor error
+    
+    # Price history: one memory-mapped ring per symbol
+    HISTORY_DIR = os.getenv('HISTORY_DIR', 'price_history')
+    HISTORY_CAPACITY = 20160  # samples per symbol (14 days at one a minute)
+    INDICATOR_BAR = 3600      # indicators run on hourly closes resampled from the samples
+    
+    # Observability: Prometheus text on METRICS_PORT (0 disables), JSON event log at JSON_LOG_PATH
+    METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+    JSON_LOG_PATH = os.getenv('JSON_LOG_PATH', '')
+    
+    # Runtime: "threads" (SlotScheduler polling loop) or "asyncio" (timer-driven event loop)
+    RUNTIME = os.getenv('BOT_RUNTIME', 'threads')
+    
+    # Clock: "wall", or "virtual" to run VIRTUAL_DAYS of schedule in compressed time
+    CLOCK = os.getenv('BOT_CLOCK', 'wall')
+    VIRTUAL_DAYS = int(os.getenv('VIRTUAL_DAYS', '30'))
+    JITTER_SEED = os.getenv('JITTER_SEED', '')  # makes slot jitter and posting delays repeatable
+    
+    # Price APIs (base URLs can be pointed at local fakes, see harness.py)
+    COINGECKO_API = os.getenv('COINGECKO_API', "https://api.coingecko.com/api/v3")
+    BINANCE_API = os.getenv('BINANCE_API', "https://api.binance.com/api/v3")
+    COINPAPRIKA_API = os.getenv('COINPAPRIKA_API', "https://api.coinpaprika.com/v1")
+    
+    # Sentiment, news and Telegram APIs
+    FGI_API = os.getenv('FGI_API', "https://api.alternative.me")
+    CRYPTOPANIC_API = os.getenv('CRYPTOPANIC_API', "https://cryptopanic.com/api/v1")
+    TELEGRAM_API = os.getenv('TELEGRAM_API', "https://api.telegram.org")
+    
+    # Telegram send limits (messages per second)
+    TELEGRAM_GLOBAL_RATE = 30
+    TELEGRAM_CHAT_RATE = 20 / 60  # about 20 messages a minute into one channel
+    FANOUT_WORKERS = 16
+    
+    # Durable outbound queue
+    OUTBOX_PATH = os.getenv('OUTBOX_PATH', 'outbox.db')
+    OUTBOX_DEDUP_WINDOW = 6 * 3600   # identical post to the same chat is dropped within this
+    OUTBOX_MAX_ATTEMPTS = 8
+    OUTBOX_BACKOFF_BASE = 2          # seconds, doubled per attempt
+    OUTBOX_BACKOFF_MAX = 900
+    
+    # Streaming price alerts: "binance", a ws:// URL or a recorded tick file; empty disables
+    PRICE_STREAM = os.getenv('PRICE_STREAM', '')
+    BINANCE_WS = os.getenv('BINANCE_WS', "wss://stream.binance.com:9443")
+    ALERT_MOVE_PCT = 5.0       # % move within ALERT_WINDOW
+    ALERT_WINDOW = 3600        # seconds
+    ALERT_COOLDOWN = 3600      # per symbol and alert kind
+    PRICE_ALERT_LEVELS = os.getenv('PRICE_ALERT_LEVELS', 'BTC:60000,70000,80000,100000;ETH:3000,4000,5000')
+    
+    # Coin universe: "" (built-in list), "BTC,ETH,..." or "top:N" by market cap rank
+    COIN_UNIVERSE = os.getenv('COIN_UNIVERSE', '')
+    COIN_INDEX_PATH = os.getenv('COIN_INDEX_PATH', 'coin_index.json')
+    COIN_INDEX_MAX_AGE = 7 * 86400  # cross-provider id index is rebuilt after this
+    
+    # Price fetch mode: "consensus" combines every provider that answers, "hedged" takes
+    # the first to answer, "sequential" tries them in order
+    PRICE_FETCH_MODE = os.getenv('PRICE_FETCH_MODE', 'consensus')
+    PRICE_FETCH_DEADLINE = float(os.getenv('PRICE_FETCH_DEADLINE', '12'))  # seconds
+    PRICE_CONSENSUS = os.getenv('PRICE_CONSENSUS', 'median')  # or "vwap" (weighted by 24h volume)
+    PRICE_CONSENSUS_GRACE = 1.5      # seconds to wait for the other providers after the first answer
+    PRICE_OUTLIER_PCT = 2.0          # a source this far from the median is dropped
+    PRICE_MAX_SPREAD = 0.5           # % spread above which a consensus price is marked "wide"
+    PRICE_STALE_AFTER = 600          # seconds; older provider quotes are dropped
+    PRICE_LAST_KNOWN_MAX_AGE = 6 * 3600  # recorded prices served (as such) when every provider fails
+
+# ============================================================================
+# 1A. METRICS AND TRACING
+# ============================================================================
+class Histogram:
+    """Fixed-bucket histogram (seconds)"""
+    
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    
+    __slots__ = ("counts", "total", "count")
+    
+    def __init__(self):
+        self.counts = [0] * (len(Histogram.BUCKETS) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+    
+    def observe(self, value):
+        self.counts[bisect.bisect_left(Histogram.BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+class JsonLog:
+    """Structured event log: one JSON object per line at JSON_LOG_PATH"""
+    
+    _file = None
+    _lock = threading.Lock()
+    
+    @staticmethod
+    def enabled():
+        return bool(ProductionConfig.JSON_LOG_PATH)
+    
+    @staticmethod
+    def emit(event, **fields):
+        if not ProductionConfig.JSON_LOG_PATH:
+            return
+        line = json.dumps({"ts": round(time.time(), 3), "event": event, **fields},
+                          default=str, ensure_ascii=False)
+        with JsonLog._lock:
+            if JsonLog._file is None:
+                JsonLog._file = open(ProductionConfig.JSON_LOG_PATH, "a", buffering=1)
+            JsonLog._file.write(line + "\n")
+
+class Span:
+    """One timed operation; nested spans share the trace id"""
+    
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attrs")
+    
+    def __init__(self, name, parent, attrs):
+        self.name = name
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.trace_id = parent.trace_id if parent else self.span_id
+        self.parent_id = parent.span_id if parent else None
+        self.attrs = attrs
+
+class Metrics:
+    """Process-wide counters, histograms and spans, exported as Prometheus text"""
+    
+    PREFIX = "vci_"
+    
+    counters = {}    # (name, labels) -> value
+    histograms = {}  # (name, labels) -> Histogram
+    _lock = threading.Lock()
+    _current = contextvars.ContextVar("vci_span", default=None)
+    
+    @staticmethod
+    def key(name, labels):
+        """(name, sorted label pairs); values are strings so mixed-type labels still sort"""
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+    
+    @staticmethod
+    def inc(name, amount=1, **labels):
+        key = Metrics.key(name, labels)
+        with Metrics._lock:
+            Metrics.counters[key] = Metrics.counters.get(key, 0) + amount
+    
+    @staticmethod
+    def observe(name, value, **labels):
+        key = Metrics.key(name, labels)
+        with Metrics._lock:
+            histogram = Metrics.histograms.get(key)
+            if histogram is None:
+                histogram = Metrics.histograms[key] = Histogram()
+            histogram.observe(value)
+    
+    @staticmethod
+    def fallback(source):
+        """Count synthetic data served in place of a live source, and tag the current span"""
+        Metrics.inc("fallback_total", source=source)
+        current = Metrics._current.get()
+        if current is not None:
+            current.attrs.setdefault("fallback", []).append(source)
+    
+    @staticmethod
+    @contextmanager
+    def span(name, **attrs):
+        """Time a block: span_seconds histogram, error counter, JSON span event"""
+        parent = Metrics._current.get()
+        current = Span(name, parent, attrs)
+        token = Metrics._current.set(current)
+        started = time.perf_counter()
+        error = None
+        try:
+            yield current
+        except Exception as e:
+            error = repr(e)
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            Metrics._current.reset(token)
+            Metrics.observe("span_seconds", duration, span=name)
+            if error:
+                Metrics.inc("span_errors_total", span=name)
+            if current.attrs.get("fallback"):
+                Metrics.inc("spans_with_fallback_total", span=name)
+                if parent is not None:
+                    parent.attrs.setdefault("fallback", []).extend(current.attrs["fallback"])
+            if ProductionConfig.JSON_LOG_PATH:
+                JsonLog.emit("span", name=name, trace_id=current.trace_id, span_id=current.span_id,
+                             parent_id=current.parent_id, duration_ms=round(duration * 1e3, 3),
+                             error=error, **current.attrs)
+    
+    @staticmethod
+    def traced(name):
+        """Decorator: run the function inside Metrics.span(name)"""
+        def decorate(fn):
+            if asyncio.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def run_async(*args, **kwargs):
+                    with Metrics.span(name):
+                        return await fn(*args, **kwargs)
+                return run_async
+            
+            @functools.wraps(fn)
+            def run(*args, **kwargs):
+                with Metrics.span(name):
+                    return fn(*args, **kwargs)
+            return run
+        return decorate
+    
+    @staticmethod
+    def gauges():
+        """Point-in-time values read from the components' own stats at scrape time"""
+        values = [(f"cache_{stat}", {}, count) for stat, count in RealTimeAPIs.cache.snapshot().items()]
+        values += [(f"single_flight_{stat}", {}, count) for stat, count in RealTimeAPIs.flights.stats.items()]
+        values += [(f"http_{stat}", {}, count) for stat, count in HttpTransport.connection_stats().items()]
+        poller = AdaptivePoller.current
+        if poller is not None:
+            values += [("news_poll_interval_seconds", {}, poller.interval),
+                       ("news_poll_heat", {}, round(poller.heat, 3)),
+                       ("news_poll_consecutive_errors", {}, poller.errors),
+                       ("news_not_modified", {}, HttpTransport.stats.get("news_not_modified", 0))]
+        if OutboundQueue._default is not None:
+            stats = OutboundQueue._default.delivery_stats()
+            values += [(f"outbox_{stat}", {}, count) for stat, count in stats.items()
+                       if isinstance(count, (int, float))]
+        return values
+    
+    @staticmethod
+    def labels_text(labels, extra=None):
+        pairs = list(labels) + ([extra] if extra else [])
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                              for k, v in pairs) + "}"
+    
+    @staticmethod
+    def render():
+        """Prometheus text exposition format"""
+        prefix = Metrics.PREFIX
+        with Metrics._lock:
+            counters = sorted(Metrics.counters.items())
+            histograms = sorted((key, (list(h.counts), h.total, h.count))
+                                for key, h in Metrics.histograms.items())
+        
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {prefix}{name} counter")
+                typed.add(name)
+            lines.append(f"{prefix}{name}{Metrics.labels_text(labels)} {value}")
+        
+        for (name, labels), (counts, total, count) in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {prefix}{name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bound, bucket in zip(Histogram.BUCKETS + ("+Inf",), counts):
+                cumulative += bucket
+                lines.append(f"{prefix}{name}_bucket{Metrics.labels_text(labels, ('le', bound))} {cumulative}")
+            lines.append(f"{prefix}{name}_sum{Metrics.labels_text(labels)} {total:.6f}")
+            lines.append(f"{prefix}{name}_count{Metrics.labels_text(labels)} {count}")
+        
+        try:
+            for name, labels, value in Metrics.gauges():
+                if name not in typed:
+                    lines.append(f"# TYPE {prefix}{name} gauge")
+                    typed.add(name)
+                lines.append(f"{prefix}{name}{Metrics.labels_text(sorted(labels.items()))} {value}")
+        except Exception as e:
+            lines.append(f"# gauges unavailable: {e}")
+        return "\n".join(lines) + "\n"
+    
+    @staticmethod
+    def reset():
+        with Metrics._lock:
+            Metrics.counters.clear()
+            Metrics.histograms.clear()
+
+class MetricsServer:
+    """Local /metrics endpoint (Prometheus text) on a daemon thread"""
+    
+    @staticmethod
+    def start(port=None, host="127.0.0.1"):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = Metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        server = ThreadingHTTPServer((host, ProductionConfig.METRICS_PORT if port is None else port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        print(f"📈 Metrics at http://{host}:{server.server_address[1]}/metrics")
+        return server
+
+# ============================================================================
+# 1B. SHARED HTTP TRANSPORT
+# ============================================================================
+class _CountingHTTPPool(HTTPConnectionPool):
+    def _new_conn(self):
+        HttpTransport.count("connections_opened")
+        return super()._new_conn()
+
+class _CountingHTTPSPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        HttpTransport.count("connections_opened")
+        return super()._new_conn()
+
+class _PooledAdapter(HTTPAdapter):
+    """Keep-alive adapter whose pools count every new connection"""
+    
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPPool,
+            "https": _CountingHTTPSPool
+        }
+
+class HttpTransport:
+    """One keep-alive session shared by every API fetcher and the poster"""
+    
+    # Per-endpoint timeouts (seconds)
+    TIMEOUTS = {
+        "coingecko": 15,
+        "binance": 5,
+        "coinpaprika": 10,
+        "fgi": 5,
+        "cryptopanic": 10,
+        "telegram": 10
+    }
+    
+    # Extra GET attempts on a connection error or 5xx, only while the endpoint's timeout
+    # has room. Prices and news already fall back across providers under their own
+    # deadlines, so they get none: a retry there would only stretch the worst case.
+    RETRIES = {"fgi": 1}
+    RETRY_STATUSES = frozenset([500, 502, 503, 504])
+    RETRY_BACKOFF = 0.5  # seconds before a retry
+    
+    # Sent to loopback hosts on a virtual clock, so harness.py fakes in another
+    # process stamp their quotes and stories with the bot's time
+    CLOCK_HEADER = "X-Bot-Clock"
+    
+    POOL_CONNECTIONS = 10  # hosts kept in the pool manager
+    POOL_MAXSIZE = 10      # connections kept per host
+    
+    stats = {"requests": 0, "connections_opened": 0}
+    _session = None
+    _lock = threading.Lock()
+    
+    @staticmethod
+    def session():
+        """Build the shared session on first use"""
+        with HttpTransport._lock:
+            if HttpTransport._session is None:
+                # No adapter-level retries: they applied to every GET and multiplied
+                # each endpoint's timeout. request() retries per RETRIES instead.
+                adapter = _PooledAdapter(
+                    pool_connections=HttpTransport.POOL_CONNECTIONS,
+                    pool_maxsize=HttpTransport.POOL_MAXSIZE,
+                    max_retries=0
+                )
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                HttpTransport._session = session
+            return HttpTransport._session
+    
+    @staticmethod
+    def count(name, amount=1):
+        with HttpTransport._lock:
+            HttpTransport.stats[name] = HttpTransport.stats.get(name, 0) + amount
+    
+    @staticmethod
+    def request(method, endpoint, url, timeout=None, **kwargs):
+        """Send through the shared pool with the endpoint's timeout; timed per endpoint
+        
+        The timeout caps the whole call, retries included.
+        """
+        HttpTransport.count("requests")
+        if Clock.is_virtual() and VirtualClock.sandboxed(url):
+            kwargs["headers"] = {**(kwargs.get("headers") or {}), HttpTransport.CLOCK_HEADER: repr(Clock.time())}
+        timeout = timeout or HttpTransport.TIMEOUTS[endpoint]
+        retries = HttpTransport.RETRIES.get(endpoint, 0) if method == "GET" else 0
+        started = time.perf_counter()
+        status = "error"
+        try:
+            for attempt in range(retries + 1):
+                remaining = timeout - (time.perf_counter() - started)
+                last = attempt == retries or remaining - HttpTransport.RETRY_BACKOFF < 1.0
+                try:
+                    response = HttpTransport.session().request(method, url, timeout=remaining, **kwargs)
+                except requests.ConnectionError:
+                    if last:
+                        raise
+                else:
+                    status = str(response.status_code)
+                    if last or response.status_code not in HttpTransport.RETRY_STATUSES:
+                        return response
+                    response.close()
+                HttpTransport.count("retries")
+                time.sleep(HttpTransport.RETRY_BACKOFF)
+        finally:
+            Metrics.observe("http_request_seconds", time.perf_counter() - started, endpoint=endpoint)
+            Metrics.inc("http_responses_total", endpoint=endpoint, status=status)
+    
+    @staticmethod
+    def get(endpoint, url, timeout=None, **kwargs):
+        """GET through the shared pool with the endpoint's timeout"""
+        return HttpTransport.request("GET", endpoint, url, timeout=timeout, **kwargs)
+    
+    @staticmethod
+    def post(endpoint, url, timeout=None, **kwargs):
+        """POST through the shared pool with the endpoint's timeout"""
+        return HttpTransport.request("POST", endpoint, url, timeout=timeout, **kwargs)
+    
+    @staticmethod
+    def connection_stats():
+        """Connections opened vs. reused since start"""
+        with HttpTransport._lock:
+            opened = HttpTransport.stats["connections_opened"]
+            requests_sent = HttpTransport.stats["requests"]
+        return {
+            "requests": requests_sent,
+            "connections_opened": opened,
+            "connections_reused": max(requests_sent - opened, 0)
+        }
+    
+    @staticmethod
+    def reset():
+        """Close pooled connections and zero the counters"""
+        with HttpTransport._lock:
+            if HttpTransport._session is not None:
+                HttpTransport._session.close()
+            HttpTransport._session = None
+            HttpTransport.stats = {"requests": 0, "connections_opened": 0}
+
+# ============================================================================
+# 1C. CACHE LAYER
+# ============================================================================
+class TTLCache:
+    """Thread-safe cache with per-entry TTL, LRU eviction and stats"""
+    
+    def __init__(self, max_entries=256, default_ttl=60):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()  # key -> (value, expires_at, stale_until)
+        self._lock = threading.RLock()
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+    
+    def get(self, key):
+        """Fresh value for key, or None"""
+        value, fresh = self.get_stale(key, allow_stale=False)
+        return value if fresh else None
+    
+    def get_stale(self, key, allow_stale=True):
+        """(value, fresh) - expired values are still returned inside their stale window"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None, False
+            
+            value, expires_at, stale_until = entry
+            now = Clock.monotonic()
+            if now >= expires_at:
+                if now >= stale_until:
+                    del self._entries[key]
+                    self.stats["expired"] += 1
+                    self.stats["misses"] += 1
+                    return None, False
+                if not allow_stale:
+                    self.stats["misses"] += 1
+                    return None, False
+                self._entries.move_to_end(key)
+                self.stats["stale_hits"] += 1
+                return value, False
+            
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return value, True
+    
+    def set(self, key, value, ttl=None, stale_ttl=0):
+        """Store value, evicting least recently used entries over the limit"""
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = Clock.monotonic() + ttl
+        with self._lock:
+            self._entries[key] = (value, expires_at, expires_at + stale_ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+    
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def snapshot(self):
+        """Stats plus current size and hit ratio"""
+        with self._lock:
+            hits = self.stats["hits"] + self.stats["stale_hits"]
+            lookups = hits + self.stats["misses"]
+            return dict(
+                self.stats,
+                size=len(self._entries),
+                hit_ratio=round(hits / lookups, 3) if lookups else 0.0
+            )
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one in-flight call"""
+    
+    def __init__(self):
+        self._calls = {}  # key -> {"done": Event, "result": ..., "error": ...}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "coalesced": 0}
+    
+    def do(self, key, fn):
+        """Run fn for key, or wait for the call already running and share its result"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = {"done": threading.Event(), "result": None, "error": None}
+                self._calls[key] = call
+                leader = True
+                self.stats["calls"] += 1
+            else:
+                leader = False
+                self.stats["coalesced"] += 1
+        
+        if not leader:
+            call["done"].wait()
+        else:
+            try:
+                call["result"] = fn()
+            except Exception as e:
+                call["error"] = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call["done"].set()
+        
+        if call["error"] is not None:
+            raise call["error"]
+        return call["result"]
+
+# ============================================================================
+# 1D. PERSISTENT STATE
+# ============================================================================
+class StateStore:
+    """Small JSON state file: lazy load, batched atomic writes"""
+    
+    FLUSH_DELAY = 5  # seconds to batch changes before writing
+    
+    _default = None
+    _default_lock = threading.Lock()
+    
+    def __init__(self, path):
+        self.path = path
+        self._data = None
+        self._dirty = False
+        self._timer = None
+        self._lock = threading.RLock()
+    
+    @staticmethod
+    def default():
+        """Process-wide store at ProductionConfig.STATE_PATH, flushed at exit"""
+        with StateStore._default_lock:
+            if StateStore._default is None:
+                StateStore._default = StateStore(ProductionConfig.STATE_PATH)
+                atexit.register(StateStore._default.flush)
+            return StateStore._default
+    
+    def _load(self):
+        if self._data is None:
+            try:
+                with open(self.path) as f:
+                    self._data = json.load(f)
+            except FileNotFoundError:
+                self._data = {}
+            except ValueError as e:
+                print(f"⚠️ State file unreadable, starting fresh: {e}")
+                self._data = {}
+        return self._data
+    
+    def get(self, key, default=None):
+        with self._lock:
+            return self._load().get(key, default)
+    
+    def set(self, key, value):
+        """Update key in memory; the write happens FLUSH_DELAY later"""
+        with self._lock:
+            data = self._load()
+            if data.get(key) == value:
+                return
+            data[key] = value
+            self._changed()
+    
+    def delete(self, key):
+        with self._lock:
+            if key in self._load():
+                del self._data[key]
+                self._changed()
+    
+    def _changed(self):
+        with self._lock:
+            self._dirty = True
+            if self._timer is None:
+                self._timer = threading.Timer(StateStore.FLUSH_DELAY, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+    
+    def flush(self):
+        """Write pending changes atomically (temp file, fsync, rename)"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._data, f, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+# ============================================================================
+# 1E. PRICE HISTORY STORE
+# ============================================================================
+class PriceRing:
+    """Fixed-size ring of float64 columns in a memory-mapped file
+    
+    Besides timestamp, price and volume each slot keeps running totals of
+    price, volume and price*volume, so range sums (mean, VWAP) are O(1).
+    Volume is per-sample volume: imported bars carry theirs, live samples 0.
+    """
+    
+    MAGIC = b"VCIRING2"
+    HEADER = struct.Struct("<8sQQQ")  # magic, capacity, head (next slot), count
+    COLUMNS = 6                       # ts, price, volume, sum_price, sum_volume, sum_turnover
+    
+    def __init__(self, path, capacity):
+        size = PriceRing.HEADER.size + PriceRing.COLUMNS * 8 * capacity
+        exists = os.path.exists(path) and os.path.getsize(path) >= PriceRing.HEADER.size
+        with open(path, "r+b" if exists else "w+b") as f:
+            if exists:
+                magic, stored, _, _ = PriceRing.HEADER.unpack(f.read(PriceRing.HEADER.size))
+                if magic == PriceRing.MAGIC:
+                    capacity = stored  # keep the file's layout
+                    size = PriceRing.HEADER.size + PriceRing.COLUMNS * 8 * capacity
+                else:
+                    print(f"⚠️ {path} is not a price ring, starting fresh")
+                    exists = False
+            f.truncate(size)
+            self._map = mmap.mmap(f.fileno(), size)
+        
+        self.path = path
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        view = memoryview(self._map)
+        column = 8 * capacity
+        start = PriceRing.HEADER.size
+        (self.ts, self.price, self.volume,
+         self.sum_price, self.sum_volume, self.sum_turnover) = [
+            view[start + i * column:start + (i + 1) * column].cast("d")
+            for i in range(PriceRing.COLUMNS)
+        ]
+        view.release()
+        
+        if exists:
+            _, _, self.head, self.count = PriceRing.HEADER.unpack_from(self._map, 0)
+        else:
+            self.head = self.count = 0
+            self._write_header()
+    
+    def _write_header(self):
+        PriceRing.HEADER.pack_into(self._map, 0, PriceRing.MAGIC, self.capacity, self.head, self.count)
+    
+    def append(self, ts, price, volume=0.0):
+        """O(1): overwrite the oldest sample once full; timestamps must not go backwards"""
+        with self._lock:
+            previous = (self.head - 1) % self.capacity
+            if self.count and ts < self.ts[previous]:
+                return False
+            slot = self.head
+            self.ts[slot] = ts
+            self.price[slot] = price
+            self.volume[slot] = volume
+            if self.count:
+                self.sum_price[slot] = self.sum_price[previous] + price
+                self.sum_volume[slot] = self.sum_volume[previous] + volume
+                self.sum_turnover[slot] = self.sum_turnover[previous] + price * volume
+            else:
+                self.sum_price[slot] = price
+                self.sum_volume[slot] = volume
+                self.sum_turnover[slot] = price * volume
+            self.head = (slot + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+            self._write_header()
+            return True
+    
+    @staticmethod
+    def sort_rows(ts, price, volume):
+        """The three columns reordered by timestamp"""
+        return tuple(array("d", column) for column in zip(*sorted(zip(ts, price, volume))))
+    
+    def extend(self, ts, price, volume):
+        """Bulk append of float64 arrays; returns rows accepted
+        
+        Rows not newer than the newest stored sample are dropped (so re-importing
+        a dump is a no-op), and only the last `capacity` rows are written.
+        Unordered input is sorted first.
+        """
+        if ts.tolist() != sorted(ts):
+            ts, price, volume = PriceRing.sort_rows(ts, price, volume)
+        with self._lock:
+            previous = (self.head - 1) % self.capacity
+            start = bisect.bisect_right(ts, self.ts[previous]) if self.count else 0
+            accepted = len(ts) - start
+            skip = max(accepted - self.capacity, 0)  # would be overwritten anyway
+            lo = start + skip
+            n = len(ts) - lo
+            if n <= 0:
+                return 0
+            
+            if self.count and not skip:
+                bases = (self.sum_price[previous], self.sum_volume[previous], self.sum_turnover[previous])
+            else:
+                bases = (0.0, 0.0, 0.0)
+            prices, volumes = price[lo:], volume[lo:]
+            columns = [
+                (self.ts, ts[lo:]), (self.price, prices), (self.volume, volumes),
+                (self.sum_price, itertools.accumulate(prices, initial=bases[0])),
+                (self.sum_volume, itertools.accumulate(volumes, initial=bases[1])),
+                (self.sum_turnover, itertools.accumulate(map(operator.mul, prices, volumes), initial=bases[2]))
+            ]
+            
+            head = self.head
+            first = min(n, self.capacity - head)
+            for index, (column, values) in enumerate(columns):
+                if index >= 3:
+                    values = array("d", itertools.islice(values, 1, None))  # drop the initial base
+                column[head:head + first] = values[:first]
+                if first < n:
+                    column[0:n - first] = values[first:]
+            
+            self.head = (head + n) % self.capacity
+            self.count = min(self.count + n, self.capacity)
+            self._write_header()
+            return accepted
+    
+    def _slot(self, i):
+        """Physical slot of the i-th oldest sample"""
+        return (self.head - self.count + i) % self.capacity
+    
+    def _bisect(self, ts):
+        """Number of samples with timestamp < ts"""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.ts[self._slot(mid)] < ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+    
+    def _segments(self, lo, hi):
+        """Physical [start, end) slices covering logical samples lo..hi"""
+        if lo >= hi:
+            return []
+        start, end = self._slot(lo), self._slot(hi - 1) + 1
+        if start < end:
+            return [(start, end)]
+        return [(start, self.capacity), (0, end)]
+    
+    def _range_sum(self, totals, lo, hi, first_value):
+        """Sum over logical samples lo..hi from a running-total column"""
+        return totals[self._slot(hi - 1)] - totals[self._slot(lo)] + first_value
+    
+    def __len__(self):
+        return self.count
+    
+    def latest(self):
+        """(ts, price) of the newest sample, or None"""
+        with self._lock:
+            if not self.count:
+                return None
+            slot = (self.head - 1) % self.capacity
+            return self.ts[slot], self.price[slot]
+    
+    def price_at(self, ts):
+        """Last price at or before ts, or None"""
+        with self._lock:
+            index = self._bisect(ts + 1e-9) - 1
+            return self.price[self._slot(index)] if index >= 0 else None
+    
+    def window(self, start_ts, end_ts=None):
+        """[(ts, price, volume)] between start_ts and end_ts, oldest first"""
+        with self._lock:
+            lo = self._bisect(start_ts)
+            hi = self._bisect(end_ts + 1e-9) if end_ts is not None else self.count
+            rows = []
+            for a, b in self._segments(lo, hi):
+                rows.extend(zip(self.ts[a:b], self.price[a:b], self.volume[a:b]))
+            return rows
+    
+    def stats(self, start_ts, end_ts=None):
+        """open/close/low/high/vwap/return_pct over a time range, or None if empty
+        
+        vwap weighs only samples that carry volume; over live samples alone it is
+        the plain mean price.
+        """
+        with self._lock:
+            lo = self._bisect(start_ts)
+            hi = self._bisect(end_ts + 1e-9) if end_ts is not None else self.count
+            segments = self._segments(lo, hi)
+            if not segments:
+                return None
+            
+            # tolist() copies each slice in C; min/max then run over plain floats
+            prices = [self.price[a:b].tolist() for a, b in segments]
+            low = min(min(p) for p in prices)
+            high = max(max(p) for p in prices)
+            first = self.price[self._slot(lo)]
+            first_volume = self.volume[self._slot(lo)]
+            total_volume = self._range_sum(self.sum_volume, lo, hi, first_volume)
+            if total_volume > 1e-12:
+                turnover = self._range_sum(self.sum_turnover, lo, hi, first * first_volume)
+                vwap = turnover / total_volume
+            else:
+                # No volume reported by the providers: plain mean
+                vwap = self._range_sum(self.sum_price, lo, hi, first) / (hi - lo)
+            last = self.price[self._slot(hi - 1)]
+            return {
+                "open": first, "close": last, "low": low, "high": high, "vwap": vwap,
+                "return_pct": (last / first - 1) * 100 if first else 0.0,
+                "samples": hi - lo,
+                "since": self.ts[self._slot(lo)]
+            }
+    
+    def flush(self):
+        with self._lock:
+            self._map.flush()
+    
+    def close(self):
+        with self._lock:
+            for column in (self.ts, self.price, self.volume,
+                           self.sum_price, self.sum_volume, self.sum_turnover):
+                column.release()
+            self._map.close()
+
+class PriceHistory:
+    """Per-symbol price rings under HISTORY_DIR, fed by every live price fetch"""
+    
+    _rings = {}
+    _lock = threading.Lock()
+    
+    @staticmethod
+    def ring(symbol, capacity=None):
+        """The symbol's ring; capacity only applies when its file is created"""
+        with PriceHistory._lock:
+            ring = PriceHistory._rings.get(symbol)
+            if ring is None:
+                if not PriceHistory._rings:
+                    os.makedirs(ProductionConfig.HISTORY_DIR, exist_ok=True)
+                    atexit.register(PriceHistory.flush)
+                path = os.path.join(ProductionConfig.HISTORY_DIR, f"{symbol}.ring")
+                ring = PriceRing(path, capacity or ProductionConfig.HISTORY_CAPACITY)
+                PriceHistory._rings[symbol] = ring
+            return ring
+    
+    @staticmethod
+    def record(prices, ts=None):
+        """Append one sample per symbol from a {"SYM": {"price", ...}} snapshot
+        
+        Live samples are stored without volume: the providers' volume_24h is a
+        rolling 24h total, not volume traded since the previous sample.
+        """
+        ts = ts or Clock.time()
+        for symbol, quote in prices.items():
+            if quote.get("price"):
+                price = float(quote["price"])
+                if PriceHistory.ring(symbol).append(ts, price):
+                    IndicatorEngine.update(symbol, ts, price)
+    
+    @staticmethod
+    def today_start():
+        """Timestamp of local midnight in the bot's timezone"""
+        now = Clock.now(ProductionConfig.TIMEZONE)
+        return now.replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+    
+    @staticmethod
+    def since(symbol, start_ts):
+        """Range stats for symbol from start_ts to now, or None without history"""
+        try:
+            return PriceHistory.ring(symbol).stats(start_ts)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Price history error ({symbol}): {e}")
+            return None
+    
+    @staticmethod
+    def flush():
+        with PriceHistory._lock:
+            for ring in PriceHistory._rings.values():
+                ring.flush()
+
+class HistoryImporter:
+    """Stream OHLCV dumps (CSV, CSV.gz, Parquet) into the price rings in bounded memory
+    
+    Usage: python bot.py backfill FILE [FILE ...] [--symbol BTC] [--capacity N]
+    Files are read CHUNK_ROWS rows at a time; only the close price and volume are kept.
+    The newest rows of each symbol, at most one ring's worth, are held until the
+    file is read, so newest-first or shuffled dumps import as fully as ordered ones.
+    """
+    
+    CHUNK_ROWS = 65536
+    MAX_FUTURE = 86400  # rows stamped further ahead than this are rejected as unreadable
+    TS_COLUMNS = ("timestamp", "time", "open_time", "date", "datetime", "ts")
+    PRICE_COLUMNS = ("close", "price", "last")
+    VOLUME_COLUMNS = ("volume", "vol", "base_volume")
+    SYMBOL_COLUMNS = ("symbol", "ticker", "pair", "asset")
+    KLINE_LAYOUT = (0, 4, 5)  # header-less Binance kline dumps: open_time, ..., close, volume
+    
+    @staticmethod
+    def symbol_of(raw):
+        """"BTCUSDT", "BTC-USD", "btc" -> "BTC" """
+        raw = raw.strip().upper()
+        coin = CoinUniverse.lookup("binance", raw)
+        if coin:
+            return coin["symbol"]
+        raw = re.split(r"[-/_]", raw)[0]
+        for quote in ("USDT", "USDC", "BUSD", "USD"):
+            if raw.endswith(quote) and len(raw) > len(quote):
+                return raw[:-len(quote)]
+        return raw
+    
+    @staticmethod
+    def epoch_seconds(ts):
+        """Epoch seconds from seconds, milliseconds or microseconds"""
+        if ts > 1e14:
+            return ts / 1e6
+        return ts / 1e3 if ts > 1e11 else ts
+    
+    @staticmethod
+    def parse_ts(value):
+        """Epoch seconds, milliseconds or microseconds, ISO 8601 text or a datetime (naive means UTC)"""
+        if isinstance(value, datetime):
+            return (value if value.tzinfo else pytz.utc.localize(value)).timestamp()
+        try:
+            ts = float(value)
+        except ValueError:
+            parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+            return (parsed if parsed.tzinfo else pytz.utc.localize(parsed)).timestamp()
+        return HistoryImporter.epoch_seconds(ts)
+    
+    @staticmethod
+    def layout(header):
+        """(ts, price, volume, symbol) column indexes; symbol/volume may be None"""
+        names = [str(name).strip().lower() for name in header]
+        
+        def pick(candidates):
+            return next((names.index(c) for c in candidates if c in names), None)
+        
+        ts, price = pick(HistoryImporter.TS_COLUMNS), pick(HistoryImporter.PRICE_COLUMNS)
+        if ts is None or price is None:
+            raise ValueError(f"no timestamp/close columns in {header[:8]}")
+        return ts, price, pick(HistoryImporter.VOLUME_COLUMNS), pick(HistoryImporter.SYMBOL_COLUMNS)
+    
+    @staticmethod
+    def compact(layout):
+        """Indexes of the used columns, and the layout renumbered to that selection"""
+        wanted = [i for i in layout if i is not None]
+        return wanted, tuple(None if i is None else wanted.index(i) for i in layout)
+    
+    @staticmethod
+    def csv_chunks(path):
+        """(layout, columns, short rows) per chunk; .gz files are decompressed as they are read"""
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", newline="") as f:
+            reader = csv.reader(f)
+            first = next(reader, None)
+            if first is None:
+                return
+            try:
+                float(first[0])
+                layout = (*HistoryImporter.KLINE_LAYOUT, None)
+                pending = [first]  # no header row
+            except ValueError:
+                layout = HistoryImporter.layout(first)
+                pending = []
+            
+            # Keep only the used fields of each row; rows too short for them are skipped
+            wanted, layout = HistoryImporter.compact(layout)
+            width = max(wanted)
+            short = [0]
+            
+            def complete(rows):
+                for row in rows:
+                    if len(row) > width:
+                        yield row
+                    else:
+                        short[0] += 1
+            
+            rows = map(operator.itemgetter(*wanted), complete(itertools.chain(pending, reader)))
+            while True:
+                chunk = list(itertools.islice(rows, HistoryImporter.CHUNK_ROWS))
+                if not chunk:
+                    return
+                yield layout, list(zip(*chunk)), short[0]  # transposed in C
+                short[0] = 0
+    
+    @staticmethod
+    def parquet_chunks(path):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet backfill needs pyarrow (pip install pyarrow)")
+        
+        parquet = pq.ParquetFile(path)
+        wanted, layout = HistoryImporter.compact(HistoryImporter.layout(parquet.schema_arrow.names))
+        for batch in parquet.iter_batches(batch_size=HistoryImporter.CHUNK_ROWS, columns=
+                                          [parquet.schema_arrow.names[i] for i in wanted]):
+            yield layout, [column.to_pylist() for column in batch.columns], 0
+    
+    @staticmethod
+    def to_arrays(ts_values, price_values, volume_values):
+        """(ts, price, volume) float64 arrays plus the number of unparseable or future rows"""
+        try:
+            ts = array("d", map(float, ts_values))
+            price = array("d", map(float, price_values))
+            if volume_values is not None:
+                volume = array("d", map(float, volume_values))
+            else:
+                volume = array("d", bytes(8 * len(ts)))  # zeros
+            if ts and max(ts) > 1e11:
+                ts = array("d", map(HistoryImporter.epoch_seconds, ts))  # ms or µs epochs
+            bad = 0
+        except (TypeError, ValueError):
+            # Slow path: text dates, blanks or junk rows
+            ts, price, volume = array("d"), array("d"), array("d")
+            volume_values = volume_values if volume_values is not None else itertools.repeat(0.0)
+            bad = 0
+            for t, p, v in zip(ts_values, price_values, volume_values):
+                try:
+                    row = (HistoryImporter.parse_ts(t), float(p), float(v or 0))
+                except (TypeError, ValueError):
+                    bad += 1
+                    continue
+                ts.append(row[0])
+                price.append(row[1])
+                volume.append(row[2])
+        
+        # A far-future row would sit at the ring's head and block every later sample
+        limit = Clock.time() + HistoryImporter.MAX_FUTURE
+        if ts and max(ts) > limit:
+            keep = [i for i, t in enumerate(ts) if t <= limit]
+            bad += len(ts) - len(keep)
+            ts, price, volume = (array("d", [column[i] for i in keep]) for column in (ts, price, volume))
+        return ts, price, volume, bad
+    
+    @staticmethod
+    def batches(path, symbol=None):
+        """(symbol, ts, price, volume, bad) per chunk and symbol, time-ordered"""
+        chunks = HistoryImporter.parquet_chunks if path.endswith(".parquet") else HistoryImporter.csv_chunks
+        default = symbol or HistoryImporter.symbol_of(os.path.basename(path).split(".")[0])
+        
+        for (ts_i, price_i, volume_i, symbol_i), columns, short in chunks(path):
+            volume_values = columns[volume_i] if volume_i is not None else None
+            if symbol_i is None or symbol:
+                groups = {default: (columns[ts_i], columns[price_i], volume_values)}
+            else:
+                names = columns[symbol_i]
+                symbols = {name: HistoryImporter.symbol_of(name) for name in set(names)}
+                if len(set(symbols.values())) == 1:
+                    groups = {symbols[names[0]]: (columns[ts_i], columns[price_i], volume_values)}
+                else:
+                    # Mixed-symbol chunk: split it by row index
+                    indexes = {}
+                    for i, name in enumerate(names):
+                        indexes.setdefault(symbols[name], []).append(i)
+                    groups = {
+                        name: ([columns[ts_i][i] for i in keep], [columns[price_i][i] for i in keep],
+                               [volume_values[i] for i in keep] if volume_values is not None else None)
+                        for name, keep in indexes.items()
+                    }
+            
+            for name, values in groups.items():
+                ts, price, volume, bad = HistoryImporter.to_arrays(*values)
+                bad, short = bad + short, 0
+                if ts.tolist() != sorted(ts):  # timsort makes the sorted check O(n) in C
+                    ts, price, volume = PriceRing.sort_rows(ts, price, volume)
+                yield name, ts, price, volume, bad
+    
+    @staticmethod
+    def keep_newest(held, rows, capacity):
+        """Add a sorted chunk to the held rows, keeping only the newest `capacity`"""
+        if held is None:
+            return tuple(column[-capacity:] for column in rows)  # copies
+        if rows[0][0] >= held[0][-1]:
+            # In order: append in place
+            for old, new in zip(held, rows):
+                old.extend(new)
+                del old[:-capacity]
+            return held
+        if len(held[0]) >= capacity and rows[0][-1] <= held[0][0]:
+            return held  # all older than anything the ring would keep
+        merged = sorted(itertools.chain(zip(*held), zip(*rows)))[-capacity:]
+        return tuple(array("d", column) for column in zip(*merged))
+    
+    @staticmethod
+    def run(path, symbol=None, capacity=None):
+        """Import one dump; returns row counts and throughput"""
+        started = time.perf_counter()
+        stats = {"path": path, "rows": 0, "imported": 0, "older": 0, "bad": 0, "symbols": {}}
+        held = {}  # symbol -> newest rows so far; the ring only ever takes rows newer than its head
+        for name, ts, price, volume, bad in HistoryImporter.batches(path, symbol):
+            stats["rows"] += len(ts) + bad
+            stats["bad"] += bad
+            if ts:
+                before = len(held[name][0]) if name in held else 0
+                held[name] = HistoryImporter.keep_newest(held.get(name), (ts, price, volume),
+                                                         PriceHistory.ring(name, capacity).capacity)
+                stats["older"] += before + len(ts) - len(held[name][0])
+        
+        for name, (ts, price, volume) in held.items():
+            accepted = PriceHistory.ring(name).extend(ts, price, volume)
+            stats["imported"] += accepted
+            stats["older"] += len(ts) - accepted
+            stats["symbols"][name] = accepted
+        
+        for name in stats["symbols"]:
+            IndicatorEngine._sets.pop(name, None)  # re-warm from the imported history
+        PriceHistory.flush()
+        stats["seconds"] = round(time.perf_counter() - started, 3)
+        stats["rows_per_s"] = round(stats["rows"] / max(stats["seconds"], 1e-9))
+        return stats
+    
+    @staticmethod
+    def main(argv):
+        parser = argparse.ArgumentParser(prog="bot.py backfill",
+                                         description="Import historical OHLCV dumps into price history")
+        parser.add_argument("paths", nargs="+", help="CSV, CSV.gz or Parquet files")
+        parser.add_argument("--symbol", help="symbol for files without a symbol column (default: from file name)")
+        parser.add_argument("--capacity", type=int, help="samples kept per symbol for new rings "
+                                                         f"(default {ProductionConfig.HISTORY_CAPACITY})")
+        args = parser.parse_args(argv)
+        
+        for path in args.paths:
+            stats = HistoryImporter.run(path, args.symbol, args.capacity)
+            print(f"📥 {path}: {stats['imported']:,} of {stats['rows']:,} rows imported "
+                  f"({stats['older']:,} not newer than stored history, {stats['bad']:,} unreadable or future) "
+                  f"in {stats['seconds']}s - {stats['rows_per_s']:,} rows/s")
+            for name, count in sorted(stats["symbols"].items()):
+                ring = PriceHistory.ring(name)
+                print(f"   • {name}: {count:,} rows, ring holds {len(ring):,}/{ring.capacity:,}")
+
+# ============================================================================
+# 1F. INCREMENTAL TECHNICAL INDICATORS
+# ============================================================================
+class SMA:
+    """Simple moving average over the last n values, O(1) per update"""
+    
+    def __init__(self, n):
+        self.n = n
+        self.values = deque()
+        self.total = 0.0
+        self.value = None
+    
+    def update(self, x):
+        self.values.append(x)
+        self.total += x
+        if len(self.values) > self.n:
+            self.total -= self.values.popleft()
+        if len(self.values) == self.n:
+            self.value = self.total / self.n
+        return self.value
+
+class EMA:
+    """Exponential moving average seeded with the SMA of the first n values"""
+    
+    def __init__(self, n):
+        self.n = n
+        self.alpha = 2 / (n + 1)
+        self.seed = []
+        self.value = None
+    
+    def update(self, x):
+        if self.value is None:
+            self.seed.append(x)
+            if len(self.seed) == self.n:
+                self.value = sum(self.seed) / self.n
+                self.seed = None
+            return self.value
+        self.value += self.alpha * (x - self.value)
+        return self.value
+
+class RSI:
+    """Wilder's RSI"""
+    
+    def __init__(self, n=14):
+        self.n = n
+        self.previous = None
+        self.gains = []
+        self.losses = []
+        self.avg_gain = None
+        self.avg_loss = None
+        self.value = None
+    
+    def update(self, x):
+        if self.previous is None:
+            self.previous = x
+            return None
+        change = x - self.previous
+        self.previous = x
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        
+        if self.avg_gain is None:
+            self.gains.append(gain)
+            self.losses.append(loss)
+            if len(self.gains) < self.n:
+                return None
+            self.avg_gain = sum(self.gains) / self.n
+            self.avg_loss = sum(self.losses) / self.n
+            self.gains = self.losses = None
+        else:
+            self.avg_gain = (self.avg_gain * (self.n - 1) + gain) / self.n
+            self.avg_loss = (self.avg_loss * (self.n - 1) + loss) / self.n
+        
+        if self.avg_loss == 0:
+            self.value = 100.0
+        else:
+            self.value = 100 - 100 / (1 + self.avg_gain / self.avg_loss)
+        return self.value
+
+class MACD:
+    """MACD line, signal line and histogram (12/26/9 by default)"""
+    
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+        self.value = None
+    
+    def update(self, x):
+        fast, slow = self.fast.update(x), self.slow.update(x)
+        if fast is None or slow is None:
+            return None
+        line = fast - slow
+        signal = self.signal.update(line)
+        if signal is not None:
+            self.value = {"macd": line, "signal": signal, "histogram": line - signal}
+        return self.value
+
+class Bollinger:
+    """Bollinger bands: SMA(n) +/- k standard deviations, from running sums"""
+    
+    def __init__(self, n=20, k=2.0):
+        self.n = n
+        self.k = k
+        self.values = deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.value = None
+    
+    def update(self, x):
+        self.values.append(x)
+        self.total += x
+        self.total_sq += x * x
+        if len(self.values) > self.n:
+            old = self.values.popleft()
+            self.total -= old
+            self.total_sq -= old * old
+        if len(self.values) == self.n:
+            mean = self.total / self.n
+            std = math.sqrt(max(self.total_sq / self.n - mean * mean, 0.0))
+            self.value = {"middle": mean, "upper": mean + self.k * std, "lower": mean - self.k * std}
+        return self.value
+
+class DailyPivots:
+    """Classic floor pivots from the previous local day's high, low and close"""
+    
+    def __init__(self):
+        self.day_end = None  # timestamp of the next local midnight
+        self.high = self.low = self.close = None
+        self.value = None
+    
+    @staticmethod
+    def next_midnight(ts):
+        tz = ProductionConfig.TIMEZONE
+        day = datetime.fromtimestamp(ts, tz).date() + timedelta(days=1)
+        return tz.localize(datetime(day.year, day.month, day.day)).timestamp()
+    
+    def update(self, ts, x):
+        if self.day_end is None or ts >= self.day_end:
+            if self.day_end is not None:
+                pivot = (self.high + self.low + self.close) / 3
+                spread = self.high - self.low
+                self.value = {
+                    "pivot": pivot,
+                    "r1": 2 * pivot - self.low, "s1": 2 * pivot - self.high,
+                    "r2": pivot + spread, "s2": pivot - spread
+                }
+            self.day_end = DailyPivots.next_midnight(ts)
+            self.high = self.low = x
+        else:
+            self.high = max(self.high, x)
+            self.low = min(self.low, x)
+        self.close = x
+        return self.value
+
+class IndicatorSet:
+    """Every indicator for one symbol, run on fixed-interval closes
+    
+    Samples arrive irregularly (adaptive polling, backfilled minute bars), so
+    they are resampled: a bar's last price is committed as its close once a
+    sample lands in a later bar, and empty bars repeat the previous close.
+    Pivots only need the day's high/low/close and take every sample.
+    """
+    
+    MAX_FILL = 50  # empty bars filled across a gap; longer outages are bridged
+    
+    def __init__(self, bar=None):
+        self.bar = bar or ProductionConfig.INDICATOR_BAR
+        self.sma = SMA(20)
+        self.ema = EMA(50)
+        self.rsi = RSI(14)
+        self.macd = MACD()
+        self.bollinger = Bollinger()
+        self.pivots = DailyPivots()
+        self.last_ts = None
+        self.samples = 0
+        self.bars = 0
+        self.bar_index = None  # the open bar
+        self.close = None      # its last price so far
+    
+    def update(self, ts, price):
+        """Feed one sample; out-of-order or repeated timestamps are ignored"""
+        if self.last_ts is not None and ts <= self.last_ts:
+            return False
+        self.last_ts = ts
+        self.samples += 1
+        self.pivots.update(ts, price)
+        index = int(ts // self.bar)
+        if self.bar_index is not None and index > self.bar_index:
+            for _ in range(min(index - self.bar_index, IndicatorSet.MAX_FILL)):
+                self.close_bar(self.close)
+        self.bar_index = index
+        self.close = price
+        return True
+    
+    def close_bar(self, close):
+        self.bars += 1
+        self.sma.update(close)
+        self.ema.update(close)
+        self.rsi.update(close)
+        self.macd.update(close)
+        self.bollinger.update(close)
+    
+    def snapshot(self):
+        return {
+            "samples": self.samples,
+            "bars": self.bars,
+            "sma20": self.sma.value,
+            "ema50": self.ema.value,
+            "rsi14": self.rsi.value,
+            "macd": self.macd.value,
+            "bollinger": self.bollinger.value,
+            "pivots": self.pivots.value
+        }
+
+class IndicatorEngine:
+    """Per-symbol indicator sets, warmed from PriceHistory then updated on each sample"""
+    
+    WARMUP = 14 * 86400  # history replayed on first use (seconds)
+    
+    _sets = {}
+    _lock = threading.Lock()
+    
+    @staticmethod
+    def indicators(symbol):
+        """The symbol's IndicatorSet, replaying recent history the first time"""
+        with IndicatorEngine._lock:
+            indicators = IndicatorEngine._sets.get(symbol)
+            if indicators is None:
+                indicators = IndicatorSet()
+                for ts, price, _ in PriceHistory.ring(symbol).window(Clock.time() - IndicatorEngine.WARMUP):
+                    indicators.update(ts, price)
+                IndicatorEngine._sets[symbol] = indicators
+            return indicators
+    
+    @staticmethod
+    def update(symbol, ts, price):
+        """Advance an already-loaded symbol; unloaded ones catch up from history on first use"""
+        with IndicatorEngine._lock:
+            indicators = IndicatorEngine._sets.get(symbol)
+            if indicators is not None:
+                indicators.update(ts, price)
+    
+    @staticmethod
+    def snapshot(symbol):
+        try:
+            return IndicatorEngine.indicators(symbol).snapshot()
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Indicator error ({symbol}): {e}")
+            return None
+
+# ============================================================================
+# 1G. TEMPLATE ENGINE
+# ============================================================================
+class TemplateError(ValueError):
+    """Bad template source, context or rendered markup"""
+
+class TelegramHTML:
+    """Checks for sendMessage text with parse_mode=HTML"""
+    
+    MAX_LENGTH = 4096  # after entity parsing, in UTF-16 code units
+    ALLOWED_TAGS = frozenset([
+        "b", "strong", "i", "em", "u", "ins", "s", "strike", "del",
+        "a", "code", "pre", "span", "tg-spoiler", "blockquote"
+    ])
+    MARKUP_RE = re.compile(
+        r"<(/?)([a-zA-Z][\w-]*)([^<>]*)>|[<>]|&(?!(?:lt|gt|amp|quot|#\d+|#x[0-9a-fA-F]+);)"
+    )
+    TAG_RE = re.compile(r"<[^<>]*>")
+    
+    @staticmethod
+    def visible_length(text):
+        """Length Telegram counts: tags stripped, entities decoded, UTF-16 units"""
+        plain = html.unescape(TelegramHTML.TAG_RE.sub("", text))
+        return len(plain.encode("utf-16-le")) // 2
+    
+    @staticmethod
+    def errors(text):
+        """Every problem that would make Telegram reject the message"""
+        problems = []
+        open_tags = []
+        for match in TelegramHTML.MARKUP_RE.finditer(text):
+            if match.group(2) is None:
+                problems.append(f"unescaped {match.group(0)!r} at {match.start()}")
+                continue
+            tag = match.group(2).lower()
+            if tag not in TelegramHTML.ALLOWED_TAGS:
+                problems.append(f"unsupported tag <{tag}>")
+            elif match.group(1):
+                if not open_tags or open_tags[-1] != tag:
+                    problems.append(f"unbalanced </{tag}>")
+                else:
+                    open_tags.pop()
+            else:
+                open_tags.append(tag)
+        if open_tags:
+            problems.append(f"unclosed <{open_tags[-1]}>")
+        if TelegramHTML.visible_length(text) > TelegramHTML.MAX_LENGTH:
+            problems.append(f"longer than {TelegramHTML.MAX_LENGTH} characters")
+        return problems
+    
+    @staticmethod
+    def fit(text):
+        """Drop whole trailing lines until the message fits the length limit"""
+        if TelegramHTML.visible_length(text) <= TelegramHTML.MAX_LENGTH:
+            return text
+        lines = text.split("\n")
+        while len(lines) > 1 and TelegramHTML.visible_length("\n".join(lines) + "\n…") > TelegramHTML.MAX_LENGTH:
+            lines.pop()
+        return "\n".join(lines) + "\n…"
+
+class Template:
+    """A post template compiled once into a Python render function
+    
+    Syntax: {{ path.to.value | filter }} (HTML-escaped unless | raw),
+    {% for x in items %}...{% endfor %} and {% if x %}...{% else %}...{% endif %}.
+    A line holding only a {% %} tag leaves no blank line behind.
+    """
+    
+    TOKEN_RE = re.compile(r"\{\{(.*?)\}\}|\{%(.*?)%\}", re.S)
+    BLOCK_LINE_RE = re.compile(r"^[ \t]*(\{%.*?%\})[ \t]*\n", re.M)
+    PATH_RE = re.compile(r"[A-Za-z_]\w*(?:\.\w+)*$")
+    
+    FILTERS = {
+        "money": lambda v: f"${v:,.0f}",
+        "money2": lambda v: f"${v:,.2f}",
+        "pct": lambda v: f"{v:+.1f}%",
+        "int": lambda v: f"{v:.0f}",
+        "upper": lambda v: str(v).upper(),
+        "title": lambda v: str(v).replace("_", " ").title()
+    }
+    
+    def __init__(self, name, source, fields=None):
+        self.name = name
+        self.source = source
+        self.fields = fields or {}
+        self._render = self._compile(source)
+    
+    @staticmethod
+    def escape(value):
+        return html.escape(str(value), quote=False)
+    
+    def _lookup(self, path, scope):
+        if not Template.PATH_RE.match(path):
+            raise TemplateError(f"{self.name}: bad expression {path!r}")
+        head, *rest = path.split(".")
+        code = f"v_{head}" if head in scope else f"ctx[{head!r}]"
+        for part in rest:
+            code += f"[{int(part)}]" if part.isdigit() else f"[{part!r}]"
+        return code
+    
+    def _compile(self, source):
+        source = Template.BLOCK_LINE_RE.sub(r"\1", source)
+        lines = ["def render(ctx, _filters, _escape):", " _out = []", " _emit = _out.append"]
+        depth = 1
+        scope = []
+        blocks = []
+        
+        def emit(code):
+            lines.append(" " * depth + code)
+        
+        position = 0
+        for match in Template.TOKEN_RE.finditer(source):
+            if match.start() > position:
+                emit(f"_emit({source[position:match.start()]!r})")
+            position = match.end()
+            
+            if match.group(1) is not None:
+                path, *filters = [part.strip() for part in match.group(1).split("|")]
+                code = self._lookup(path, scope)
+                escape = True
+                for name in filters:
+                    if name == "raw":
+                        escape = False
+                    elif name in Template.FILTERS:
+                        code = f"_filters[{name!r}]({code})"
+                    else:
+                        raise TemplateError(f"{self.name}: unknown filter {name!r}")
+                emit(f"_emit(_escape({code}))" if escape else f"_emit(str({code}))")
+                continue
+            
+            words = match.group(2).split()
+            keyword = words[0] if words else ""
+            if keyword == "for" and len(words) == 4 and words[2] == "in" and words[1].isidentifier():
+                emit(f"for v_{words[1]} in {self._lookup(words[3], scope)}:")
+                scope.append(words[1])
+                blocks.append("for")
+            elif keyword == "if" and len(words) == 2:
+                emit(f"if {self._lookup(words[1], scope)}:")
+                blocks.append("if")
+            elif keyword == "else" and len(words) == 1 and blocks and blocks[-1] == "if":
+                depth -= 1
+                emit("else:")
+            elif keyword in ("endfor", "endif") and len(words) == 1 and blocks and blocks[-1] == keyword[3:]:
+                if blocks.pop() == "for":
+                    scope.pop()
+                depth -= 1
+                continue
+            else:
+                raise TemplateError(f"{self.name}: bad tag {{% {match.group(2).strip()} %}}")
+            depth += 1
+            emit("pass")
+        
+        if blocks:
+            raise TemplateError(f"{self.name}: unclosed {{% {blocks[-1]} %}}")
+        if position < len(source):
+            emit(f"_emit({source[position:]!r})")
+        emit("return ''.join(_out)")
+        
+        namespace = {}
+        exec(compile("\n".join(lines), f"<template {self.name}>", "exec"), namespace)
+        return namespace["render"]
+    
+    def check(self, context):
+        """Every declared field present with its declared type"""
+        for field, kind in self.fields.items():
+            if field not in context:
+                raise TemplateError(f"{self.name}: missing field {field!r}")
+            if not isinstance(context[field], kind):
+                raise TemplateError(f"{self.name}: {field!r} is {type(context[field]).__name__}")
+    
+    def render(self, context):
+        """Rendered, length-fitted and HTML-checked post text"""
+        self.check(context)
+        try:
+            text = self._render(context, Template.FILTERS, Template.escape)
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            raise TemplateError(f"{self.name}: {e!r}") from e
+        
+        text = TelegramHTML.fit(text)
+        problems = TelegramHTML.errors(text)
+        if problems:
+            raise TemplateError(f"{self.name}: {'; '.join(problems)}")
+        return text
+
+class Templates:
+    """Compiled post templates by (name, locale); unknown locales fall back to English"""
+    
+    DEFAULT_LOCALE = "en"
+    
+    _compiled = {}
+    _lock = threading.Lock()
+    
+    @staticmethod
+    def compile_all():
+        """Compile every PostTemplates source; raises TemplateError on the first bad one"""
+        compiled = {}
+        for locale, sources in PostTemplates.SOURCES.items():
+            for name, source in sources.items():
+                compiled[(name, locale)] = Template(f"{name}.{locale}", source, PostTemplates.FIELDS.get(name))
+        with Templates._lock:
+            Templates._compiled = compiled
+        return len(compiled)
+    
+    @staticmethod
+    def get(name, locale=None):
+        if not Templates._compiled:
+            Templates.compile_all()
+        template = Templates._compiled.get((name, locale or Templates.DEFAULT_LOCALE))
+        if template is None:
+            template = Templates._compiled.get((name, Templates.DEFAULT_LOCALE))
+        if template is None:
+            raise TemplateError(f"no template {name!r}")
+        return template
+    
+    @staticmethod
+    def render(name, context, locale=None):
+        return Templates.get(name, locale).render(context)
+    
+    @staticmethod
+    def render_batch(name, context, locales):
+        """{locale: text}, rendering each distinct template once"""
+        rendered = {}
+        by_template = {}
+        for locale in locales:
+            template = Templates.get(name, locale)
+            if template not in by_template:
+                by_template[template] = template.render(context)
+            rendered[locale] = by_template[template]
+        return rendered
+
+# ============================================================================
+# 1H. CLOCK
+# ============================================================================
+class WallClock:
+    """Real time"""
+    
+    virtual = False
+    
+    def time(self):
+        return time.time()
+    
+    def monotonic(self):
+        return time.monotonic()
+    
+    def sleep(self, seconds):
+        time.sleep(max(seconds, 0))
+
+class VirtualClock:
+    """Time that only moves when told to; sleeping advances it instantly"""
+    
+    virtual = True
+    
+    def __init__(self, start=None):
+        self.now = time.time() if start is None else start
+        self._lock = threading.Lock()
+    
+    def time(self):
+        return self.now
+    
+    def monotonic(self):
+        return self.now
+    
+    def sleep(self, seconds):
+        with self._lock:
+            self.now += max(seconds, 0)
+    
+    def advance_to(self, ts):
+        """Jump forward to ts (never backwards)"""
+        with self._lock:
+            self.now = max(self.now, ts)
+    
+    @staticmethod
+    def sandboxed(url=None):
+        """True if Telegram calls (TELEGRAM_API) stay on this machine, e.g. harness.py fakes"""
+        host = urlparse(url or ProductionConfig.TELEGRAM_API).hostname or ""
+        if host == "localhost":
+            return True
+        try:
+            return ipaddress.ip_address(host).is_loopback
+        except ValueError:
+            return False
+
+class Clock:
+    """Process-wide clock for the scheduler, news monitor, caches and posting delays"""
+    
+    _current = WallClock()
+    rng = random.Random(ProductionConfig.JITTER_SEED or None)  # slot jitter and natural delays
+    
+    @staticmethod
+    def use(clock):
+        """Install clock; returns the previous one"""
+        previous, Clock._current = Clock._current, clock
+        return previous
+    
+    @staticmethod
+    def current():
+        return Clock._current
+    
+    @staticmethod
+    def is_virtual():
+        return Clock._current.virtual
+    
+    @staticmethod
+    def time():
+        return Clock._current.time()
+    
+    @staticmethod
+    def monotonic():
+        return Clock._current.monotonic()
+    
+    @staticmethod
+    def sleep(seconds):
+        Clock._current.sleep(seconds)
+    
+    @staticmethod
+    def now(tz=None):
+        """Current datetime (naive local time unless tz is given)"""
+        return datetime.fromtimestamp(Clock._current.time(), tz)
+
+# ============================================================================
+# 1I. COIN UNIVERSE
+# ============================================================================
+class CoinUniverse:
+    """Tracked coins and their ids on each price provider, indexed every way
+    
+    Built from the providers' listings for COIN_UNIVERSE, cached in
+    COIN_INDEX_PATH, and falling back to DEFAULT_COINS when discovery fails.
+    """
+    
+    DEFAULT_COINS = [
+        # symbol, name, CoinGecko id, Binance pair, CoinPaprika id
+        ("BTC", "Bitcoin", "bitcoin", "BTCUSDT", "btc-bitcoin"),
+        ("ETH", "Ethereum", "ethereum", "ETHUSDT", "eth-ethereum"),
+        ("SOL", "Solana", "solana", "SOLUSDT", "sol-solana"),
+        ("BNB", "BNB", "binancecoin", "BNBUSDT", "bnb-binance-coin"),
+        ("XRP", "XRP", "ripple", "XRPUSDT", "xrp-xrp"),
+        ("ADA", "Cardano", "cardano", "ADAUSDT", "ada-cardano"),
+        ("DOT", "Polkadot", "polkadot", "DOTUSDT", "dot-polkadot"),
+        ("DOGE", "Dogecoin", "dogecoin", "DOGEUSDT", "doge-dogecoin")
+    ]
+    
+    # Ids or pairs per request, and a cap on the joined query string
+    BATCH_LIMITS = {"coingecko": 100, "binance": 100}
+    URL_BUDGET = 1800
+    
+    _index = None
+    _lock = threading.Lock()
+    
+    @staticmethod
+    def entry(symbol, name, coingecko, binance, paprika, rank=None):
+        return {"symbol": symbol, "name": name, "coingecko": coingecko,
+                "binance": binance, "paprika": paprika, "rank": rank}
+    
+    @staticmethod
+    def index(coins, spec=""):
+        """Lookup tables over a coin list"""
+        return {
+            "spec": spec,
+            "built_at": Clock.time(),
+            "coins": coins,
+            "by_symbol": {c["symbol"]: c for c in coins},
+            "by_coingecko": {c["coingecko"]: c for c in coins if c["coingecko"]},
+            "by_binance": {c["binance"]: c for c in coins if c["binance"]},
+            "by_paprika": {c["paprika"]: c for c in coins if c["paprika"]}
+        }
+    
+    @staticmethod
+    def defaults():
+        return [CoinUniverse.entry(*coin, rank=None) for coin in CoinUniverse.DEFAULT_COINS]
+    
+    @staticmethod
+    def get():
+        """The index, loaded (or built) on first use"""
+        with CoinUniverse._lock:
+            if CoinUniverse._index is None:
+                CoinUniverse._index = CoinUniverse.load(ProductionConfig.COIN_UNIVERSE)
+            return CoinUniverse._index
+    
+    @staticmethod
+    def reset():
+        with CoinUniverse._lock:
+            CoinUniverse._index = None
+    
+    @staticmethod
+    def coins():
+        return CoinUniverse.get()["coins"]
+    
+    @staticmethod
+    def ids(provider):
+        """Every tracked coin's id on provider ("coingecko", "binance" or "paprika")"""
+        return [c[provider] for c in CoinUniverse.coins() if c[provider]]
+    
+    @staticmethod
+    def lookup(provider, value):
+        """Coin for a provider id / pair, or None"""
+        return CoinUniverse.get()[f"by_{provider}"].get(value)
+    
+    @staticmethod
+    def load(spec):
+        """Cached index if fresh and for the same spec, else built from the providers"""
+        if not spec:
+            return CoinUniverse.index(CoinUniverse.defaults())
+        
+        path = ProductionConfig.COIN_INDEX_PATH
+        try:
+            with open(path) as f:
+                cached = json.load(f)
+            if cached.get("spec") == spec and Clock.time() - cached.get("built_at", 0) < ProductionConfig.COIN_INDEX_MAX_AGE:
+                index = CoinUniverse.index(cached["coins"], spec)
+                index["built_at"] = cached["built_at"]
+                print(f"🪙 Coin index loaded: {len(index['coins'])} coins")
+                return index
+        except (OSError, ValueError, KeyError):
+            pass
+        
+        try:
+            coins = CoinUniverse.build(spec)
+        except Exception as e:
+            print(f"⚠️ Coin index build failed, using the built-in list: {e}")
+            return CoinUniverse.index(CoinUniverse.defaults())
+        
+        index = CoinUniverse.index(coins, spec)
+        try:
+            tmp = f"{path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({"spec": spec, "built_at": index["built_at"], "coins": coins}, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"⚠️ Coin index not cached: {e}")
+        print(f"🪙 Coin index built: {len(coins)} coins")
+        return index
+    
+    @staticmethod
+    def build(spec):
+        """Resolve spec against CoinPaprika ranks, then map CoinGecko ids and Binance pairs"""
+        top = int(spec.split(":", 1)[1]) if spec.startswith("top:") else None
+        wanted = None if top else [s.strip().upper() for s in spec.split(",") if s.strip()]
+        
+        # CoinPaprika tickers are rank-ordered: stream until the universe is filled
+        picked = {}
+        response = HttpTransport.get("coinpaprika", f"{ProductionConfig.COINPAPRIKA_API}/tickers", stream=True)
+        with response:
+            response.raise_for_status()
+            chunks = response.iter_content(chunk_size=RealTimeAPIs.STREAM_CHUNK_SIZE)
+            for ticker in RealTimeAPIs.iter_json_array(chunks):
+                symbol = ticker.get("symbol", "").upper()
+                if symbol in picked or (wanted is not None and symbol not in wanted):
+                    continue
+                picked[symbol] = ticker
+                if len(picked) == (top or len(wanted)):
+                    break
+        
+        response = HttpTransport.get("coingecko", f"{ProductionConfig.COINGECKO_API}/coins/list")
+        response.raise_for_status()
+        gecko = {}
+        for coin in response.json():
+            gecko.setdefault(coin["symbol"].upper(), []).append(coin)
+        
+        response = HttpTransport.get("binance", f"{ProductionConfig.BINANCE_API}/ticker/price")
+        response.raise_for_status()
+        pairs = {ticker["symbol"] for ticker in response.json()}
+        
+        known = {coin[0]: coin for coin in CoinUniverse.DEFAULT_COINS}
+        coins = []
+        for symbol, ticker in picked.items():
+            if symbol in known:
+                coins.append(CoinUniverse.entry(*known[symbol], rank=ticker.get("rank")))
+                continue
+            name = ticker.get("name", symbol)
+            slug = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+            candidates = gecko.get(symbol, [])
+            match = (next((c for c in candidates if c["name"].lower() == name.lower()), None) or
+                     next((c for c in candidates if c["id"] == slug), None))
+            coins.append(CoinUniverse.entry(
+                symbol, name, match["id"] if match else None,
+                f"{symbol}USDT" if f"{symbol}USDT" in pairs else None,
+                ticker.get("id"), rank=ticker.get("rank")
+            ))
+        return coins
+    
+    @staticmethod
+    def batches(provider, values):
+        """Split provider ids into request-sized lists (count and URL length capped)"""
+        limit = CoinUniverse.BATCH_LIMITS.get(provider, len(values) or 1)
+        batch, size = [], 0
+        for value in values:
+            if batch and (len(batch) >= limit or size + len(value) + 3 > CoinUniverse.URL_BUDGET):
+                yield batch
+                batch, size = [], 0
+            batch.append(value)
+            size += len(value) + 3  # separator and quoting
+        if batch:
+            yield batch
+
+# ============================================================================
+# 1J. PRICE CONSENSUS
+# ============================================================================
+class PriceConsensus:
+    """One price per symbol from every provider that answered, with per-source flags
+    
+    Quotes older than PRICE_STALE_AFTER are dropped as stale. Of the rest, any
+    further than PRICE_OUTLIER_PCT from the median is dropped as an outlier; when
+    that leaves no majority (two sources that disagree) the symbol is disputed and
+    left out rather than guessed.
+    """
+    
+    FLAGS = ("stale", "outlier", "disputed")
+    
+    @staticmethod
+    def median(values):
+        values = sorted(values)
+        mid = len(values) // 2
+        return values[mid] if len(values) % 2 else (values[mid - 1] + values[mid]) / 2
+    
+    @staticmethod
+    def combine(quotes, now=None, method=None):
+        """{provider: {"SYM": quote}} -> (prices, flags)
+        
+        prices: {"SYM": {"price", "change", "sources", "spread", "status", "as_of"}}
+        with status "ok", "wide" (spread above PRICE_MAX_SPREAD) or "single".
+        flags: {provider: {"stale": [SYM, ...], "outlier": [...], "disputed": [...]}}
+        """
+        now = Clock.time() if now is None else now
+        method = method or ProductionConfig.PRICE_CONSENSUS
+        stale_before = now - ProductionConfig.PRICE_STALE_AFTER
+        tolerance = ProductionConfig.PRICE_OUTLIER_PCT / 100
+        max_spread = ProductionConfig.PRICE_MAX_SPREAD / 100
+        median = PriceConsensus.median
+        
+        # Pivot to one row per symbol: [(price, change, volume, updated, provider), ...]
+        flags = {provider: {flag: [] for flag in PriceConsensus.FLAGS} for provider in quotes}
+        rows = {}
+        for provider, prices in quotes.items():
+            stale = flags[provider]["stale"]
+            for symbol, quote in (prices or {}).items():
+                price = quote.get("price")
+                if not price or price <= 0:
+                    continue
+                updated = quote.get("updated") or now
+                if updated < stale_before:
+                    stale.append(symbol)
+                    continue
+                rows.setdefault(symbol, []).append(
+                    (price, quote.get("change") or 0, quote.get("volume_24h") or 0, updated, provider)
+                )
+        
+        combined = {}
+        for symbol, row in rows.items():
+            if len(row) > 1:
+                mid = median([q[0] for q in row])
+                kept = [q for q in row if abs(q[0] - mid) <= tolerance * mid]
+                if len(kept) * 2 <= len(row):
+                    for q in row:
+                        flags[q[4]]["disputed"].append(symbol)
+                    continue
+                for q in row:
+                    if abs(q[0] - mid) > tolerance * mid:
+                        flags[q[4]]["outlier"].append(symbol)
+                row = kept
+            
+            prices = [q[0] for q in row]
+            volume = sum(q[2] for q in row)
+            if method == "vwap" and volume > 0 and all(q[2] > 0 for q in row):
+                price = sum(q[0] * q[2] for q in row) / volume
+            else:
+                price = median(prices)
+            spread = (max(prices) - min(prices)) / price
+            combined[symbol] = {
+                "price": price,
+                "change": round(median([q[1] for q in row]), 2),
+                "sources": len(row),
+                "spread": round(spread * 100, 3),
+                "status": "single" if len(row) == 1 else "wide" if spread > max_spread else "ok",
+                "as_of": max(q[3] for q in row)
+            }
+        
+        return combined, flags
+    
+    @staticmethod
+    def describe(flags):
+        """Short log text for the flagged sources, or "" """
+        parts = []
+        for provider, kinds in flags.items():
+            for flag, symbols in kinds.items():
+                if symbols:
+                    shown = ",".join(symbols[:5]) + (f" +{len(symbols) - 5}" if len(symbols) > 5 else "")
+                    parts.append(f"{provider} {flag} {shown}")
+        return "; ".join(parts)
 
 # ============================================================================
 # 2. REAL-TIME API FETCHER - WORKING APIS
@@ -52,128 +2092,406 @@ class ProductionConfig:
 class RealTimeAPIs:
     """Working APIs for real-time data"""
     
-    # Cache to avoid rate limits
-    price_cache = {}
-    price_cache_time = {}
-    CACHE_DURATION = 60  # 1 minute cache
+    # Cache to avoid rate limits (TTL per source, seconds)
+    CACHE_TTLS = {
+        "crypto_prices": 60,
+        "market_sentiment": 900,
+        "crypto_news": 300,
+        "etf_insights": 900
+    }
+    
+    # How long an expired entry may still be served while it is refreshed
+    STALE_TTLS = {
+        "crypto_prices": 900,
+        "market_sentiment": 3600,
+        "crypto_news": 1800,
+        "etf_insights": 3600
+    }
+    SERVE_STALE = True
+    
+    cache = TTLCache(max_entries=128)
+    flights = SingleFlight()
+    
+    # Validators and parsed items of the last news fetch, for conditional requests
+    _news_validators = {}
+    _refreshing = set()
+    _refresh_lock = threading.Lock()
+    
+    # Read size for streamed payloads
+    STREAM_CHUNK_SIZE = 64 * 1024
+    
+    # Concurrent requests per provider when the universe spans several batches
+    BATCH_WORKERS = 4
+    HEDGE_MIN_COVERAGE = 0.9  # share of the coin list a hedged answer must cover to win
+    
+    @staticmethod
+    def cached(key, fetch):
+        """Serve key from cache, or fetch it and cache any live result"""
+        value, fresh = RealTimeAPIs.cache.get_stale(key, allow_stale=RealTimeAPIs.SERVE_STALE)
+        if value is not None:
+            if fresh:
+                print(f"📊 Using cached {key.replace('_', ' ')}")
+            else:
+                # Stale-while-revalidate: answer now, refresh off the hot path
+                print(f"♻️ Serving stale {key.replace('_', ' ')}, refreshing in background")
+                RealTimeAPIs.refresh_async(key, fetch)
+            return value
+        
+        return RealTimeAPIs.refresh(key, fetch)
+    
+    @staticmethod
+    def refresh(key, fetch):
+        """Fetch key now and cache it if live; concurrent callers share one fetch"""
+        def fetch_and_store():
+            # A flight that just landed may already have filled the cache
+            value = RealTimeAPIs.cache.get(key)
+            if value is not None:
+                return value
+            
+            value = fetch()
+            if value:
+                RealTimeAPIs.cache.set(
+                    key, value,
+                    ttl=RealTimeAPIs.CACHE_TTLS.get(key),
+                    stale_ttl=RealTimeAPIs.STALE_TTLS.get(key, 0)
+                )
+            return value
+        
+        return RealTimeAPIs.flights.do(key, fetch_and_store)
+    
+    @staticmethod
+    def refresh_async(key, fetch):
+        """Refresh key on a background thread unless one is already running"""
+        if Clock.is_virtual():
+            # No background work in virtual time: runs stay deterministic
+            RealTimeAPIs.refresh(key, fetch)
+            return
+        
+        with RealTimeAPIs._refresh_lock:
+            if key in RealTimeAPIs._refreshing:
+                return
+            RealTimeAPIs._refreshing.add(key)
+        
+        def run():
+            try:
+                RealTimeAPIs.refresh(key, fetch)
+            except Exception as e:
+                print(f"⚠️ Background refresh error ({key}): {e}")
+            finally:
+                with RealTimeAPIs._refresh_lock:
+                    RealTimeAPIs._refreshing.discard(key)
+        
+        threading.Thread(target=run, name=f"refresh-{key}", daemon=True).start()
     
     @staticmethod
     def get_crypto_prices():
-        """Get REAL prices from working APIs"""
-        cache_key = "crypto_prices"
-        current_time = time.time()
+        """Get REAL prices from working APIs, else the last recorded ones (never made up)"""
+        prices = RealTimeAPIs.cached("crypto_prices", RealTimeAPIs.fetch_crypto_prices)
+        if prices:
+            return prices
+        
+        # Final fallback: the newest recorded prices, marked status="last_known"
+        Metrics.fallback("crypto_prices")
+        prices = RealTimeAPIs.last_known_prices()
+        print(f"⚠️ No live prices; {len(prices)} last known" if prices else "⚠️ No live or recent prices")
+        return prices or None
+    
+    @staticmethod
+    def last_known_prices(max_age=None):
+        """Newest recorded price per universe coin, if within PRICE_LAST_KNOWN_MAX_AGE"""
+        max_age = ProductionConfig.PRICE_LAST_KNOWN_MAX_AGE if max_age is None else max_age
+        now = Clock.time()
+        prices = {}
+        for coin in CoinUniverse.coins():
+            symbol = coin["symbol"]
+            path = os.path.join(ProductionConfig.HISTORY_DIR, f"{symbol}.ring")
+            if symbol not in PriceHistory._rings and not os.path.exists(path):
+                continue  # Don't create empty rings for coins never recorded
+            try:
+                ring = PriceHistory.ring(symbol)
+                latest = ring.latest()
+                if latest is None or now - latest[0] > max_age:
+                    continue
+                ts, price = latest
+                day_ago = ring.price_at(ts - 86400)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Price history error ({symbol}): {e}")
+                continue
+            prices[symbol] = {
+                "price": price,
+                "change": round((price / day_ago - 1) * 100, 2) if day_ago else 0,
+                "sources": 0,
+                "status": "last_known",
+                "as_of": ts
+            }
+        return prices
+    
+    @staticmethod
+    def fetch_crypto_prices():
+        """Live prices from the configured providers, or None"""
+        try:
+            if ProductionConfig.PRICE_FETCH_MODE == "consensus":
+                prices = RealTimeAPIs.fetch_prices_consensus(ProductionConfig.PRICE_FETCH_DEADLINE)
+            elif ProductionConfig.PRICE_FETCH_MODE == "hedged":
+                prices = RealTimeAPIs.fetch_prices_hedged(ProductionConfig.PRICE_FETCH_DEADLINE)
+            else:
+                prices = RealTimeAPIs.fetch_prices_sequential()
+            if prices:
+                try:
+                    PriceHistory.record(prices)
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ Price history not recorded: {e}")
+            return prices
+        except Exception as e:
+            print(f"❌ API error: {e}")
+        return None
+    
+    @staticmethod
+    def price_providers():
+        """Price providers in preference order: (name, fetcher, timeout)"""
+        return [
+            ("CoinGecko", RealTimeAPIs.get_coingecko_prices, HttpTransport.TIMEOUTS["coingecko"]),
+            ("Binance", RealTimeAPIs.get_binance_prices, HttpTransport.TIMEOUTS["binance"]),
+            ("CoinPaprika", RealTimeAPIs.get_coinpaprika_prices, HttpTransport.TIMEOUTS["coinpaprika"])
+        ]
+    
+    @staticmethod
+    def fetch_prices_sequential():
+        """Try each provider in turn until one answers"""
+        for name, fetcher, timeout in RealTimeAPIs.price_providers():
+            prices = fetcher(timeout=timeout)
+            if prices:
+                Metrics.inc("price_provider_wins_total", provider=name)
+                return prices
+            print(f"⚠️ {name} failed, trying next provider...")
+        return None
+    
+    @staticmethod
+    def fetch_prices_hedged(deadline):
+        """Query all providers at once; the first that covers the coin list wins
+        
+        Answers covering less than HEDGE_MIN_COVERAGE of the coins are merged, and
+        the merge is returned once it covers enough, at the deadline, or when every
+        provider has answered.
+        """
+        wanted = len(CoinUniverse.coins())
+        needed = math.ceil(wanted * RealTimeAPIs.HEDGE_MIN_COVERAGE)
+        merged = {}
+        providers = RealTimeAPIs.price_providers()
+        pool = ThreadPoolExecutor(max_workers=len(providers), thread_name_prefix="price-fetch")
+        futures = {
+            pool.submit(fetcher, timeout=min(timeout, deadline)): name
+            for name, fetcher, timeout in providers
+        }
+        
+        try:
+            for future in as_completed(futures, timeout=deadline):
+                try:
+                    prices = future.result()
+                except Exception as e:
+                    print(f"⚠️ {futures[future]} error: {e}")
+                    continue
+                if not prices:
+                    continue
+                if len(prices) >= needed:
+                    print(f"🏁 {futures[future]} answered first")
+                    Metrics.inc("price_provider_wins_total", provider=futures[future])
+                    return prices
+                
+                print(f"⚠️ {futures[future]} covered {len(prices)}/{wanted} coins, waiting for more")
+                for symbol, quote in prices.items():
+                    merged.setdefault(symbol, quote)
+                if len(merged) >= needed:
+                    break
+        except FuturesTimeout:
+            print(f"⚠️ No full price answer within {deadline:.0f}s")
+        finally:
+            # Drop the losers; in-flight requests finish on their own timeout
+            for future in futures:
+                future.cancel()
+            pool.shutdown(wait=False)
+        
+        if merged:
+            Metrics.inc("price_provider_wins_total", provider="merged")
+            print(f"🧩 Merged partial answers: {len(merged)}/{wanted} coins")
+        return merged or None
+    
+    @staticmethod
+    def fetch_prices_consensus(deadline, grace=None):
+        """Query all providers at once and combine what arrives (PriceConsensus)
         
-        # Check cache first
-        if (cache_key in RealTimeAPIs.price_cache and 
-            current_time - RealTimeAPIs.price_cache_time.get(cache_key, 0) < RealTimeAPIs.CACHE_DURATION):
-            print("📊 Using cached prices")
-            return RealTimeAPIs.price_cache[cache_key]
+        Collection stops at the deadline, or `grace` seconds after the first
+        provider answers, so one slow provider can't hold the post back.
+        """
+        grace = ProductionConfig.PRICE_CONSENSUS_GRACE if grace is None else grace
+        providers = RealTimeAPIs.price_providers()
+        pool = ThreadPoolExecutor(max_workers=len(providers), thread_name_prefix="price-fetch")
+        futures = {
+            pool.submit(fetcher, timeout=min(timeout, deadline)): name
+            for name, fetcher, timeout in providers
+        }
+        
+        quotes = {}
+        ends = time.monotonic() + deadline
+        pending = set(futures)
+        try:
+            while pending:
+                remaining = ends - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        prices = future.result()
+                    except Exception as e:
+                        print(f"⚠️ {futures[future]} error: {e}")
+                        continue
+                    if prices:
+                        if not quotes:
+                            ends = min(ends, time.monotonic() + grace)
+                        quotes[futures[future]] = prices
+        finally:
+            for future in pending:
+                future.cancel()
+            pool.shutdown(wait=False)
+        
+        if pending:
+            print(f"⚠️ No answer in time from: {', '.join(sorted(futures[f] for f in pending))}")
+        if not quotes:
+            return None
+        
+        prices, flags = PriceConsensus.combine(quotes)
+        for provider, kinds in flags.items():
+            for flag, symbols in kinds.items():
+                if symbols:
+                    Metrics.inc("price_source_flags_total", len(symbols), provider=provider, flag=flag)
+        for provider in quotes:
+            Metrics.inc("price_provider_wins_total", provider=provider)
+        for quote in prices.values():
+            Metrics.inc("price_consensus_total", status=quote["status"])
+        
+        flagged = PriceConsensus.describe(flags)
+        print(f"⚖️ Consensus of {'/'.join(quotes)}: {len(prices)} coins" + (f" (flagged: {flagged})" if flagged else ""))
+        return prices or None
+    
+    @staticmethod
+    def quote_time(value):
+        """Provider timestamp (epoch s/ms or ISO text) as epoch seconds, or None"""
+        try:
+            return HistoryImporter.parse_ts(value) if value not in (None, "") else None
+        except (TypeError, ValueError):
+            return None
+    
+    @staticmethod
+    def fetch_batches(fetch_batch, batches, provider="provider"):
+        """Merged results of the batches that succeeded, or None if all failed
+        
+        A failed batch (fetch_batch returned None) only loses its own coins; they
+        are logged and counted so consensus knows the coverage is partial.
+        """
+        batches = list(batches)
+        if len(batches) <= 1:
+            results = [fetch_batch(batch) for batch in batches]
+        else:
+            workers = min(len(batches), RealTimeAPIs.BATCH_WORKERS)
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="price-batch") as pool:
+                results = list(pool.map(fetch_batch, batches))
         
+        merged = {}
+        failed = []
+        for batch, result in zip(batches, results):
+            if result is None:
+                failed.append(batch)
+            else:
+                merged.update(result)
+        if failed:
+            lost = sum(len(batch) for batch in failed)
+            Metrics.inc("price_batch_failures_total", len(failed), provider=provider)
+            print(f"⚠️ {provider}: {len(failed)}/{len(batches)} batches failed, {lost} coins missing "
+                  f"(first: {', '.join(failed[0][:3])})")
+        if len(failed) == len(batches):
+            return None
+        return merged
+    
+    @staticmethod
+    def get_coingecko_prices(timeout=None):
+        """Primary: CoinGecko API (Most reliable free API)"""
         try:
-            # METHOD 1: CoinGecko API (Most reliable free API)
             print("📡 Fetching real prices from CoinGecko...")
-            url = "https://api.coingecko.com/api/v3/simple/price"
-            params = {
-                "ids": "bitcoin,ethereum,solana,bnb,ripple,cardano,polkadot,dogecoin",
-                "vs_currencies": "usd",
-                "include_24hr_change": "true",
-                "include_market_cap": "false",
-                "include_24hr_vol": "false",
-                "precision": 2
-            }
-            
+            url = f"{ProductionConfig.COINGECKO_API}/simple/price"
             headers = {
                 "User-Agent": "Mozilla/5.0",
                 "Accept": "application/json"
             }
             
-            response = requests.get(url, params=params, headers=headers, timeout=15)
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Map CoinGecko IDs to symbols
-                price_map = {
-                    "bitcoin": "BTC",
-                    "ethereum": "ETH",
-                    "solana": "SOL",
-                    "bnb": "BNB",
-                    "ripple": "XRP",
-                    "cardano": "ADA",
-                    "polkadot": "DOT",
-                    "dogecoin": "DOGE"
+            def fetch_batch(ids):
+                params = {
+                    "ids": ",".join(ids),
+                    "vs_currencies": "usd",
+                    "include_24hr_change": "true",
+                    "include_market_cap": "false",
+                    "include_24hr_vol": "true",
+                    "include_last_updated_at": "true",
+                    "precision": "full"
                 }
+                response = HttpTransport.get("coingecko", url, params=params, headers=headers, timeout=timeout)
+                if response.status_code != 200:
+                    print(f"⚠️ CoinGecko batch of {len(ids)} failed: HTTP {response.status_code}")
+                    return None
                 
                 prices = {}
-                for coin_id, coin_data in data.items():
-                    symbol = price_map.get(coin_id)
-                    if symbol and "usd" in coin_data:
-                        prices[symbol] = {
+                for coin_id, coin_data in response.json().items():
+                    coin = CoinUniverse.lookup("coingecko", coin_id)
+                    if coin and "usd" in coin_data:
+                        prices[coin["symbol"]] = {
                             "price": coin_data["usd"],
-                            "change": round(coin_data.get("usd_24h_change", 0), 2)
+                            "change": round(coin_data.get("usd_24h_change") or 0, 2),
+                            "volume_24h": coin_data.get("usd_24h_vol") or 0,
+                            "updated": RealTimeAPIs.quote_time(coin_data.get("last_updated_at"))
                         }
-                
-                if prices:
-                    RealTimeAPIs.price_cache[cache_key] = prices
-                    RealTimeAPIs.price_cache_time[cache_key] = current_time
-                    print(f"✅ Real prices fetched: BTC=${prices.get('BTC', {}).get('price', 0):,.0f}")
-                    return prices
-            
-            print("⚠️ CoinGecko failed, trying Binance...")
-            
-            # METHOD 2: Binance API (Fallback)
-            binance_prices = RealTimeAPIs.get_binance_prices()
-            if binance_prices:
-                RealTimeAPIs.price_cache[cache_key] = binance_prices
-                RealTimeAPIs.price_cache_time[cache_key] = current_time
-                return binance_prices
-            
-            # METHOD 3: CoinPaprika API (Second fallback)
-            paprika_prices = RealTimeAPIs.get_coinpaprika_prices()
-            if paprika_prices:
-                RealTimeAPIs.price_cache[cache_key] = paprika_prices
-                RealTimeAPIs.price_cache_time[cache_key] = current_time
-                return paprika_prices
+                return prices
             
+            prices = RealTimeAPIs.fetch_batches(
+                fetch_batch, CoinUniverse.batches("coingecko", CoinUniverse.ids("coingecko")), "CoinGecko"
+            )
+            if prices:
+                print(f"✅ Real prices fetched: BTC=${prices.get('BTC', {}).get('price', 0):,.0f}")
+                return prices
+                    
         except Exception as e:
-            print(f"❌ API error: {e}")
+            print(f"⚠️ CoinGecko error: {e}")
         
-        # Final fallback: Use realistic data with timestamp
-        print("⚠️ Using fallback data")
-        fallback = {
-            "BTC": {"price": 65000 + random.randint(-500, 500), "change": random.uniform(-3, 5)},
-            "ETH": {"price": 3500 + random.randint(-50, 50), "change": random.uniform(-3, 5)},
-            "SOL": {"price": 180 + random.randint(-5, 5), "change": random.uniform(-5, 8)},
-            "BNB": {"price": 580 + random.randint(-10, 10), "change": random.uniform(-2, 4)}
-        }
-        return fallback
+        return None
     
     @staticmethod
-    def get_binance_prices():
-        """Fallback: Binance API"""
+    def get_binance_prices(timeout=None):
+        """Fallback: Binance API (up to BATCH_LIMITS pairs per request)"""
         try:
-            symbols = {
-                "BTCUSDT": "BTC",
-                "ETHUSDT": "ETH",
-                "SOLUSDT": "SOL",
-                "BNBUSDT": "BNB",
-                "XRPUSDT": "XRP",
-                "ADAUSDT": "ADA"
-            }
+            url = f"{ProductionConfig.BINANCE_API}/ticker/24hr"
             
-            prices = {}
-            for symbol, coin in symbols.items():
-                url = f"https://api.binance.com/api/v3/ticker/24hr"
-                params = {"symbol": symbol}
-                response = requests.get(url, params=params, timeout=5)
+            def fetch_batch(pairs):
+                # One request per batch: symbols=["BTCUSDT","ETHUSDT",...]
+                params = {"symbols": json.dumps(pairs, separators=(",", ":"))}
+                response = HttpTransport.get("binance", url, params=params, timeout=timeout)
+                if response.status_code != 200:
+                    print(f"⚠️ Binance batch of {len(pairs)} failed: HTTP {response.status_code}")
+                    return None
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    prices[coin] = {
-                        "price": round(float(data["lastPrice"]), 2),
-                        "change": round(float(data["priceChangePercent"]), 2)
-                    }
+                prices = {}
+                for ticker in response.json():
+                    coin = CoinUniverse.lookup("binance", ticker.get("symbol"))
+                    if coin:
+                        prices[coin["symbol"]] = {
+                            "price": float(ticker["lastPrice"]),
+                            "change": round(float(ticker["priceChangePercent"]), 2),
+                            "volume_24h": float(ticker.get("quoteVolume") or 0),
+                            "updated": RealTimeAPIs.quote_time(ticker.get("closeTime"))
+                        }
+                return prices
             
+            prices = RealTimeAPIs.fetch_batches(
+                fetch_batch, CoinUniverse.batches("binance", CoinUniverse.ids("binance")), "Binance"
+            )
             if prices:
                 print(f"✅ Binance prices: {len(prices)} coins")
                 return prices
@@ -184,26 +2502,35 @@ class RealTimeAPIs:
         return None
     
     @staticmethod
-    def get_coinpaprika_prices():
-        """Third fallback: CoinPaprika API"""
+    def get_coinpaprika_prices(timeout=None):
+        """Third fallback: CoinPaprika API (streamed, stops once the universe is found)"""
         try:
-            url = "https://api.coinpaprika.com/v1/tickers"
-            response = requests.get(url, timeout=10)
+            url = f"{ProductionConfig.COINPAPRIKA_API}/tickers"
+            response = HttpTransport.get("coinpaprika", url, timeout=timeout, stream=True)
             
-            if response.status_code == 200:
-                data = response.json()
+            with response:
+                if response.status_code != 200:
+                    return None
                 
-                # Find top coins
-                target_coins = {"BTC", "ETH", "SOL", "BNB"}
+                wanted = len(CoinUniverse.coins())
                 prices = {}
                 
-                for coin in data:
-                    symbol = coin["symbol"]
-                    if symbol in target_coins:
-                        prices[symbol] = {
-                            "price": round(coin["quotes"]["USD"]["price"], 2),
-                            "change": round(coin["quotes"]["USD"]["percent_change_24h"], 2)
+                # One request covers every coin; the list is ordered by rank, so for
+                # tickers without a known id the first symbol match is the real coin
+                chunks = response.iter_content(chunk_size=RealTimeAPIs.STREAM_CHUNK_SIZE)
+                for ticker in RealTimeAPIs.iter_json_array(chunks):
+                    coin = (CoinUniverse.lookup("paprika", ticker.get("id")) or
+                            CoinUniverse.lookup("symbol", ticker.get("symbol")))
+                    if coin and coin["symbol"] not in prices:
+                        usd = ticker["quotes"]["USD"]
+                        prices[coin["symbol"]] = {
+                            "price": usd["price"],
+                            "change": round(usd["percent_change_24h"], 2),
+                            "volume_24h": usd.get("volume_24h") or 0,
+                            "updated": RealTimeAPIs.quote_time(ticker.get("last_updated"))
                         }
+                        if len(prices) == wanted:
+                            break  # Stop reading the rest of the payload
                 
                 if prices:
                     print(f"✅ CoinPaprika prices: {len(prices)} coins")
@@ -214,27 +2541,53 @@ class RealTimeAPIs:
         
         return None
     
+    @staticmethod
+    def iter_json_array(chunks):
+        """Yield elements of a top-level JSON array as its bytes arrive"""
+        decoder = json.JSONDecoder()
+        utf8 = codecs.getincrementaldecoder("utf-8")()
+        buffer = ""
+        pos = 0
+        started = False
+        
+        for chunk in chunks:
+            buffer = buffer[pos:] + utf8.decode(chunk)
+            pos = 0
+            
+            while True:
+                while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                    pos += 1
+                if pos >= len(buffer):
+                    break
+                
+                if not started:
+                    if buffer[pos] != "[":
+                        raise ValueError("expected a JSON array")
+                    started = True
+                    pos += 1
+                    continue
+                
+                if buffer[pos] == "]":
+                    return
+                
+                try:
+                    item, pos = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    break  # Element continues in the next chunk
+                yield item
+        
+        raise ValueError("truncated JSON array")
+    
     @staticmethod
     def get_market_sentiment():
         """Get Fear & Greed Index - Working API"""
-        try:
-            url = "https://api.alternative.me/fng/?limit=1"
-            response = requests.get(url, timeout=5)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data["data"]:
-                    fgi = data["data"][0]
-                    return {
-                        "value": int(fgi["value"]),
-                        "sentiment": fgi["value_classification"],
-                        "timestamp": fgi["timestamp"]
-                    }
-        except Exception as e:
-            print(f"⚠️ FGI error: {e}")
+        sentiment = RealTimeAPIs.cached("market_sentiment", RealTimeAPIs.fetch_market_sentiment)
+        if sentiment:
+            return sentiment
         
         # Realistic fallback based on time of day
-        hour = datetime.now().hour
+        Metrics.fallback("market_sentiment")
+        hour = Clock.now().hour
         if 6 <= hour < 12:
             value = random.randint(55, 70)  # Morning optimism
         elif 12 <= hour < 18:
@@ -248,47 +2601,38 @@ class RealTimeAPIs:
         elif value < 40:
             sentiment = "Fear"
         
-        return {"value": value, "sentiment": sentiment, "timestamp": int(time.time())}
+        return {"value": value, "sentiment": sentiment, "timestamp": int(Clock.time()), "estimate": True}
     
     @staticmethod
-    def get_crypto_news():
-        """Get latest crypto news - Working API"""
+    def fetch_market_sentiment():
+        """Live Fear & Greed Index, or None"""
         try:
-            # CryptoPanic API (Free tier, no key needed for public feed)
-            url = "https://cryptopanic.com/api/v1/posts/"
-            params = {
-                "public": "true",
-                "kind": "news",
-                "filter": "rising",  # or "hot" for important news
-                "currencies": "BTC,ETH"
-            }
-            
-            headers = {
-                "User-Agent": "Mozilla/5.0",
-                "Accept": "application/json"
-            }
-            
-            response = requests.get(url, params=params, headers=headers, timeout=10)
+            url = f"{ProductionConfig.FGI_API}/fng/"
+            response = HttpTransport.get("fgi", url, params={"limit": 1})
             
             if response.status_code == 200:
                 data = response.json()
-                if data.get("results"):
-                    # Get 3 latest news items
-                    news_items = []
-                    for item in data["results"][:3]:
-                        news_items.append({
-                            "title": item.get("title", "Crypto Market Update"),
-                            "source": item.get("source", {}).get("title", "Crypto News"),
-                            "url": item.get("url", ""),
-                            "votes": item.get("votes", {}).get("positive", 0)
-                        })
-                    print(f"✅ News fetched: {len(news_items)} items")
-                    return news_items
-                    
+                if data["data"]:
+                    fgi = data["data"][0]
+                    return {
+                        "value": int(fgi["value"]),
+                        "sentiment": fgi["value_classification"],
+                        "timestamp": fgi["timestamp"]
+                    }
         except Exception as e:
-            print(f"⚠️ News API error: {e}")
+            print(f"⚠️ FGI error: {e}")
+        
+        return None
+    
+    @staticmethod
+    def get_crypto_news(limit=3):
+        """Get latest crypto news - Working API"""
+        news_items = RealTimeAPIs.get_news_feed()
+        if news_items:
+            return news_items[:limit]
         
         # Fallback news
+        Metrics.fallback("crypto_news")
         fallback_news = [
             {
                 "title": "Bitcoin maintains strength above $65,000 support level",
@@ -311,12 +2655,130 @@ class RealTimeAPIs:
         ]
         return fallback_news
     
+    @staticmethod
+    def get_news_feed():
+        """Every live item on the first NEWS_FEED_PAGES feed pages, or None"""
+        return RealTimeAPIs.cached("crypto_news", RealTimeAPIs.fetch_crypto_news)
+    
+    @staticmethod
+    def poll_news_feed():
+        """Re-fetch the news feed now, ignoring the TTL; unchanged feeds cost a 304"""
+        def fetch_and_store():
+            value = RealTimeAPIs.fetch_crypto_news()
+            if value:
+                RealTimeAPIs.cache.set(
+                    "crypto_news", value,
+                    ttl=RealTimeAPIs.CACHE_TTLS["crypto_news"],
+                    stale_ttl=RealTimeAPIs.STALE_TTLS["crypto_news"]
+                )
+            return value
+        
+        return RealTimeAPIs.flights.do("crypto_news", fetch_and_store)
+    
+    @staticmethod
+    def fetch_crypto_news(pages=None):
+        """Live CryptoPanic headlines, or None"""
+        pages = pages or ProductionConfig.NEWS_FEED_PAGES
+        try:
+            # CryptoPanic API (Free tier, no key needed for public feed)
+            url = f"{ProductionConfig.CRYPTOPANIC_API}/posts/"
+            params = {
+                "public": "true",
+                "kind": "news",
+                "filter": "rising",  # or "hot" for important news
+                "currencies": "BTC,ETH"
+            }
+            
+            headers = {
+                "User-Agent": "Mozilla/5.0",
+                "Accept": "application/json"
+            }
+            
+            # Ask for the first page only if it changed since the last fetch
+            last = RealTimeAPIs._news_validators
+            if last.get("items"):
+                if last.get("etag"):
+                    headers["If-None-Match"] = last["etag"]
+                if last.get("last_modified"):
+                    headers["If-Modified-Since"] = last["last_modified"]
+            
+            news_items = []
+            validators = {}
+            for page in range(pages):
+                response = HttpTransport.get("cryptopanic", url, params=params, headers=headers)
+                if page == 0 and response.status_code == 304:
+                    HttpTransport.count("news_not_modified")
+                    print("📰 News feed unchanged")
+                    return last["items"]
+                if response.status_code != 200:
+                    break
+                if page == 0:
+                    validators = {
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified")
+                    }
+                    headers.pop("If-None-Match", None)
+                    headers.pop("If-Modified-Since", None)
+                
+                data = response.json()
+                for item in data.get("results") or []:
+                    votes = item.get("votes", {})
+                    news_items.append({
+                        "id": item.get("id"),
+                        "title": item.get("title", "Crypto Market Update"),
+                        "source": item.get("source", {}).get("title", "Crypto News"),
+                        "domain": item.get("source", {}).get("domain", ""),
+                        "url": item.get("url", ""),
+                        "published_at": item.get("published_at", ""),
+                        "votes": votes.get("positive", 0),
+                        "important": votes.get("important", 0)
+                    })
+                
+                # Follow the feed's own pagination link
+                url, params = data.get("next"), None
+                if not url:
+                    break
+            
+            if news_items:
+                print(f"✅ News fetched: {len(news_items)} items")
+                if validators.get("etag") or validators.get("last_modified"):
+                    validators["items"] = news_items
+                    RealTimeAPIs._news_validators = validators
+                return news_items
+                    
+        except Exception as e:
+            print(f"⚠️ News API error: {e}")
+        
+        return None
+    
     @staticmethod
     def get_etf_insights():
         """Get ETF insights (combine news with data)"""
+        etf_data = RealTimeAPIs.cached("etf_insights", RealTimeAPIs.fetch_etf_insights)
+        if etf_data:
+            return etf_data
+        
+        # Fallback ETF insights
+        Metrics.fallback("etf_insights")
+        etf_updates = [
+            "Bitcoin ETF inflows continue positive streak for 15+ consecutive days",
+            "Institutional ETF purchases reaching new monthly records",
+            "Global crypto ETF assets under management surpass $50 billion",
+            "New ETF applications indicate growing institutional demand"
+        ]
+        
+        return {
+            "update": random.choice(etf_updates),
+            "source": "ETF Market Data",
+            "sentiment": random.choice(["Positive", "Strong", "Bullish"])
+        }
+    
+    @staticmethod
+    def fetch_etf_insights():
+        """Live ETF headline from CryptoPanic, or None"""
         try:
             # Use news API to get ETF-related news
-            url = "https://cryptopanic.com/api/v1/posts/"
+            url = f"{ProductionConfig.CRYPTOPANIC_API}/posts/"
             params = {
                 "public": "true",
                 "kind": "news",
@@ -324,7 +2786,7 @@ class RealTimeAPIs:
                 "q": "ETF"  # Search for ETF news
             }
             
-            response = requests.get(url, params=params, timeout=5)
+            response = HttpTransport.get("cryptopanic", url, params=params, timeout=5)
             
             if response.status_code == 200:
                 data = response.json()
@@ -344,19 +2806,7 @@ class RealTimeAPIs:
         except:
             pass
         
-        # Fallback ETF insights
-        etf_updates = [
-            "Bitcoin ETF inflows continue positive streak for 15+ consecutive days",
-            "Institutional ETF purchases reaching new monthly records",
-            "Global crypto ETF assets under management surpass $50 billion",
-            "New ETF applications indicate growing institutional demand"
-        ]
-        
-        return {
-            "update": random.choice(etf_updates),
-            "source": "ETF Market Data",
-            "sentiment": random.choice(["Positive", "Strong", "Bullish"])
-        }
+        return None
     
     @staticmethod
     def get_india_crypto_updates():
@@ -379,44 +2829,375 @@ class RealTimeAPIs:
             "sentiment": random.choice(["Growing", "Progressing", "Expanding"])
         }
 
+# ============================================================================
+# 2B. MARKET DATA PER SLOT
+# ============================================================================
+class MarketDataRefresher:
+    """Which market data each slot's post reads; PostStager refreshes it before rendering"""
+    
+    LEAD_MINUTES = 2
+    
+    # Schedule slot -> cache keys its post reads
+    SLOT_DATA = {
+        "market_open": ["crypto_prices", "market_sentiment"],
+        "global_news": ["crypto_news", "etf_insights"],
+        "good_night": ["crypto_prices"]
+    }
+    
+    @staticmethod
+    def fetchers():
+        return {
+            "crypto_prices": RealTimeAPIs.fetch_crypto_prices,
+            "market_sentiment": RealTimeAPIs.fetch_market_sentiment,
+            "crypto_news": RealTimeAPIs.fetch_crypto_news,
+            "etf_insights": RealTimeAPIs.fetch_etf_insights
+        }
+
 # ============================================================================
 # 3. BREAKING NEWS MONITOR
 # ============================================================================
+class SeenStoryIndex:
+    """Rolling-window index of seen headlines with near-duplicate detection
+    
+    Exact repeats are found through a hash map keyed on the normalised
+    title. Rephrased headlines are caught with MinHash over the title's
+    word set: the signature is split into bands and only stories sharing
+    a band (newest MAX_CANDIDATES per band) are compared, so a lookup
+    costs the same at 100 or 100k stories. Entries live in hourly
+    buckets and expire with the window, or early once the index holds
+    max_entries stories.
+    """
+    
+    NUM_HASHES = 24
+    ROWS_PER_BAND = 4
+    MAX_CANDIDATES = 16
+    NEAR_DUPLICATE_JACCARD = 0.65
+    TOKEN_RE = re.compile(r"[a-z0-9]+")
+    STOPWORDS = frozenset("a an the of to in on for as and or is are at by with from after over".split())
+    SEEDS = [int.from_bytes(hashlib.blake2b(f"minhash-{i}".encode(), digest_size=8).digest(), "big")
+             for i in range(NUM_HASHES)]
+    
+    def __init__(self, window=48 * 3600, bucket_size=3600, max_entries=5000):
+        self.window = window
+        self.bucket_size = bucket_size
+        self.max_entries = max_entries
+        self._buckets = OrderedDict()  # bucket -> [exact, ...]
+        self._entries = {}             # exact -> (newest bucket, signature bytes)
+        self._bands = {}               # band key -> exact, or {exact: None} once shared
+        self._lock = threading.Lock()
+        self.journal = None            # SeenStoryStore told of every insert and expiry
+        self.stats = {"exact_hits": 0, "near_hits": 0, "added": 0, "expired": 0}
+    
+    @staticmethod
+    def hash64(text):
+        return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "big")
+    
+    @staticmethod
+    def fingerprint(title):
+        """(exact hash, MinHash signature as packed 32-bit values) for a headline"""
+        tokens = SeenStoryIndex.TOKEN_RE.findall(title.lower())
+        exact = SeenStoryIndex.hash64(" ".join(tokens))
+        
+        words = {SeenStoryIndex.hash64(t) for t in tokens if t not in SeenStoryIndex.STOPWORDS}
+        if not words:
+            return exact, None
+        signature = array("I", (min(map(seed.__xor__, words)) & 0xFFFFFFFF
+                                for seed in SeenStoryIndex.SEEDS))
+        return exact, signature.tobytes()
+    
+    @staticmethod
+    def band_keys(signature):
+        width = SeenStoryIndex.ROWS_PER_BAND * 4
+        return [hash(signature[start:start + width]) ^ start
+                for start in range(0, len(signature), width)]
+    
+    @staticmethod
+    def similarity(a, b):
+        """Estimated Jaccard similarity of two signatures"""
+        a, b = memoryview(a).cast("I"), memoryview(b).cast("I")
+        return sum(x == y for x, y in zip(a, b)) / len(a)
+    
+    def _band_add(self, key, exact):
+        members = self._bands.get(key)
+        if members is None:
+            self._bands[key] = exact
+        elif isinstance(members, dict):
+            members[exact] = None
+        elif members != exact:
+            self._bands[key] = {members: None, exact: None}
+    
+    def _band_remove(self, key, exact):
+        members = self._bands.get(key)
+        if isinstance(members, dict):
+            members.pop(exact, None)
+            if not members:
+                del self._bands[key]
+        elif members == exact:
+            del self._bands[key]
+    
+    def _band_candidates(self, key):
+        """Newest stories filed under a band key"""
+        members = self._bands.get(key)
+        if members is None:
+            return ()
+        if isinstance(members, dict):
+            return itertools.islice(reversed(members), SeenStoryIndex.MAX_CANDIDATES)
+        return (members,)
+    
+    def _expire(self, bucket):
+        oldest_allowed = bucket - self.window // self.bucket_size
+        dropped = []
+        while self._buckets and (next(iter(self._buckets)) < oldest_allowed or
+                                 len(self._entries) > self.max_entries):
+            old_bucket, exacts = self._buckets.popitem(last=False)
+            for exact in exacts:
+                entry = self._entries.get(exact)
+                if entry is None or entry[0] != old_bucket:
+                    continue  # Refreshed into a newer bucket
+                del self._entries[exact]
+                dropped.append(exact)
+                self.stats["expired"] += 1
+                if entry[1] is not None:
+                    for key in SeenStoryIndex.band_keys(entry[1]):
+                        self._band_remove(key, exact)
+        if dropped and self.journal is not None:
+            self.journal.drop(dropped)
+    
+    def _insert(self, bucket, exact, signature, journal=True):
+        if journal and self.journal is not None:
+            self.journal.put(bucket, exact, signature)
+        previous = self._entries.get(exact)
+        self._entries[exact] = (bucket, signature)
+        self._buckets.setdefault(bucket, []).append(exact)
+        if previous is None and signature is not None:
+            for key in SeenStoryIndex.band_keys(signature):
+                self._band_add(key, exact)
+    
+    def check_and_add(self, title, now=None):
+        """Record title; returns "exact"/"near" if it was already seen, else None"""
+        bucket = int((now if now is not None else Clock.time()) // self.bucket_size)
+        exact, signature = SeenStoryIndex.fingerprint(title)
+        
+        with self._lock:
+            self._expire(bucket)
+            
+            entry = self._entries.get(exact)
+            if entry is not None:
+                self.stats["exact_hits"] += 1
+                if entry[0] != bucket:
+                    self._insert(bucket, exact, signature)  # Keep alive while it stays in the feed
+                return "exact"
+            
+            if signature is not None:
+                checked = set()
+                for key in SeenStoryIndex.band_keys(signature):
+                    for candidate in self._band_candidates(key):
+                        if candidate in checked:
+                            continue
+                        checked.add(candidate)
+                        if (SeenStoryIndex.similarity(signature, self._entries[candidate][1]) >=
+                                SeenStoryIndex.NEAR_DUPLICATE_JACCARD):
+                            self.stats["near_hits"] += 1
+                            return "near"
+            
+            self._insert(bucket, exact, signature)
+            self.stats["added"] += 1
+            return None
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def export(self):
+        """Compact [bucket, exact, signature hex] rows (JSON-safe)"""
+        with self._lock:
+            return [[bucket, exact, signature.hex() if signature else None]
+                    for exact, (bucket, signature) in self._entries.items()]
+    
+    def load(self, rows):
+        with self._lock:
+            for bucket, exact, signature in sorted(rows, key=lambda row: row[0]):
+                if isinstance(signature, str):
+                    signature = bytes.fromhex(signature)
+                self._insert(bucket, exact, signature or None, journal=False)
+
+class SeenStoryStore:
+    """SQLite table behind a SeenStoryIndex: a row per story, written as it changes
+    
+    Only the exact hash, hour bucket and 96-byte signature are kept; the band
+    map is rebuilt from them on load.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS seen (
+            exact INTEGER PRIMARY KEY,
+            bucket INTEGER NOT NULL,
+            signature BLOB
+        );
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA wal_autocheckpoint=100")  # one small row per write
+        self._db.execute("PRAGMA journal_size_limit=262144")
+        self._db.executescript(SeenStoryStore.SCHEMA)
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def signed(exact):
+        """SQLite integers are signed 64-bit; the hashes are unsigned"""
+        return exact - (1 << 64) if exact >= 1 << 63 else exact
+    
+    def rows(self):
+        """[(bucket, exact, signature bytes or None)] for SeenStoryIndex.load"""
+        with self._lock:
+            rows = self._db.execute("SELECT bucket, exact, signature FROM seen").fetchall()
+        return [(bucket, exact & 0xFFFFFFFFFFFFFFFF, signature) for bucket, exact, signature in rows]
+    
+    def put(self, bucket, exact, signature):
+        self.put_many([(bucket, exact, signature)])
+    
+    def put_many(self, rows):
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO seen (exact, bucket, signature) VALUES (?, ?, ?)",
+                                 [(SeenStoryStore.signed(exact), bucket, signature)
+                                  for bucket, exact, signature in rows])
+    
+    def drop(self, exacts):
+        with self._lock:
+            self._db.executemany("DELETE FROM seen WHERE exact = ?",
+                                 [(SeenStoryStore.signed(exact),) for exact in exacts])
+    
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+class BreakingNewsScorer:
+    """Rank a whole news feed by keyword weight, vote velocity and source"""
+    
+    KEYWORD_WEIGHTS = {
+        "breaking": 3.0, "urgent": 3.0, "alert": 2.5, "emergency": 3.0,
+        "hack": 2.5, "hacked": 2.5, "exploit": 2.5, "bankrupt": 3.0, "bankruptcy": 3.0,
+        "halt": 2.0, "halts": 2.0, "delist": 2.0, "ban": 2.0, "crash": 2.0, "plunge": 1.5,
+        "lawsuit": 1.5, "sec": 1.0, "etf": 1.0, "approval": 1.5, "approved": 1.5,
+        "record": 1.0, "surge": 1.0, "liquidation": 1.5, "liquidations": 1.5
+    }
+    CRITICAL_WORDS = frozenset(["breaking", "urgent", "alert", "emergency"])
+    
+    SOURCE_WEIGHTS = {
+        "reuters.com": 1.5, "bloomberg.com": 1.5, "coindesk.com": 1.2,
+        "theblock.co": 1.2, "decrypt.co": 1.1, "cointelegraph.com": 1.0
+    }
+    
+    VOTE_WEIGHT = 1.0
+    IMPORTANT_WEIGHT = 0.5
+    VELOCITY_WEIGHT = 1.5
+    CANDIDATE_SCORE = 4.0   # about 55 votes alone; a critical keyword gets there with a few
+    CANDIDATE_MIN_VOTES = 20  # and never on keywords alone: more than this many votes
+    
+    WORD_RE = re.compile(r"[a-z]+")
+    
+    def __init__(self):
+        self.previous = {}  # story key -> (votes, seen_at) from the last poll
+    
+    def rank(self, items, now=None):
+        """Score every item in one pass; returns candidates best first"""
+        now = now if now is not None else Clock.time()
+        weights = BreakingNewsScorer.KEYWORD_WEIGHTS
+        sources = BreakingNewsScorer.SOURCE_WEIGHTS
+        previous = self.previous
+        current = {}
+        ranked = []
+        
+        for item in items:
+            words = set(BreakingNewsScorer.WORD_RE.findall(item["title"].lower()))
+            keyword_score = sum(weights.get(word, 0.0) for word in words)
+            votes = item.get("votes", 0)
+            
+            # Votes gained per hour since the previous poll
+            key = item.get("id") or item["title"]
+            velocity = 0.0
+            if key in previous:
+                last_votes, last_seen = previous[key]
+                hours = max((now - last_seen) / 3600, 1 / 60)
+                velocity = max(votes - last_votes, 0) / hours
+            current[key] = (votes, now)
+            
+            score = (keyword_score +
+                     BreakingNewsScorer.VOTE_WEIGHT * math.log1p(votes) +
+                     BreakingNewsScorer.IMPORTANT_WEIGHT * math.log1p(item.get("important", 0)) +
+                     BreakingNewsScorer.VELOCITY_WEIGHT * math.log1p(velocity))
+            score *= sources.get(item.get("domain", ""), 1.0)
+            
+            if score >= BreakingNewsScorer.CANDIDATE_SCORE and votes > BreakingNewsScorer.CANDIDATE_MIN_VOTES:
+                ranked.append({
+                    "item": item,
+                    "score": round(score, 3),
+                    "critical": not words.isdisjoint(BreakingNewsScorer.CRITICAL_WORDS),
+                    "velocity": round(velocity, 1)
+                })
+        
+        self.previous = current
+        ranked.sort(key=lambda candidate: candidate["score"], reverse=True)
+        return ranked
+
 class BreakingNewsMonitor:
     """Monitor and post breaking news"""
     
-    last_news_hash = ""
+    _seen = None
+    _seen_lock = threading.Lock()
+    
+    @staticmethod
+    def seen_index():
+        """Seen-story index, restored from SEEN_PATH on first use and journaled there"""
+        with BreakingNewsMonitor._seen_lock:
+            if BreakingNewsMonitor._seen is None:
+                index = SeenStoryIndex()
+                store = SeenStoryStore(ProductionConfig.SEEN_PATH)
+                state = StateStore.default()
+                legacy = state.get("seen_stories")
+                if legacy:
+                    # Older versions kept the whole index in the JSON state file
+                    store.put_many([(bucket, exact, bytes.fromhex(signature) if signature else None)
+                                    for bucket, exact, signature in legacy])
+                    state.delete("seen_stories")
+                index.load(store.rows())
+                index.journal = store
+                BreakingNewsMonitor._seen = index
+            return BreakingNewsMonitor._seen
+    
+    scorer = BreakingNewsScorer()
     
     @staticmethod
-    def check_breaking_news():
-        """Check for breaking news"""
+    def check_breaking_news(news_items=None, critical_only=False):
+        """Check for breaking news; critical_only keeps non-critical stories for later"""
         try:
-            news_items = RealTimeAPIs.get_crypto_news()
+            if news_items is None:
+                news_items = RealTimeAPIs.get_news_feed()
             if news_items:
-                latest = news_items[0]
-                
-                # Create hash of title to check duplicates
-                news_hash = hashlib.md5(latest["title"].encode()).hexdigest()
+                seen = BreakingNewsMonitor.seen_index()
                 
-                # Check if new and important
-                if (news_hash != BreakingNewsMonitor.last_news_hash and 
-                    latest.get("votes", 0) > 20):  # Important if many votes
-                    
-                    BreakingNewsMonitor.last_news_hash = news_hash
+                # Best-scoring story not seen (or rephrased) before
+                for candidate in BreakingNewsMonitor.scorer.rank(news_items):
+                    latest = candidate["item"]
+                    if critical_only and not candidate["critical"]:
+                        continue
+                    if seen.check_and_add(latest["title"]):
+                        continue
                     
                     # Determine urgency
-                    title_lower = latest["title"].lower()
-                    if any(word in title_lower for word in ["breaking", "urgent", "alert", "emergency"]):
+                    if candidate["critical"]:
                         urgency = "🚨 BREAKING NEWS"
-                    elif latest.get("votes", 0) > 50:
-                        urgency = "📢 IMPORTANT UPDATE"
                     else:
-                        return None  # Not urgent enough
+                        urgency = "📢 IMPORTANT UPDATE"
                     
                     return {
                         "title": latest["title"],
                         "source": latest["source"],
-                        "urgency": urgency
+                        "urgency": urgency,
+                        "score": candidate["score"]
                     }
                     
         except Exception as e:
@@ -427,18 +3208,341 @@ class BreakingNewsMonitor:
     @staticmethod
     def create_breaking_post(news_data):
         """Create breaking news post"""
-        return f"""{news_data['urgency']}
+        return Templates.render("breaking", {"news": news_data})
 
-{news_data['title']}
+# ============================================================================
+# 3B. REAL-TIME PRICE ALERTS
+# ============================================================================
+class MiniWebSocket:
+    """Minimal RFC 6455 client: reads text frames, answers pings and closes"""
+    
+    GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+    
+    def __init__(self, url, timeout=30):
+        self.url = url
+        self.timeout = timeout
+        self.sock = None
+        self.reader = None
+    
+    def connect(self):
+        parsed = urlparse(self.url)
+        secure = parsed.scheme == "wss"
+        host = parsed.hostname
+        port = parsed.port or (443 if secure else 80)
+        path = parsed.path or "/"
+        if parsed.query:
+            path += "?" + parsed.query
+        
+        sock = socket.create_connection((host, port), timeout=self.timeout)
+        if secure:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=host)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        
+        key = base64.b64encode(os.urandom(16)).decode()
+        sock.sendall((
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {host}:{port}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n\r\n"
+        ).encode())
+        
+        self.sock = sock
+        self.reader = sock.makefile("rb")
+        status = self.reader.readline().decode("latin-1")
+        headers = {}
+        while True:
+            line = self.reader.readline().decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        
+        accept = base64.b64encode(hashlib.sha1((key + MiniWebSocket.GUID).encode()).digest()).decode()
+        if " 101 " not in status or headers.get("sec-websocket-accept") != accept:
+            self.close()
+            raise ConnectionError(f"WebSocket handshake failed: {status.strip()}")
+        return self
+    
+    def send_frame(self, opcode, payload=b""):
+        """Send one masked frame (clients must mask)"""
+        mask = os.urandom(4)
+        length = len(payload)
+        if length < 126:
+            header = struct.pack("!BB", 0x80 | opcode, 0x80 | length)
+        elif length < 65536:
+            header = struct.pack("!BBH", 0x80 | opcode, 0x80 | 126, length)
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 0x80 | 127, length)
+        masked = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        self.sock.sendall(header + mask + masked)
+    
+    def _read(self, size):
+        data = self.reader.read(size)
+        if len(data) < size:
+            raise ConnectionError("WebSocket closed by peer")
+        return data
+    
+    def recv(self):
+        """Next text message; raises ConnectionError once the stream ends"""
+        fragments = []
+        while True:
+            first, second = self._read(2)
+            opcode = first & 0x0F
+            length = second & 0x7F
+            if length == 126:
+                length = struct.unpack("!H", self._read(2))[0]
+            elif length == 127:
+                length = struct.unpack("!Q", self._read(8))[0]
+            mask = self._read(4) if second & 0x80 else None
+            payload = self._read(length)
+            if mask:
+                payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+            
+            if opcode == 0x9:  # ping
+                self.send_frame(0xA, payload)
+                continue
+            if opcode == 0xA:  # pong
+                continue
+            if opcode == 0x8:  # close
+                try:
+                    self.send_frame(0x8, payload[:2])
+                except OSError:
+                    pass
+                raise ConnectionError("WebSocket closed by peer")
+            
+            fragments.append(payload)
+            if first & 0x80:
+                return b"".join(fragments).decode("utf-8")
+    
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+        self.sock = None
 
-Source: {news_data['source']}
+class RollingWindow:
+    """Prices over the last `span` seconds with O(1) amortized min/max"""
+    
+    def __init__(self, span):
+        self.span = span
+        self.prices = deque()  # (ts, price)
+        self.lows = deque()    # increasing prices: front is the window low
+        self.highs = deque()   # decreasing prices: front is the window high
+    
+    def push(self, ts, price):
+        self.prices.append((ts, price))
+        while self.lows and self.lows[-1][1] >= price:
+            self.lows.pop()
+        self.lows.append((ts, price))
+        while self.highs and self.highs[-1][1] <= price:
+            self.highs.pop()
+        self.highs.append((ts, price))
+        
+        cutoff = ts - self.span
+        while self.prices[0][0] < cutoff:
+            self.prices.popleft()
+        while self.lows[0][0] < cutoff:
+            self.lows.popleft()
+        while self.highs[0][0] < cutoff:
+            self.highs.popleft()
+    
+    def low(self):
+        return self.lows[0][1]
+    
+    def high(self):
+        return self.highs[0][1]
+    
+    def __len__(self):
+        return len(self.prices)
 
-Potential impacts:
-• Market sentiment shift
-• Trading volume changes
-• Regulatory discussions
+class PriceAlertEngine:
+    """Percent-move and level-cross alerts over per-symbol rolling windows"""
+    
+    def __init__(self, window=None, move_pct=None, cooldown=None, levels=None):
+        self.window = window or ProductionConfig.ALERT_WINDOW
+        self.move_pct = move_pct or ProductionConfig.ALERT_MOVE_PCT
+        self.cooldown = cooldown if cooldown is not None else ProductionConfig.ALERT_COOLDOWN
+        self.levels = levels if levels is not None else PriceAlertEngine.parse_levels(
+            ProductionConfig.PRICE_ALERT_LEVELS
+        )
+        self.windows = {}
+        self.last_price = {}
+        self.last_alert = {}  # (symbol, kind[, level]) -> ts
+        self.stats = {"ticks": 0, "alerts": 0, "suppressed": 0}
+    
+    @staticmethod
+    def parse_levels(spec):
+        """"BTC:60000,70000;ETH:3000" -> {"BTC": [60000.0, 70000.0], "ETH": [3000.0]}"""
+        levels = {}
+        for part in (spec or "").split(";"):
+            symbol, _, values = part.partition(":")
+            if symbol.strip() and values.strip():
+                levels[symbol.strip().upper()] = sorted(float(v) for v in values.split(",") if v.strip())
+        return levels
+    
+    def _fire(self, key, ts, alert, alerts):
+        last = self.last_alert.get(key)
+        if last is not None and ts - last < self.cooldown:
+            self.stats["suppressed"] += 1
+            return
+        self.last_alert[key] = ts
+        self.stats["alerts"] += 1
+        alerts.append(alert)
+    
+    def on_tick(self, symbol, price, ts):
+        """Feed one tick; returns the alerts it triggers (usually none)"""
+        self.stats["ticks"] += 1
+        window = self.windows.get(symbol)
+        if window is None:
+            window = self.windows[symbol] = RollingWindow(self.window)
+        window.push(ts, price)
+        previous = self.last_price.get(symbol)
+        self.last_price[symbol] = price
+        alerts = []
+        
+        # Percent move off the window's low (pump) or high (dump)
+        low, high = window.low(), window.high()
+        up = (price / low - 1) * 100 if low else 0.0
+        down = (price / high - 1) * 100 if high else 0.0
+        if up >= self.move_pct:
+            self._fire((symbol, "up"), ts, {"kind": "move", "symbol": symbol, "price": price,
+                                            "change": up, "reference": low, "ts": ts}, alerts)
+        if down <= -self.move_pct:
+            self._fire((symbol, "down"), ts, {"kind": "move", "symbol": symbol, "price": price,
+                                              "change": down, "reference": high, "ts": ts}, alerts)
+        
+        # Key level crossed since the previous tick
+        if previous is not None and previous != price:
+            for level in self.levels.get(symbol, ()):
+                if previous < level <= price or previous > level >= price:
+                    self._fire((symbol, "level", level), ts,
+                               {"kind": "level", "symbol": symbol, "price": price, "level": level,
+                                "direction": "above" if price >= level else "below", "ts": ts}, alerts)
+        return alerts
+    
+    def create_alert_post(self, alert, source="Live data: Binance stream"):
+        """Telegram text for one alert; source is the provenance line"""
+        symbol = alert["symbol"]
+        if alert["kind"] == "level":
+            arrow = "🚀" if alert["direction"] == "above" else "🔻"
+            headline = f"{arrow} {symbol} breaks {alert['direction']} ${alert['level']:,.0f}"
+        else:
+            arrow = "🚀" if alert["change"] > 0 else "🔻"
+            headline = (f"{arrow} {symbol} {alert['change']:+.1f}% in the last "
+                        f"{self.window // 60} min (from ${alert['reference']:,.2f})")
+        
+        return Templates.render("price_alert", {
+            "headline": headline,
+            "price": alert["price"],
+            "time": datetime.fromtimestamp(alert["ts"], ProductionConfig.TIMEZONE).strftime("%H:%M %Z"),
+            "symbol": symbol,
+            "source": source
+        })
 
-Stay updated for further developments."""
+class PriceAlertStream:
+    """Feed the alert engine from the Binance miniTicker stream or a recorded tick file"""
+    
+    RECONNECT_MAX = 60  # seconds
+    
+    @staticmethod
+    def stream_url(source):
+        if source == "binance":
+            streams = "/".join(f"{pair.lower()}@miniTicker" for pair in CoinUniverse.ids("binance"))
+            return f"{ProductionConfig.BINANCE_WS}/stream?streams={streams}"
+        return source
+    
+    @staticmethod
+    def source_label(source):
+        """Provenance line for alert posts: live only when it is"""
+        if os.path.exists(source):
+            return f"Recorded ticks: {os.path.basename(source)} (replay)"
+        return "Live data: Binance stream"
+    
+    @staticmethod
+    def parse_message(message):
+        """[(symbol, price, ts)] from a miniTicker event, combined-stream wrapper or array"""
+        data = json.loads(message)
+        if isinstance(data, dict) and "data" in data:
+            data = data["data"]
+        events = data if isinstance(data, list) else [data]
+        ticks = []
+        for event in events:
+            pair = event.get("s", "")
+            coin = CoinUniverse.lookup("binance", pair)
+            symbol = coin["symbol"] if coin else pair.replace("USDT", "")
+            ticks.append((symbol, float(event["c"]), event.get("E", 0) / 1000))
+        return ticks
+    
+    @staticmethod
+    def messages(source):
+        """Raw messages: lines of a recorded file, or frames from a live socket"""
+        if os.path.exists(source):
+            with open(source) as f:
+                for line in f:
+                    if line.strip():
+                        yield line
+            return
+        
+        ws = MiniWebSocket(PriceAlertStream.stream_url(source)).connect()
+        print(f"📡 Price stream connected: {source}")
+        try:
+            while True:
+                yield ws.recv()
+        finally:
+            ws.close()
+    
+    @staticmethod
+    def consume(source, engine, notify):
+        """Run one pass over the source; notify(post) for every alert
+        
+        A replay on a virtual clock moves the clock to each tick's time, so the
+        alerts it posts are stamped when the ticks happened.
+        """
+        label = PriceAlertStream.source_label(source)
+        follow = Clock.is_virtual() and os.path.exists(source)
+        for message in PriceAlertStream.messages(source):
+            try:
+                ticks = PriceAlertStream.parse_message(message)
+            except (ValueError, KeyError, TypeError):
+                continue
+            for symbol, price, ts in ticks:
+                if follow:
+                    Clock.current().advance_to(ts)
+                for alert in engine.on_tick(symbol, price, ts):
+                    notify(engine.create_alert_post(alert, label))
+    
+    @staticmethod
+    def run(source, engine=None):
+        """Consume forever, reconnecting with backoff; posts go out off the read loop"""
+        engine = engine or PriceAlertEngine()
+        
+        def notify(post):
+            print(f"⚡ Price alert: {post.splitlines()[2]}")
+            threading.Thread(target=TelegramPoster.send_message, args=(post, "alert"), daemon=True).start()
+        
+        delay = 1
+        while True:
+            try:
+                PriceAlertStream.consume(source, engine, notify)
+                if os.path.exists(source):
+                    print("📼 Tick replay finished")
+                    return engine
+                delay = 1
+            except Exception as e:
+                print(f"⚠️ Price stream error: {e}")
+            Clock.sleep(delay)
+            delay = min(delay * 2, PriceAlertStream.RECONNECT_MAX)
+    
+    @staticmethod
+    def start(source):
+        thread = threading.Thread(target=PriceAlertStream.run, args=(source,),
+                                  name="price-stream", daemon=True)
+        thread.start()
+        return thread
 
 # ============================================================================
 # 4. STRUCTURED CONTENT SERIES
@@ -520,23 +3624,26 @@ class LearningSeries:
     ]
     
     @staticmethod
-    def get_todays_lesson():
-        """Get today's lesson"""
-        day = ProductionConfig.LEARNING_SERIES_DAY
+    def current_day():
+        return StateStore.default().get("learning_series_day", ProductionConfig.LEARNING_SERIES_DAY)
+    
+    @staticmethod
+    def advance(day):
+        """Move on from `day`; a no-op if the series already has, so no lesson is skipped"""
+        if LearningSeries.current_day() == day:
+            StateStore.default().set("learning_series_day", (day % len(LearningSeries.SERIES)) + 1)
+    
+    @staticmethod
+    def get_todays_lesson(advance=True):
+        """Get today's lesson; advance=False (staging) leaves the series on today"""
+        day = LearningSeries.current_day()
         lesson = LearningSeries.SERIES[(day - 1) % len(LearningSeries.SERIES)]
         
         # Update for next day
-        ProductionConfig.LEARNING_SERIES_DAY = (day % len(LearningSeries.SERIES)) + 1
+        if advance:
+            LearningSeries.advance(day)
         
-        points_formatted = "\n".join([f"• {point}" for point in lesson["points"]])
-        
-        return f"""🎓 **LEARNING SERIES - DAY {lesson['day']}: {lesson['title']}**
-
-{points_formatted}
-
-💡 Key Insight: {lesson['tip']}
-
-📚 Continuous learning = Better investing."""
+        return Templates.render("learning_series", {"lesson": lesson})
 
 class TechnicalAnalysisSeries:
     """7-day technical analysis series"""
@@ -614,32 +3721,207 @@ class TechnicalAnalysisSeries:
         }
     ]
     
+    LIVE_SYMBOLS = [("₿", "BTC"), ("Ξ", "ETH"), ("◎", "SOL")]
+    
+    @staticmethod
+    def live_indicators():
+        """Today's indicator rows for BTC/ETH/SOL; empty until history has built up"""
+        rows = []
+        for icon, symbol in TechnicalAnalysisSeries.LIVE_SYMBOLS:
+            snap = IndicatorEngine.snapshot(symbol)
+            if not snap or snap["rsi14"] is None or snap["bollinger"] is None:
+                continue
+            parts = [f"RSI {snap['rsi14']:.0f}"]
+            if snap["macd"]:
+                side = "above" if snap["macd"]["histogram"] >= 0 else "below"
+                parts.append(f"MACD {side} signal")
+            band = snap["bollinger"]
+            parts.append(f"BB ${band['lower']:,.0f}–${band['upper']:,.0f}")
+            if snap["pivots"]:
+                parts.append(f"S1 ${snap['pivots']['s1']:,.0f} / R1 ${snap['pivots']['r1']:,.0f}")
+            rows.append({"icon": icon, "symbol": symbol, "summary": " | ".join(parts)})
+        return rows
+    
+    @staticmethod
+    def current_day():
+        return StateStore.default().get("technical_series_day", ProductionConfig.TECHNICAL_SERIES_DAY)
+    
+    @staticmethod
+    def advance(day):
+        """Move on from `day`; a no-op if the series already has, so no lesson is skipped"""
+        if TechnicalAnalysisSeries.current_day() == day:
+            StateStore.default().set("technical_series_day", (day % len(TechnicalAnalysisSeries.SERIES)) + 1)
+    
     @staticmethod
-    def get_todays_analysis():
-        """Get today's TA lesson"""
-        day = ProductionConfig.TECHNICAL_SERIES_DAY
+    def get_todays_analysis(advance=True):
+        """Get today's TA lesson; advance=False (staging) leaves the series on today"""
+        day = TechnicalAnalysisSeries.current_day()
         lesson = TechnicalAnalysisSeries.SERIES[(day - 1) % len(TechnicalAnalysisSeries.SERIES)]
         
-        # Update for next day
-        ProductionConfig.TECHNICAL_SERIES_DAY = (day % len(TechnicalAnalysisSeries.SERIES)) + 1
+        # Update for next day
+        if advance:
+            TechnicalAnalysisSeries.advance(day)
+        
+        return Templates.render("technical_series", {
+            "lesson": lesson,
+            "live": TechnicalAnalysisSeries.live_indicators()
+        })
+
+# ============================================================================
+# 5. CONTENT GENERATOR
+# ============================================================================
+class PostTemplates:
+    """Template sources (Telegram HTML) and the context fields each one needs"""
+    
+    SOURCES = {"en": {
+        "good_morning": """{{ greeting }}
+
+💭 "{{ quote }}"
+
+📅 Today's crypto education schedule:
+• 9 AM: Real-time market prices
+• 11 AM: Global crypto news
+• 1 PM: India market updates  
+• 3 PM: Learning series
+• 5 PM: Technical analysis
+• 9 PM: Evening wrap-up
+
+What aspect of crypto interests you most today?""",
+        
+        "market_open": """📊 <b>REAL-TIME MARKET UPDATE</b>
+
+{% for coin in coins %}
+{{ coin.icon }} {{ coin.symbol }}: {{ coin.price | money }} ({{ coin.change | pct }})
+{% endfor %}
+{% if trend %}
+
+📅 {{ trend }}
+{% endif %}
+{% if sentiment %}
+
+📈 Market Sentiment: {{ sentiment.value }} ({{ sentiment.sentiment }})
+{% endif %}
+{% if key_level %}
+
+Key level to watch: {{ key_level }}
+{% endif %}
+
+{{ footer }}""",
+        
+        "global_news": """🌍 <b>GLOBAL CRYPTO DEVELOPMENTS</b>
+
+{{ headline.title }}
+<i>{{ headline.source }}</i>
+
+📈 Institutional Update:
+{{ etf.update }}
+<i>{{ etf.source }}</i>
+
+Global trends: Adoption ↗️ | Innovation ⚡ | Regulation 📝""",
+        
+        "india_update": """🇮🇳 <b>INDIA CRYPTO MARKET</b>
+
+{{ india.update }}
+<i>{{ india.source }}</i>
+
+📊 Indian Market Progress:
+• User adoption accelerating
+• Regulatory clarity improving
+• Local innovation increasing
+
+💡 India's crypto journey continues forward momentum.""",
+        
+        "learning_series": """🎓 <b>LEARNING SERIES - DAY {{ lesson.day }}: {{ lesson.title }}</b>
+
+{% for point in lesson.points %}
+• {{ point }}
+{% endfor %}
+
+💡 Key Insight: {{ lesson.tip }}
+
+📚 Continuous learning = Better investing.""",
+        
+        "technical_series": """🔍 <b>TECHNICAL ANALYSIS - DAY {{ lesson.day }}: {{ lesson.title }}</b>
+
+{% for concept in lesson.concepts %}
+• {{ concept }}
+{% endfor %}
+
+🎯 Practical Application: {{ lesson.application }}
+{% if live %}
+
+📊 Live indicators today:
+{% for row in live %}
+{{ row.icon }} {{ row.symbol }}: {{ row.summary }}
+{% endfor %}
+{% endif %}
+
+📈 Apply these concepts to improve your trading decisions.""",
         
-        concepts_formatted = "\n".join([f"• {concept}" for concept in lesson["concepts"]])
+        "good_night": """{{ message }}
+{% if btc_price %}
+
+📊 Market snapshot:
+₿ BTC: {{ btc_price | money }}
+{% if trend %}
+📅 {{ trend }}
+{% endif %}
+{% endif %}
+
+✅ Today's crypto education complete:
+• Market analysis reviewed
+• Technical concepts learned
+• Global developments tracked
+
+💭 Evening reflection:
+"Wisdom comes from experience. Experience comes from learning."
+
+Tomorrow: Continue your crypto knowledge journey.
+
+Rest well. Learn well. 🌟""",
         
-        return f"""🔍 **TECHNICAL ANALYSIS - DAY {lesson['day']}: {lesson['title']}**
+        "breaking": """{{ news.urgency }}
 
-{concepts_formatted}
+{{ news.title }}
 
-🎯 Practical Application: {lesson['application']}
+Source: {{ news.source }}
 
-📈 Apply these concepts to improve your trading decisions."""
+Potential impacts:
+• Market sentiment shift
+• Trading volume changes
+• Regulatory discussions
+
+Stay updated for further developments.""",
+        
+        "price_alert": """⚡ PRICE ALERT
+
+{{ headline }}
+Now: {{ price | money2 }}
+
+{{ source }}
+⏰ {{ time }}
+
+#PriceAlert #{{ symbol }} #Crypto"""
+    }}
+    
+    FIELDS = {
+        "good_morning": {"greeting": str, "quote": str},
+        "market_open": {"coins": list, "trend": str, "sentiment": (dict, type(None)), "key_level": str,
+                        "footer": str},
+        "global_news": {"headline": dict, "etf": dict},
+        "india_update": {"india": dict},
+        "learning_series": {"lesson": dict},
+        "technical_series": {"lesson": dict, "live": list},
+        "good_night": {"message": str, "btc_price": (int, float, type(None)), "trend": str},
+        "breaking": {"news": dict},
+        "price_alert": {"headline": str, "price": (int, float), "time": str, "symbol": str, "source": str}
+    }
 
-# ============================================================================
-# 5. CONTENT GENERATOR
-# ============================================================================
 class ContentGenerator:
     """Generate all content types"""
     
     @staticmethod
+    @Metrics.traced("content.good_morning")
     def good_morning():
         """7:00 AM - Morning post"""
         greetings = [
@@ -656,21 +3938,33 @@ class ContentGenerator:
             "Learning never exhausts the mind."
         ]
         
-        return f"""{random.choice(greetings)}
-
-💭 "{random.choice(quotes)}"
-
-📅 Today's crypto education schedule:
-• 9 AM: Real-time market prices
-• 11 AM: Global crypto news
-• 1 PM: India market updates  
-• 3 PM: Learning series
-• 5 PM: Technical analysis
-• 9 PM: Evening wrap-up
-
-What aspect of crypto interests you most today?"""
+        return Templates.render("good_morning", {
+            "greeting": random.choice(greetings),
+            "quote": random.choice(quotes)
+        })
+    
+    MARKET_COINS = [("₿", "BTC"), ("Ξ", "ETH"), ("◎", "SOL")]
+    
+    @staticmethod
+    def since_morning(symbol):
+        """"BTC +3.1% since this morning" from recorded history, or "" without it"""
+        today = PriceHistory.since(symbol, PriceHistory.today_start())
+        if not today or today["samples"] < 2:
+            return ""
+        return f"{symbol} {today['return_pct']:+.1f}% since this morning"
+    
+    @staticmethod
+    def key_level(symbol, price):
+        """Nearer of the recorded 24h high and low, else the round-thousand estimate"""
+        day = PriceHistory.since(symbol, Clock.time() - 86400)
+        if not day or day["samples"] < 2 or day["high"] == day["low"]:
+            return f"${price/1000:.0f}K area"
+        if day["high"] - price <= price - day["low"]:
+            return f"${day['high']:,.0f} (24h high, resistance)"
+        return f"${day['low']:,.0f} (24h low, support)"
     
     @staticmethod
+    @Metrics.traced("content.market_open")
     def market_open():
         """9:00 AM - Market prices"""
         prices = RealTimeAPIs.get_crypto_prices()
@@ -679,19 +3973,42 @@ What aspect of crypto interests you most today?"""
         if not prices:
             return "📊 Fetching live market data... Please wait."
         
-        return f"""📊 **REAL-TIME MARKET UPDATE**
-
-₿ BTC: ${prices.get('BTC', {}).get('price', 0):,.0f} ({prices.get('BTC', {}).get('change', 0):+.1f}%)
-Ξ ETH: ${prices.get('ETH', {}).get('price', 0):,.0f} ({prices.get('ETH', {}).get('change', 0):+.1f}%)
-◎ SOL: ${prices.get('SOL', {}).get('price', 0):,.0f} ({prices.get('SOL', {}).get('change', 0):+.1f}%)
-
-📈 Market Sentiment: {sentiment['value']} ({sentiment['sentiment']})
-
-Key level to watch: ${prices.get('BTC', {}).get('price', 65000)/1000:.0f}K area
-
-Live data • Updated just now"""
+        # Coins without an agreed price are left out, never shown as $0 or a guess
+        coins = []
+        for icon, symbol in ContentGenerator.MARKET_COINS:
+            quote = prices.get(symbol)
+            if quote and quote.get("price"):
+                coins.append({"icon": icon, "symbol": symbol,
+                              "price": quote["price"], "change": quote.get("change") or 0})
+        btc_price = prices.get('BTC', {}).get('price')
+        
+        return Templates.render("market_open", {
+            "coins": coins,
+            "trend": ContentGenerator.since_morning('BTC'),
+            "sentiment": None if sentiment.get("estimate") else sentiment,
+            "key_level": ContentGenerator.key_level('BTC', btc_price) if btc_price else "",
+            "footer": ContentGenerator.price_footer({c["symbol"]: prices[c["symbol"]] for c in coins})
+        })
+    
+    @staticmethod
+    def price_footer(quotes):
+        """Provenance line for {"SYM": quote}; "Live data" only when every price is live"""
+        if not quotes:
+            return "Prices unavailable right now"
+        recorded = [quote["as_of"] for quote in quotes.values() if quote.get("status") == "last_known"]
+        if recorded:
+            stamp = datetime.fromtimestamp(min(recorded), ProductionConfig.TIMEZONE).strftime("%H:%M")
+            return f"Last recorded prices (as of {stamp}) • live sources unavailable"
+        
+        sources = min(quote.get("sources", 1) for quote in quotes.values())
+        footer = f"Live data • {sources}-source consensus" if sources > 1 else "Live data • Updated just now"
+        wide = [symbol for symbol, quote in quotes.items() if quote.get("status") == "wide"]
+        if wide:
+            footer += f" • sources differ on {', '.join(wide)}"
+        return footer
     
     @staticmethod
+    @Metrics.traced("content.global_news")
     def global_news():
         """11:00 AM - Global news"""
         news_items = RealTimeAPIs.get_crypto_news()
@@ -700,45 +4017,30 @@ Live data • Updated just now"""
         if not news_items:
             return "🌍 Collecting global crypto developments..."
         
-        return f"""🌍 **GLOBAL CRYPTO DEVELOPMENTS**
-
-{news_items[0]['title']}
-_{news_items[0]['source']}_
-
-📈 Institutional Update:
-{etf_data['update']}
-_{etf_data['source']}_
-
-Global trends: Adoption ↗️ | Innovation ⚡ | Regulation 📝"""
+        return Templates.render("global_news", {"headline": news_items[0], "etf": etf_data})
     
     @staticmethod
+    @Metrics.traced("content.india_update")
     def india_update():
         """1:00 PM - India update"""
         india_data = RealTimeAPIs.get_india_crypto_updates()
         
-        return f"""🇮🇳 **INDIA CRYPTO MARKET**
-
-{india_data['update']}
-_{india_data['source']}_
-
-📊 Indian Market Progress:
-• User adoption accelerating
-• Regulatory clarity improving
-• Local innovation increasing
-
-💡 India's crypto journey continues forward momentum."""
+        return Templates.render("india_update", {"india": india_data})
     
     @staticmethod
-    def learning_series():
+    @Metrics.traced("content.learning_series")
+    def learning_series(advance=True):
         """3:00 PM - Learning series"""
-        return LearningSeries.get_todays_lesson()
+        return LearningSeries.get_todays_lesson(advance)
     
     @staticmethod
-    def technical_analysis():
+    @Metrics.traced("content.technical_analysis")
+    def technical_analysis(advance=True):
         """5:00 PM - Technical analysis"""
-        return TechnicalAnalysisSeries.get_todays_analysis()
+        return TechnicalAnalysisSeries.get_todays_analysis(advance)
     
     @staticmethod
+    @Metrics.traced("content.good_night")
     def good_night():
         """9:00 PM - Evening wrap"""
         prices = RealTimeAPIs.get_crypto_prices()
@@ -750,24 +4052,12 @@ _{india_data['source']}_
             "🌉 Night team! Rest well, learn better tomorrow."
         ]
         
-        if prices and 'BTC' in prices:
-            price_info = f"\n\n📊 Market snapshot:\n₿ BTC: ${prices['BTC']['price']:,.0f}"
-        else:
-            price_info = ""
-        
-        return f"""{random.choice(night_msgs)}{price_info}
-
-✅ Today's crypto education complete:
-• Market analysis reviewed
-• Technical concepts learned
-• Global developments tracked
-
-💭 Evening reflection:
-"Wisdom comes from experience. Experience comes from learning."
-
-Tomorrow: Continue your crypto knowledge journey.
-
-Rest well. Learn well. 🌟"""
+        has_btc = bool(prices and 'BTC' in prices)
+        return Templates.render("good_night", {
+            "message": random.choice(night_msgs),
+            "btc_price": prices['BTC']['price'] if has_btc else None,
+            "trend": ContentGenerator.since_morning('BTC') if has_btc else ""
+        })
 
 # ============================================================================
 # 6. TELEGRAM POSTER
@@ -776,21 +4066,42 @@ class TelegramPoster:
     """Post to Telegram"""
     
     @staticmethod
-    def send_message(content, msg_type="general"):
-        """Send message to Telegram"""
+    @Metrics.traced("telegram.send_message")
+    def send_message(content, msg_type="general", natural_delay=True):
+        """Queue message for every registered channel"""
+        if not content:
+            return False
+        
+        # Natural delay (staged slot posts skip it: their fire time is already jittered)
+        if natural_delay:
+            Clock.sleep(Clock.rng.uniform(1, 3))
+        
+        return OutboundQueue.default().enqueue(content, msg_type) > 0
+    
+    @staticmethod
+    @Metrics.traced("telegram.send_message")
+    async def send_message_async(content, msg_type="general"):
+        """Queue message without blocking the event loop"""
         if not content:
             return False
         
         # Natural delay
-        time.sleep(random.uniform(1, 3))
+        await asyncio.sleep(Clock.rng.uniform(1, 3))
         
-        url = f"https://api.telegram.org/bot{ProductionConfig.BOT_TOKEN}/sendMessage"
+        queued = await asyncio.to_thread(OutboundQueue.default().enqueue, content, msg_type)
+        return queued > 0
+    
+    @staticmethod
+    @Metrics.traced("telegram.post")
+    def post(content, msg_type="general", chat_id=None):
+        """Deliver one message to one chat: {"ok", "status", "retry_after", "error"}"""
+        url = f"{ProductionConfig.TELEGRAM_API}/bot{ProductionConfig.BOT_TOKEN}/sendMessage"
         
         # Notification settings
         notify = msg_type in ["breaking", "prices"]
         
         payload = {
-            "chat_id": ProductionConfig.CHANNEL_ID,
+            "chat_id": chat_id or ProductionConfig.CHANNEL_ID,
             "text": content,
             "parse_mode": "HTML",
             "disable_web_page_preview": True,
@@ -798,52 +4109,497 @@ class TelegramPoster:
         }
         
         try:
-            response = requests.post(url, json=payload, timeout=10)
+            response = HttpTransport.post("telegram", url, json=payload)
             if response.status_code == 200:
-                timestamp = datetime.now(ProductionConfig.TIMEZONE).strftime("%H:%M")
-                print(f"✅ [{timestamp}] {msg_type.upper()} posted")
-                return True
-            else:
-                print(f"⚠️ Telegram error: {response.text}")
-                return False
+                timestamp = Clock.now(ProductionConfig.TIMEZONE).strftime("%H:%M")
+                print(f"✅ [{timestamp}] {msg_type.upper()} posted to {payload['chat_id']}")
+                Metrics.inc("telegram_sent_total", msg_type=msg_type)
+                return {"ok": True, "status": 200, "retry_after": None, "error": None}
+            
+            print(f"⚠️ Telegram error: {response.text}")
+            Metrics.inc("telegram_errors_total", status=response.status_code, msg_type=msg_type)
+            retry_after = None
+            try:
+                retry_after = response.json().get("parameters", {}).get("retry_after")
+            except ValueError:
+                pass
+            return {"ok": False, "status": response.status_code,
+                    "retry_after": retry_after, "error": response.text[:200]}
         except Exception as e:
             print(f"❌ Post error: {e}")
-            return False
+            Metrics.inc("telegram_errors_total", status="exception", msg_type=msg_type)
+            return {"ok": False, "status": None, "retry_after": None, "error": str(e)}
+
+# ============================================================================
+# 6B. MULTI-CHANNEL FAN-OUT
+# ============================================================================
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is free"""
+    
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Take one token, returning how long we waited for it"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+class ChannelRegistry:
+    """Channels every post is delivered to"""
+    
+    @staticmethod
+    def channels():
+        """[{"chat_id", "label"}] from CHANNEL_ID plus CHANNEL_IDS, without duplicates"""
+        entries = [ProductionConfig.CHANNEL_ID or ""] + ProductionConfig.CHANNEL_IDS.split(",")
+        channels = {}
+        for entry in entries:
+            chat_id, _, label = entry.strip().partition(":")
+            if chat_id and chat_id not in channels:
+                channels[chat_id] = {"chat_id": chat_id, "label": label or chat_id}
+        return list(channels.values())
+
+class FanOutDispatcher:
+    """Rate-limited sends for the outbox: a global and a per-chat token bucket, one worker pool"""
+    
+    global_bucket = TokenBucket(ProductionConfig.TELEGRAM_GLOBAL_RATE)
+    chat_buckets = {}
+    _pool = None
+    _lock = threading.Lock()
+    
+    @staticmethod
+    def chat_bucket(chat_id):
+        with FanOutDispatcher._lock:
+            if chat_id not in FanOutDispatcher.chat_buckets:
+                FanOutDispatcher.chat_buckets[chat_id] = TokenBucket(ProductionConfig.TELEGRAM_CHAT_RATE)
+            return FanOutDispatcher.chat_buckets[chat_id]
+    
+    @staticmethod
+    def pool():
+        with FanOutDispatcher._lock:
+            if FanOutDispatcher._pool is None:
+                FanOutDispatcher._pool = ThreadPoolExecutor(
+                    max_workers=ProductionConfig.FANOUT_WORKERS, thread_name_prefix="fanout"
+                )
+            return FanOutDispatcher._pool
+    
+    @staticmethod
+    def deliver(content, msg_type, chat_id):
+        """Rate-limited send to one chat: post() result plus latency and throttled time"""
+        start = time.monotonic()
+        throttled = FanOutDispatcher.global_bucket.acquire()
+        throttled += FanOutDispatcher.chat_bucket(chat_id).acquire()
+        result = TelegramPoster.post(content, msg_type, chat_id)
+        result["latency"] = round(time.monotonic() - start, 3)
+        result["throttled"] = round(throttled, 3)
+        return result
+
+# ============================================================================
+# 6C. DURABLE OUTBOUND QUEUE
+# ============================================================================
+class OutboundQueue:
+    """SQLite-backed outbox: posts survive restarts and are retried with backoff"""
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chat_id TEXT NOT NULL,
+            msg_type TEXT NOT NULL,
+            content TEXT NOT NULL,
+            content_hash TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            created_at REAL NOT NULL,
+            sent_at REAL,
+            last_error TEXT
+        );
+        CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+        CREATE INDEX IF NOT EXISTS outbox_dedup ON outbox (chat_id, content_hash, created_at);
+    """
+    
+    # Telegram answers that will never succeed on retry
+    PERMANENT_ERRORS = {400, 401, 403, 404}
+    
+    _default = None
+    _default_lock = threading.Lock()
+    
+    def __init__(self, path):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(OutboundQueue.SCHEMA)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._worker = None
+        self.stats = {"enqueued": 0, "duplicates": 0, "sent": 0, "retried": 0, "dead": 0}
+    
+    @staticmethod
+    def default():
+        """Process-wide queue at ProductionConfig.OUTBOX_PATH"""
+        with OutboundQueue._default_lock:
+            if OutboundQueue._default is None:
+                OutboundQueue._default = OutboundQueue(ProductionConfig.OUTBOX_PATH)
+            return OutboundQueue._default
+    
+    def enqueue(self, content, msg_type="general", channels=None):
+        """Queue content for each channel, skipping recent duplicates; returns rows added"""
+        channels = channels or ChannelRegistry.channels()
+        content_hash = hashlib.md5(content.encode()).hexdigest()
+        now = time.time()
+        # Rows are stamped in wall time, which a virtual run barely moves
+        window = 0 if Clock.is_virtual() else ProductionConfig.OUTBOX_DEDUP_WINDOW
+        added = 0
+        
+        with self._lock:
+            for channel in channels:
+                duplicate = self._db.execute(
+                    "SELECT 1 FROM outbox WHERE chat_id = ? AND content_hash = ? AND created_at > ?",
+                    (channel["chat_id"], content_hash, now - window)
+                ).fetchone()
+                if duplicate:
+                    self.stats["duplicates"] += 1
+                    continue
+                
+                self._db.execute(
+                    "INSERT INTO outbox (chat_id, msg_type, content, content_hash, next_attempt_at, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (channel["chat_id"], msg_type, content, content_hash, now, now)
+                )
+                added += 1
+            self.stats["enqueued"] += added
+        
+        if added:
+            self._wakeup.set()
+        return added
+    
+    def due(self, limit):
+        """Pending rows whose next attempt is now"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT id, chat_id, msg_type, content, attempts, created_at FROM outbox "
+                "WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (time.time(), limit)
+            ).fetchall()
+    
+    def next_due_in(self):
+        """Seconds until the next pending row is due, or None when idle"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MIN(next_attempt_at) FROM outbox WHERE status = 'pending'"
+            ).fetchone()
+        return None if row[0] is None else max(row[0] - time.time(), 0)
+    
+    def backoff(self, attempts, retry_after=None):
+        """Exponential backoff with jitter; Telegram's retry_after wins when given"""
+        if retry_after:
+            return float(retry_after)
+        delay = min(ProductionConfig.OUTBOX_BACKOFF_BASE * (2 ** (attempts - 1)),
+                    ProductionConfig.OUTBOX_BACKOFF_MAX)
+        return delay * random.uniform(0.8, 1.2)
+    
+    def record(self, row_id, attempts, result, chat_id=None, created_at=None):
+        """Mark a delivery attempt as sent, retry later, or dead; exported per chat"""
+        now = time.time()
+        with self._lock:
+            if result["ok"]:
+                self._db.execute(
+                    "UPDATE outbox SET status = 'sent', attempts = ?, sent_at = ? WHERE id = ?",
+                    (attempts, now, row_id)
+                )
+                self.stats["sent"] += 1
+                outcome = "sent"
+            elif (result.get("status") in OutboundQueue.PERMANENT_ERRORS or
+                  attempts >= ProductionConfig.OUTBOX_MAX_ATTEMPTS):
+                self._db.execute(
+                    "UPDATE outbox SET status = 'dead', attempts = ?, last_error = ? WHERE id = ?",
+                    (attempts, result.get("error"), row_id)
+                )
+                self.stats["dead"] += 1
+                outcome = "dead"
+            else:
+                retry_at = now + self.backoff(attempts, result.get("retry_after"))
+                self._db.execute(
+                    "UPDATE outbox SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                    (attempts, retry_at, result.get("error"), row_id)
+                )
+                self.stats["retried"] += 1
+                outcome = "retried"
+        
+        if outcome == "sent":
+            if created_at is not None:
+                Metrics.observe("outbox_delivery_seconds", now - created_at, chat=chat_id)
+        else:
+            # HTTP status, or "network" when the request never got an answer
+            reason = str(result.get("status") or "network")
+            Metrics.inc("outbox_failures_total", chat=chat_id, reason=reason, outcome=outcome)
+        if result.get("latency") is not None:
+            Metrics.observe("outbox_send_seconds", result["latency"], chat=chat_id)
+    
+    def drain_once(self):
+        """Deliver every due row concurrently; returns how many were attempted"""
+        rows = self.due(limit=ProductionConfig.FANOUT_WORKERS * 4)
+        futures = {
+            FanOutDispatcher.pool().submit(FanOutDispatcher.deliver, content, msg_type, chat_id):
+                (row_id, attempts, chat_id, created_at)
+            for row_id, chat_id, msg_type, content, attempts, created_at in rows
+        }
+        for future, (row_id, attempts, chat_id, created_at) in futures.items():
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"ok": False, "status": None, "retry_after": None, "error": str(e)}
+            self.record(row_id, attempts + 1, result, chat_id, created_at)
+        return len(rows)
+    
+    def run_worker(self):
+        """Drain forever, sleeping until the next row is due or a new one arrives"""
+        print("📤 Outbound queue worker started")
+        while not self._stop.is_set():
+            try:
+                if self.drain_once():
+                    continue
+                wait = self.next_due_in()
+            except Exception as e:
+                print(f"⚠️ Outbound queue error: {e}")
+                wait = 5
+            
+            self._wakeup.wait(timeout=60 if wait is None else min(wait, 60))
+            self._wakeup.clear()
+    
+    def start_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._stop.clear()
+            self._worker = threading.Thread(target=self.run_worker, name="outbox", daemon=True)
+            self._worker.start()
+    
+    def stop_worker(self):
+        self._stop.set()
+        self._wakeup.set()
+        if self._worker is not None:
+            self._worker.join()
+    
+    def delivery_stats(self):
+        """Counters plus queue depth and delivery latency of sent rows"""
+        with self._lock:
+            pending = self._db.execute("SELECT COUNT(*) FROM outbox WHERE status = 'pending'").fetchone()[0]
+            latencies = [row[0] for row in self._db.execute(
+                "SELECT sent_at - created_at FROM outbox WHERE status = 'sent' ORDER BY 1"
+            )]
+        
+        def percentile(p):
+            return round(latencies[min(int(len(latencies) * p), len(latencies) - 1)], 3) if latencies else None
+        
+        return dict(self.stats, pending=pending, latency_p50=percentile(0.5), latency_p99=percentile(0.99))
+    
+    def delivered_at(self, content, since):
+        """Latest sent_at of content queued at or after since, or None while any copy is pending"""
+        content_hash = hashlib.md5(content.encode()).hexdigest()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT status, sent_at FROM outbox WHERE content_hash = ? AND created_at >= ?",
+                (content_hash, since)
+            ).fetchall()
+        if not rows or any(status == "pending" for status, _ in rows):
+            return None
+        sent = [sent_at for status, sent_at in rows if sent_at]
+        return max(sent) if sent else None
+    
+    def prune(self, older_than=7 * 86400):
+        """Forget delivered and dead rows past the retention window"""
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM outbox WHERE status != 'pending' AND created_at < ?",
+                (time.time() - older_than,)
+            )
 
 # ============================================================================
 # 7. NEWS MONITOR THREAD
 # ============================================================================
+class AdaptivePoller:
+    """News poll interval driven by feed velocity and price volatility"""
+    
+    # Readings that count as "hot" (heat 1.0)
+    FEED_VELOCITY_HOT = 20.0   # new stories per hour
+    PRICE_MOVE_HOT = 1.5       # % move of any coin since the previous poll
+    DAILY_CHANGE_HOT = 15.0    # % 24h change of any coin
+    VELOCITY_WINDOW = 900      # shortest span feed velocity is measured over (seconds)
+    
+    QUIET_HEAT = 0.25    # heat below this polls at the ceiling
+    HEAT_GAIN = 3.0      # interval = max / (1 + gain * heat)
+    RELAX_FACTOR = 1.5   # quiet polls lengthen the interval at most this much per step
+    MAX_DECISIONS = 288  # recent decisions kept for metrics
+    
+    current = None  # the running monitor's poller, read by Metrics.gauges()
+    
+    def __init__(self, clock=None):
+        self.clock = clock or Clock.time
+        self.interval = ProductionConfig.NEWS_CHECK_INTERVAL
+        self.known_ids = None
+        self.last_poll_at = None
+        self.last_prices = {}
+        self.breaking_at = None
+        self.errors = 0
+        self.decisions = deque(maxlen=AdaptivePoller.MAX_DECISIONS)
+        self.stats = {"polls": 0, "tightened": 0, "relaxed": 0, "held": 0, "errors": 0}
+        self.heat = 0.0
+        AdaptivePoller.current = self
+    
+    def feed_velocity(self, items, now):
+        """New stories per hour since the previous poll"""
+        ids = {item.get("id") or item["title"] for item in items or []}
+        known, self.known_ids = self.known_ids, ids
+        if known is None or self.last_poll_at is None:
+            return 0.0
+        # At least a quarter hour, so one story between close polls isn't a burst
+        hours = max(now - self.last_poll_at, AdaptivePoller.VELOCITY_WINDOW) / 3600
+        return len(ids - known) / hours
+    
+    def volatility(self, prices):
+        """(largest % move since the previous poll, largest |24h change|)"""
+        move = 0.0
+        daily = 0.0
+        for symbol, quote in (prices or {}).items():
+            price = quote.get("price") or 0
+            previous = self.last_prices.get(symbol)
+            if previous and price:
+                move = max(move, abs(price / previous - 1) * 100)
+            daily = max(daily, abs(quote.get("change") or 0))
+        self.last_prices = {symbol: quote.get("price") for symbol, quote in (prices or {}).items()}
+        return move, daily
+    
+    def observe(self, items, prices, now=None):
+        """Record one poll's feed and prices; returns the next interval in seconds"""
+        now = self.clock() if now is None else now
+        velocity = self.feed_velocity(items, now)
+        move, daily = self.volatility(prices)
+        self.last_poll_at = now
+        self.errors = 0
+        
+        heat = max(velocity / AdaptivePoller.FEED_VELOCITY_HOT,
+                   move / AdaptivePoller.PRICE_MOVE_HOT,
+                   daily / AdaptivePoller.DAILY_CHANGE_HOT)
+        if heat < AdaptivePoller.QUIET_HEAT:
+            heat = 0.0
+        floor = ProductionConfig.NEWS_CHECK_MIN_INTERVAL
+        ceiling = ProductionConfig.NEWS_CHECK_INTERVAL
+        target = min(max(ceiling / (1 + AdaptivePoller.HEAT_GAIN * heat), floor), ceiling)
+        
+        # Tighten at once, relax gradually so one quiet poll doesn't undo a burst
+        if target < self.interval:
+            decision = "tightened"
+            interval = target
+        elif target > self.interval:
+            decision = "relaxed"
+            interval = min(target, self.interval * AdaptivePoller.RELAX_FACTOR)
+        else:
+            decision = "held"
+            interval = target
+        
+        self.interval = round(interval)
+        self.heat = heat
+        self.stats["polls"] += 1
+        self.stats[decision] += 1
+        Metrics.inc("news_poll_decisions_total", decision=decision)
+        self.decisions.append({
+            "at": now, "interval": self.interval, "decision": decision,
+            "feed_velocity": round(velocity, 1), "price_move": round(move, 2),
+            "daily_change": round(daily, 2), "heat": round(heat, 2)
+        })
+        return self.interval
+    
+    def on_error(self):
+        """Interval after a failed poll: doubles per consecutive error up to the ceiling"""
+        self.errors += 1
+        self.stats["errors"] += 1
+        Metrics.inc("news_poll_errors_total")
+        return min(ProductionConfig.NEWS_ERROR_BACKOFF * 2 ** (self.errors - 1),
+                   ProductionConfig.NEWS_CHECK_INTERVAL)
+    
+    def on_breaking(self, now=None):
+        self.breaking_at = self.clock() if now is None else now
+    
+    def in_cooldown(self, now=None):
+        """Only critical stories are posted this soon after a breaking post"""
+        now = self.clock() if now is None else now
+        return (self.breaking_at is not None and
+                now - self.breaking_at < ProductionConfig.BREAKING_COOLDOWN)
+    
+    def poll(self):
+        """One monitor step: (breaking news or None, seconds until the next poll)"""
+        try:
+            items = RealTimeAPIs.poll_news_feed()
+            prices = RealTimeAPIs.cached("crypto_prices", RealTimeAPIs.fetch_crypto_prices)
+            if items is None:
+                return None, self.on_error()
+            
+            interval = self.observe(items, prices)
+            breaking_news = BreakingNewsMonitor.check_breaking_news(
+                items, critical_only=self.in_cooldown()
+            )
+            if breaking_news:
+                self.on_breaking()
+            return breaking_news, interval
+        except Exception as e:
+            print(f"⚠️ News monitor error: {e}")
+            return None, self.on_error()
+    
+    def metrics(self):
+        """Decision counts, the current interval and recent decisions"""
+        intervals = [d["interval"] for d in self.decisions]
+        return {
+            **self.stats,
+            "interval": self.interval,
+            "mean_interval": round(sum(intervals) / len(intervals), 1) if intervals else None,
+            "not_modified": HttpTransport.stats.get("news_not_modified", 0),
+            "recent": list(self.decisions)[-10:]
+        }
+
+def news_monitor_step(poller):
+    """One poll, posting any breaking story; returns seconds until the next poll"""
+    breaking_news, interval = poller.poll()
+    
+    if breaking_news:
+        print(f"🚨 Breaking news detected: {breaking_news['title'][:50]}...")
+        post = BreakingNewsMonitor.create_breaking_post(breaking_news)
+        TelegramPoster.send_message(post, "breaking")
+    
+    print(f"⏱️ Next news check in {interval}s")
+    return interval
+
 def news_monitor_thread():
     """Background thread to monitor breaking news"""
     print("🚨 Starting breaking news monitor...")
+    poller = AdaptivePoller()
     
     while True:
         try:
-            # Check for breaking news
-            breaking_news = BreakingNewsMonitor.check_breaking_news()
-            
-            if breaking_news:
-                print(f"🚨 Breaking news detected: {breaking_news['title'][:50]}...")
-                post = BreakingNewsMonitor.create_breaking_post(breaking_news)
-                TelegramPoster.send_message(post, "breaking")
-                
-                # Wait 2 hours after breaking news
-                time.sleep(7200)
-            else:
-                # No breaking news, wait for next check
-                time.sleep(ProductionConfig.NEWS_CHECK_INTERVAL)
-                
+            Clock.sleep(news_monitor_step(poller))
         except Exception as e:
             print(f"⚠️ News monitor error: {e}")
-            time.sleep(300)  # Wait 5 minutes on error
+            Clock.sleep(ProductionConfig.NEWS_ERROR_BACKOFF)
 
 # ============================================================================
 # 8. SCHEDULER SETUP
 # ============================================================================
-def setup_schedule():
-    """Setup all scheduled posts"""
-    
-    schedule_map = {
+def scheduled_posts():
+    """Schedule key -> (content function, post type)"""
+    return {
         "good_morning": (ContentGenerator.good_morning, "community"),
         "market_open": (ContentGenerator.market_open, "prices"),
         "global_news": (ContentGenerator.global_news, "news"),
@@ -852,21 +4608,344 @@ def setup_schedule():
         "technical_series": (ContentGenerator.technical_analysis, "analysis"),
         "good_night": (ContentGenerator.good_night, "wrap")
     }
+
+def jittered_time(base_time):
+    """Add natural variation (± 5 minutes) to an HH:MM slot"""
+    variation = Clock.rng.randint(-5, 5)
+    return (datetime.strptime(base_time, "%H:%M") + 
+            timedelta(minutes=variation)).strftime("%H:%M")
+
+class PostStager:
+    """Fetch and render each slot's post ahead of its fire time; firing only queues it"""
     
-    for schedule_key, (post_func, post_type) in schedule_map.items():
-        base_time = ProductionConfig.SCHEDULE[schedule_key][0]
+    LEAD_MINUTES = MarketDataRefresher.LEAD_MINUTES
+    MAX_AGE = 15 * 60  # staged posts older than this are rebuilt at fire time
+    
+    # Slots whose post moves a persisted series on: staged without advancing it, and
+    # advanced once the post is queued, so a restart or a rebuild never skips a day
+    SERIES = {"learning_series": LearningSeries, "technical_series": TechnicalAnalysisSeries}
+    
+    _staged = {}
+    _lock = threading.Lock()
+    timings = deque(maxlen=200)
+    
+    @staticmethod
+    def stage(schedule_key, post_func, post_type):
+        """Warm the slot's data and render its post now; returns the stage timings"""
+        with Metrics.span("slot.stage", slot=schedule_key):
+            started = time.perf_counter()
+            fetchers = MarketDataRefresher.fetchers()
+            for key in MarketDataRefresher.SLOT_DATA.get(schedule_key, []):
+                RealTimeAPIs.refresh(key, fetchers[key])
+            fetched = time.perf_counter()
+            
+            series = PostStager.SERIES.get(schedule_key)
+            series_day = series.current_day() if series else None
+            content = post_func(advance=False) if series else post_func()
+            rendered = time.perf_counter()
+        Metrics.observe("stage_fetch_seconds", fetched - started, slot=schedule_key)
+        Metrics.observe("stage_render_seconds", rendered - fetched, slot=schedule_key)
+        
+        with PostStager._lock:
+            PostStager._staged[schedule_key] = {
+                "content": content, "msg_type": post_type, "staged_at": Clock.time(),
+                "series_day": series_day, "fetch_ms": (fetched - started) * 1e3, "render_ms": (rendered - fetched) * 1e3
+            }
+        print(f"🧱 Staged {schedule_key}: fetch {(fetched - started) * 1e3:.0f} ms, "
+              f"render {(rendered - fetched) * 1e3:.1f} ms")
+        return PostStager._staged[schedule_key]
+    
+    @staticmethod
+    def stage_async(schedule_key, post_func, post_type):
+        """Stage on a background thread so the scheduler loop keeps ticking"""
+        if Clock.is_virtual():
+            # Virtual time reaches the fire job at once; it must find the post staged
+            return PostStager.stage(schedule_key, post_func, post_type)
+        
+        def run():
+            try:
+                PostStager.stage(schedule_key, post_func, post_type)
+            except Exception as e:
+                print(f"⚠️ Staging {schedule_key} failed, will render at fire time: {e}")
+        threading.Thread(target=run, name=f"stage-{schedule_key}", daemon=True).start()
+    
+    @staticmethod
+    def fire(schedule_key, post_func, post_type):
+        """Queue the staged post (or render it now if staging missed); records timings"""
+        triggered_wall = time.time()  # the outbox stamps deliveries in wall time
+        triggered = time.perf_counter()
+        now = Clock.time()
+        with PostStager._lock:
+            staged = PostStager._staged.pop(schedule_key, None)
         
-        # Add natural variation (± 5 minutes)
-        variation = random.randint(-5, 5)
-        actual_time = (datetime.strptime(base_time, "%H:%M") + 
-                      timedelta(minutes=variation)).strftime("%H:%M")
+        timing = {"slot": schedule_key, "triggered_at": triggered_wall, "fired_at": now, "staged": False}
+        series = PostStager.SERIES.get(schedule_key)
+        if staged and now - staged["staged_at"] <= PostStager.MAX_AGE:
+            content = staged["content"]
+            series_day = staged["series_day"]
+            timing.update(staged=True, lead_s=round(now - staged["staged_at"], 1),
+                          fetch_ms=staged["fetch_ms"], render_ms=staged["render_ms"])
+        else:
+            series_day = series.current_day() if series else None
+            content = post_func(advance=False) if series else post_func()
+            timing["render_ms"] = (time.perf_counter() - triggered) * 1e3
         
-        schedule.every().day.at(actual_time).do(
-            lambda func=post_func, ptype=post_type: TelegramPoster.send_message(func(), ptype)
-        )
+        queued_at = time.perf_counter()
+        queued = TelegramPoster.send_message(content, post_type, natural_delay=False)
+        timing["enqueue_ms"] = (time.perf_counter() - queued_at) * 1e3
+        if queued and series:
+            series.advance(series_day)
+        timing["trigger_to_queue_ms"] = (time.perf_counter() - triggered) * 1e3
+        timing["content"] = content
+        PostStager.timings.append(timing)
+        Metrics.observe("slot_trigger_to_queue_seconds", timing["trigger_to_queue_ms"] / 1e3, slot=schedule_key)
+        Metrics.inc("slot_fired_total", slot=schedule_key, staged=timing["staged"])
+        print(f"⚡ Fired {schedule_key}: {'staged' if timing['staged'] else 'rendered late'}, "
+              f"queued in {timing['trigger_to_queue_ms']:.1f} ms")
+        return timing
+    
+    @staticmethod
+    def report():
+        """Recent slot timings, with trigger-to-delivery once the outbox has sent them"""
+        outbox = OutboundQueue.default()
+        rows = []
+        for timing in list(PostStager.timings):
+            if "delivery_ms" not in timing and timing.get("content"):
+                sent_at = outbox.delivered_at(timing["content"], timing["triggered_at"])
+                if sent_at:
+                    timing["delivery_ms"] = (sent_at - timing["triggered_at"]) * 1e3
+            rows.append({k: v for k, v in timing.items() if k != "content"})
+        return rows
+    
+    @staticmethod
+    def schedule_slot(schedule_key, actual_time, post_func, post_type):
+        """Register the staging job LEAD_MINUTES before the slot and the fire job at it"""
+        stage_time = (datetime.strptime(actual_time, "%H:%M") -
+                      timedelta(minutes=PostStager.LEAD_MINUTES)).strftime("%H:%M")
+        SlotScheduler.every_day_at(stage_time, PostStager.stage_async, schedule_key, post_func, post_type)
+        SlotScheduler.every_day_at(actual_time, PostStager.fire, schedule_key, post_func, post_type)
+
+class SlotScheduler:
+    """Daily HH:MM jobs (local time) on Clock time, so virtual runs skip straight to the next job"""
+    
+    jobs = []  # {"at": "HH:MM", "func", "args", "next_run": timestamp}
+    _lock = threading.Lock()
+    
+    @staticmethod
+    def next_after(hhmm, ts):
+        """Timestamp of the next local HH:MM strictly after ts"""
+        now = datetime.fromtimestamp(ts)
+        hour, minute = map(int, hhmm.split(":"))
+        target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if target <= now:
+            target += timedelta(days=1)
+        return target.timestamp()
+    
+    @staticmethod
+    def every_day_at(hhmm, func, *args):
+        job = {"at": hhmm, "func": func, "args": args,
+               "next_run": SlotScheduler.next_after(hhmm, Clock.time())}
+        with SlotScheduler._lock:
+            SlotScheduler.jobs.append(job)
+        return job
+    
+    @staticmethod
+    def run_pending():
+        """Run every due job, earliest first; returns the jobs that ran"""
+        now = Clock.time()
+        with SlotScheduler._lock:
+            due = sorted((job for job in SlotScheduler.jobs if job["next_run"] <= now),
+                         key=lambda job: job["next_run"])
+            for job in due:
+                job["next_run"] = SlotScheduler.next_after(job["at"], now)
+        
+        for job in due:
+            try:
+                job["func"](*job["args"])
+            except Exception as e:
+                print(f"⚠️ Scheduled job {getattr(job['func'], '__name__', job['func'])} failed: {e}")
+        return due
+    
+    @staticmethod
+    def next_run():
+        with SlotScheduler._lock:
+            return min((job["next_run"] for job in SlotScheduler.jobs), default=None)
+    
+    @staticmethod
+    def idle_seconds():
+        """Seconds until the next job, or None without jobs"""
+        next_run = SlotScheduler.next_run()
+        return None if next_run is None else next_run - Clock.time()
+    
+    @staticmethod
+    def clear():
+        with SlotScheduler._lock:
+            SlotScheduler.jobs.clear()
+
+def setup_schedule():
+    """Setup all scheduled posts"""
+    
+    for schedule_key, (post_func, post_type) in scheduled_posts().items():
+        base_time = ProductionConfig.SCHEDULE[schedule_key][0]
+        actual_time = jittered_time(base_time)
+        
+        # Data and rendering happen a few minutes early; the slot itself only queues
+        PostStager.schedule_slot(schedule_key, actual_time, post_func, post_type)
         
         print(f"⏰ Scheduled: ~{base_time} - {schedule_key.replace('_', ' ').title()}")
 
+def run_virtual(days, start=None, seed=None):
+    """Run `days` of slots and news polls on a VirtualClock in seconds; returns a summary"""
+    if not VirtualClock.sandboxed():
+        # Days of posts would reach the real channels within seconds
+        raise RuntimeError(f"virtual run needs TELEGRAM_API on a loopback host, not {ProductionConfig.TELEGRAM_API}")
+    clock = VirtualClock(start)
+    previous = Clock.use(clock)
+    if seed is not None:
+        Clock.rng.seed(seed)
+    RealTimeAPIs.cache.clear()  # entries were stamped on the previous clock
+    started = time.perf_counter()
+    begin = clock.time()
+    end = begin + days * 86400
+    jobs_run = []
+    
+    try:
+        SlotScheduler.clear()
+        setup_schedule()
+        poller = AdaptivePoller()
+        next_poll = begin
+        
+        while True:
+            next_job = SlotScheduler.next_run()
+            at = next_poll if next_job is None else min(next_poll, next_job)
+            if at >= end:
+                break
+            clock.advance_to(at)
+            
+            if next_job is not None and next_job <= next_poll:
+                jobs_run.extend(SlotScheduler.run_pending())
+                continue
+            try:
+                interval = news_monitor_step(poller)
+            except Exception as e:
+                print(f"⚠️ News monitor error: {e}")
+                interval = ProductionConfig.NEWS_ERROR_BACKOFF
+            next_poll = clock.time() + interval
+        clock.advance_to(end)
+    finally:
+        SlotScheduler.clear()
+        RealTimeAPIs.cache.clear()
+        Clock.use(previous)
+    
+    state = StateStore.default()
+    return {
+        "days": days,
+        "wall_seconds": round(time.perf_counter() - started, 2),
+        "jobs_run": len(jobs_run),
+        "slots_fired": sum(1 for job in jobs_run if job["func"] is PostStager.fire),
+        "polls": poller.stats["polls"],
+        "mean_poll_interval": poller.metrics()["mean_interval"],
+        "learning_series_day": state.get("learning_series_day", ProductionConfig.LEARNING_SERIES_DAY),
+        "technical_series_day": state.get("technical_series_day", ProductionConfig.TECHNICAL_SERIES_DAY)
+    }
+
+# ============================================================================
+# 8B. ASYNCIO RUNTIME
+# ============================================================================
+class AsyncRuntime:
+    """Timer-driven event loop: one task per slot plus the news monitor"""
+    
+    @staticmethod
+    def next_occurrence(hhmm, now=None):
+        """Next local datetime at HH:MM (today if still ahead, else tomorrow)"""
+        now = now or Clock.now()
+        hour, minute = map(int, hhmm.split(":"))
+        target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if target <= now:
+            target += timedelta(days=1)
+        return target
+    
+    @staticmethod
+    async def sleep_until(target):
+        """Sleep to target, re-checking the wall clock at most hourly"""
+        if Clock.is_virtual():
+            # Virtual time jumps straight there
+            Clock.current().advance_to(target.timestamp())
+            await asyncio.sleep(0)
+            return
+        while True:
+            remaining = (target - Clock.now()).total_seconds()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(min(remaining, 3600))
+    
+    @staticmethod
+    async def run_slot(schedule_key, post_func, post_type):
+        """Fire one schedule slot once a day at its jittered time"""
+        base_time = ProductionConfig.SCHEDULE[schedule_key][0]
+        fired_on = None
+        
+        while True:
+            now = Clock.now()
+            if fired_on is not None:
+                # Fresh jitter may land later today; the next fire is tomorrow at the earliest
+                now = max(now, datetime.combine(fired_on + timedelta(days=1), datetime.min.time()))
+            fire_at = AsyncRuntime.next_occurrence(jittered_time(base_time), now)
+            
+            stage_at = fire_at - timedelta(minutes=PostStager.LEAD_MINUTES)
+            if stage_at > Clock.now():
+                await AsyncRuntime.sleep_until(stage_at)
+                try:
+                    await asyncio.to_thread(PostStager.stage, schedule_key, post_func, post_type)
+                except Exception as e:
+                    print(f"⚠️ Staging {schedule_key} failed, will render at fire time: {e}")
+            
+            await AsyncRuntime.sleep_until(fire_at)
+            fired_on = fire_at.date()
+            try:
+                await asyncio.to_thread(PostStager.fire, schedule_key, post_func, post_type)
+            except Exception as e:
+                print(f"⚠️ {schedule_key} failed: {e}")
+    
+    @staticmethod
+    async def news_monitor():
+        """Cancellable breaking news monitor"""
+        print("🚨 Starting breaking news monitor...")
+        poller = AdaptivePoller()
+        
+        while True:
+            try:
+                breaking_news, delay = await asyncio.to_thread(poller.poll)
+                
+                if breaking_news:
+                    print(f"🚨 Breaking news detected: {breaking_news['title'][:50]}...")
+                    post = BreakingNewsMonitor.create_breaking_post(breaking_news)
+                    await TelegramPoster.send_message_async(post, "breaking")
+                    
+            except Exception as e:
+                print(f"⚠️ News monitor error: {e}")
+                delay = ProductionConfig.NEWS_ERROR_BACKOFF
+            
+            await asyncio.sleep(delay)
+    
+    @staticmethod
+    async def run():
+        """Run every slot and the news monitor until cancelled"""
+        tasks = [asyncio.create_task(AsyncRuntime.news_monitor(), name="news_monitor")]
+        for schedule_key, (post_func, post_type) in scheduled_posts().items():
+            tasks.append(asyncio.create_task(
+                AsyncRuntime.run_slot(schedule_key, post_func, post_type), name=schedule_key
+            ))
+            print(f"⏰ Scheduled: ~{ProductionConfig.SCHEDULE[schedule_key][0]} - "
+                  f"{schedule_key.replace('_', ' ').title()}")
+        
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
 # ============================================================================
 # 9. MAIN EXECUTION
 # ============================================================================
@@ -885,7 +4964,7 @@ def main():
     print("="*60)
     
     # Check configuration
-    if not ProductionConfig.BOT_TOKEN or not ProductionConfig.CHANNEL_ID:
+    if not ProductionConfig.BOT_TOKEN or not ChannelRegistry.channels():
         print("\n❌ REQUIRED SETUP:")
         print("1. Create Telegram Bot via @BotFather")
         print("2. Create Channel @ViralCryptoInsights")
@@ -893,9 +4972,21 @@ def main():
         print("4. Set environment variables:")
         print("   BOT_TOKEN=your_bot_token_here")
         print("   CHANNEL_ID=-100channel_id_here")
+        print("   CHANNEL_IDS=-100other_id:label,... (optional fan-out)")
         print("\n🔄 Restart after setup")
         exit(1)
     
+    if ProductionConfig.CLOCK == "virtual" and not VirtualClock.sandboxed():
+        print("\n❌ BOT_CLOCK=virtual posts days of content in seconds with dedup off.")
+        print(f"   TELEGRAM_API must point at a loopback fake (python harness.py), not {ProductionConfig.TELEGRAM_API}")
+        exit(1)
+    
+    if ProductionConfig.METRICS_PORT:
+        MetricsServer.start()
+    
+    # Compile post templates now so a broken one fails at startup, not at its slot
+    print(f"🧩 Templates compiled: {Templates.compile_all()}")
+    
     # Test APIs
     print("\n🧪 Testing APIs...")
     
@@ -911,16 +5002,42 @@ def main():
     if news:
         print(f"✅ News API working: {len(news)} items")
     
-    # Start breaking news monitor
-    monitor_thread = threading.Thread(target=news_monitor_thread, daemon=True)
-    monitor_thread.start()
+    use_asyncio = ProductionConfig.RUNTIME == "asyncio"
+    
+    # Dyno restarts send SIGTERM; exit normally so pending state is flushed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    
+    # Deliver queued posts (including any left over from the last run)
+    outbox = OutboundQueue.default()
+    outbox.prune()
+    outbox.start_worker()
+    
+    # Push-driven price alerts between the scheduled slots
+    if ProductionConfig.PRICE_STREAM:
+        PriceAlertStream.start(ProductionConfig.PRICE_STREAM)
     
-    # Setup schedule
-    setup_schedule()
+    if ProductionConfig.CLOCK == "virtual":
+        # Compressed time: point the APIs at harness.py fakes before running this
+        print(f"\n⏩ Running {ProductionConfig.VIRTUAL_DAYS} days on a virtual clock...")
+        summary = run_virtual(ProductionConfig.VIRTUAL_DAYS,
+                              seed=ProductionConfig.JITTER_SEED or None)
+        while outbox.delivery_stats()["pending"]:
+            time.sleep(0.1)
+        print(f"✅ Virtual run finished: {json.dumps(summary)}")
+        return
+    
+    if not use_asyncio:
+        # Start breaking news monitor
+        monitor_thread = threading.Thread(target=news_monitor_thread, daemon=True)
+        monitor_thread.start()
+        
+        # Setup schedule
+        setup_schedule()
     
     print(f"\n✅ Series initialized:")
-    print(f"   • Learning: Day {ProductionConfig.LEARNING_SERIES_DAY}")
-    print(f"   • Technical: Day {ProductionConfig.TECHNICAL_SERIES_DAY}")
+    state = StateStore.default()
+    print(f"   • Learning: Day {state.get('learning_series_day', ProductionConfig.LEARNING_SERIES_DAY)}")
+    print(f"   • Technical: Day {state.get('technical_series_day', ProductionConfig.TECHNICAL_SERIES_DAY)}")
     
     print("\n" + "="*60)
     print("🏆 SYSTEM ACTIVE")
@@ -932,6 +5049,8 @@ def main():
     
     print("\n🚨 Features running:")
     print("   • Breaking news monitor (background)")
+    if ProductionConfig.PRICE_STREAM:
+        print("   • Streaming price alerts (background)")
     print("   • Real-time price updates")
     print("   • Structured learning series")
     print("   • Technical analysis education")
@@ -957,10 +5076,19 @@ Your complete crypto education hub starts now! 🚀"""
     print("\n🤖 BOT RUNNING")
     print("🛑 Press Ctrl+C to stop")
     
-    # Keep scheduler running
+    if use_asyncio:
+        # Timer-driven slots and news monitor on one event loop
+        asyncio.run(AsyncRuntime.run())
+        return
+    
+    # Keep scheduler running; wake for the next job rather than on a fixed 30s tick
     while True:
-        schedule.run_pending()
-        time.sleep(30)
+        SlotScheduler.run_pending()
+        idle = SlotScheduler.idle_seconds()
+        Clock.sleep(30 if idle is None else min(max(idle, 0.05), 30))
 
 if __name__ == "__main__":
-    main()
+    if sys.argv[1:2] == ["backfill"]:
+        HistoryImporter.main(sys.argv[2:])
+    else:
+        main()
@@ -0,0 +1,586 @@
+"""
+🧪 VIRALCRYPTOINSIGHTS - OFFLINE HARNESS
+Local stand-ins for every upstream API the bot calls
+--------------------------------------------------------------------
+Usage: python harness.py [--port N] [--latency S] [--error-rate R] [--throttle-every N]
+Serves fake CoinGecko, Binance, CoinPaprika, alternative.me, CryptoPanic and
+Telegram APIs and prints the environment that points the bot at them.
+"""
+
+import sys
+import time
+import json
+import math
+import random
+import argparse
+import threading
+import socket
+import base64
+import hashlib
+import struct
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import bot
+
+# ============================================================================
+# STUB HTTP SERVER
+# ============================================================================
+class QuietHTTPServer(ThreadingHTTPServer):
+    """Don't print tracebacks for clients that hang up early"""
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+class StubServer:
+    """Local HTTP server serving canned JSON with injected latency"""
+
+    PORT = 0  # 0 picks a free port
+
+    def __init__(self):
+        self.routes = {}
+        self.latency = {}
+        self.requests = []
+        self.connections = 0
+        self.current = threading.local()  # headers and body of the request being answered
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                stub.connections += 1
+                super().setup()
+
+            def do_GET(self):
+                stub.handle(self)
+
+            def do_POST(self):
+                stub.handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = QuietHTTPServer(("127.0.0.1", StubServer.PORT), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def route(self, path, responder, latency=0.0, faults=None):
+        """responder(query) -> (status, payload[, headers]); request headers in last_headers"""
+        self.routes[path] = faults.wrap(responder) if faults else responder
+        self.latency[path] = latency
+
+    @property
+    def last_headers(self):
+        return getattr(self.current, "headers", {})
+
+    @property
+    def last_body(self):
+        return getattr(self.current, "body", b"")
+
+    def handle(self, handler):
+        parsed = urlparse(handler.path)
+        length = int(handler.headers.get("Content-Length") or 0)
+        self.current.body = handler.rfile.read(length) if length else b""
+        self.current.headers = handler.headers
+        self.requests.append(parsed.path)
+
+        time.sleep(self.latency.get(parsed.path, 0.0))
+        responder = self.routes.get(parsed.path)
+        reply = responder(parse_qs(parsed.query)) if responder else (404, {})
+        status, payload = reply[:2]
+        extra_headers = reply[2] if len(reply) > 2 else {}
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        if status == 304:
+            body = b""
+
+        try:
+            handler.send_response(status)
+            handler.send_header("Content-Type", "application/json")
+            handler.send_header("Content-Length", str(len(body)))
+            for name, value in extra_headers.items():
+                handler.send_header(name, value)
+            handler.end_headers()
+            handler.wfile.write(body)
+        except ConnectionError:
+            handler.close_connection = True  # Client stopped reading early
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class StubWebSocketServer:
+    """One-shot local WebSocket server that pushes canned text frames, then closes"""
+
+    def __init__(self, messages):
+        self.frames = b"".join(self.frame(m.encode()) for m in messages) + b"\x88\x02\x03\xe8"
+        self.listener = socket.socket()
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(1)
+        self.url = f"ws://127.0.0.1:{self.listener.getsockname()[1]}/stream"
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    @staticmethod
+    def frame(payload):
+        length = len(payload)
+        if length < 126:
+            return struct.pack("!BB", 0x81, length) + payload
+        if length < 65536:
+            return struct.pack("!BBH", 0x81, 126, length) + payload
+        return struct.pack("!BBQ", 0x81, 127, length) + payload
+
+    def serve(self):
+        conn, _ = self.listener.accept()
+        request = b""
+        while b"\r\n\r\n" not in request:
+            request += conn.recv(4096)
+        key = [line.split(b":", 1)[1].strip() for line in request.split(b"\r\n")
+               if line.lower().startswith(b"sec-websocket-key")][0]
+        accept = base64.b64encode(hashlib.sha1(key + b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11").digest())
+        conn.sendall(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+                     b"Connection: Upgrade\r\nSec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+        conn.sendall(self.frames)
+        try:
+            conn.recv(16)  # client's close reply
+        except OSError:
+            pass
+        conn.close()
+        self.listener.close()
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+def coingecko_fixture(query):
+    return 200, {
+        "bitcoin": {"usd": 65123.45, "usd_24h_change": 1.23},
+        "ethereum": {"usd": 3456.78, "usd_24h_change": -0.45},
+        "solana": {"usd": 181.2, "usd_24h_change": 3.1}
+    }
+
+def binance_fixture(query):
+    symbols = json.loads(query["symbols"][0])
+    return 200, [
+        {"symbol": symbol, "lastPrice": "65100.00", "priceChangePercent": "1.20"}
+        for symbol in symbols
+    ]
+
+def paprika_fixture(query):
+    return 200, [
+        {"symbol": "BTC", "quotes": {"USD": {"price": 65090.0, "percent_change_24h": 1.1}}},
+        {"symbol": "ETH", "quotes": {"USD": {"price": 3450.0, "percent_change_24h": -0.5}}}
+    ]
+
+def paprika_large_fixture(coins):
+    """Recorded-shape /v1/tickers payload with `coins` entries, top coins first"""
+    top = ["BTC", "ETH", "USDT", "BNB", "SOL"]
+    tickers = []
+    for rank in range(1, coins + 1):
+        symbol = top[rank - 1] if rank <= len(top) else f"ALT{rank}"
+        tickers.append({
+            "id": f"{symbol.lower()}-coin", "name": f"{symbol} Coin", "symbol": symbol,
+            "rank": rank, "circulating_supply": 19500000, "total_supply": 21000000,
+            "max_supply": 21000000, "beta_value": 0.98, "first_data_at": "2010-07-17T00:00:00Z",
+            "last_updated": "2024-05-01T09:00:00Z",
+            "quotes": {"USD": {
+                "price": 65000.0 / rank, "volume_24h": 2.1e10, "volume_24h_change_24h": -3.2,
+                "market_cap": 1.27e12, "market_cap_change_24h": 0.8, "percent_change_15m": 0.1,
+                "percent_change_30m": 0.2, "percent_change_1h": 0.3, "percent_change_6h": 0.9,
+                "percent_change_12h": 1.1, "percent_change_24h": 1.4, "percent_change_7d": 4.2,
+                "percent_change_30d": 9.8, "percent_change_1y": 120.5, "ath_price": 73750.0,
+                "ath_date": "2024-03-14T07:10:00Z", "percent_from_price_ath": -11.9
+            }}
+        })
+    return json.dumps(tickers).encode()
+
+def telegram_fixture(query):
+    return 200, {"ok": True, "result": {"message_id": 1}}
+
+def telegram_flaky_fixture(every=3, retry_after=1):
+    """Fake Bot API answering every `every`-th send with 429 retry_after"""
+    calls = {"n": 0}
+    lock = threading.Lock()
+
+    def responder(query):
+        with lock:
+            calls["n"] += 1
+            throttle = calls["n"] % every == 0
+        if throttle:
+            return 429, {"ok": False, "error_code": 429,
+                         "description": f"Too Many Requests: retry after {retry_after}",
+                         "parameters": {"retry_after": retry_after}}
+        return telegram_fixture(query)
+    return responder
+
+def failing(query):
+    return 500, {"error": "upstream unavailable"}
+
+def fgi_fixture(query):
+    return 200, {"data": [{"value": "61", "value_classification": "Greed", "timestamp": "1700000000"}]}
+
+def cryptopanic_fixture(query):
+    return 200, {"results": [
+        {"title": "Bitcoin ETF sees record inflows", "source": {"title": "CoinDesk"},
+         "url": "https://example.com/a", "votes": {"positive": 42}}
+    ]}
+
+def point_price_apis(stub):
+    bot.ProductionConfig.COINGECKO_API = stub.url
+    bot.ProductionConfig.BINANCE_API = stub.url
+    bot.ProductionConfig.COINPAPRIKA_API = stub.url
+
+def point_all_apis(stub):
+    point_price_apis(stub)
+    bot.ProductionConfig.FGI_API = stub.url
+    bot.ProductionConfig.CRYPTOPANIC_API = stub.url
+
+# ============================================================================
+# FAULT INJECTION
+# ============================================================================
+class Faults:
+    """Wrap a responder with random 5xx errors and a 429 on every Nth request"""
+
+    def __init__(self, error_rate=0.0, throttle_every=0, retry_after=1, seed=0):
+        self.error_rate = error_rate
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.injected = Counter()
+        self.lock = threading.Lock()
+
+    def wrap(self, responder):
+        def faulty(query):
+            with self.lock:
+                self.calls += 1
+                throttle = self.throttle_every and self.calls % self.throttle_every == 0
+                error = not throttle and self.rng.random() < self.error_rate
+                if throttle or error:
+                    self.injected[429 if throttle else 503] += 1
+            if throttle:
+                return 429, {"ok": False, "error_code": 429,
+                             "description": f"Too Many Requests: retry after {self.retry_after}",
+                             "parameters": {"retry_after": self.retry_after}}, \
+                    {"Retry-After": str(self.retry_after)}
+            if error:
+                return 503, {"error": "injected upstream failure"}
+            return responder(query)
+        return faulty
+
+# ============================================================================
+# SIMULATED UPSTREAMS
+# ============================================================================
+class FakeMarket:
+    """Random-walk prices shared by the three price APIs, advanced by the clock"""
+
+    START_PRICES = {"BTC": 65000.0, "ETH": 3400.0, "SOL": 170.0, "BNB": 580.0,
+                    "XRP": 0.52, "ADA": 0.45, "DOT": 7.0, "DOGE": 0.15}
+    DAILY_VOLATILITY = 0.03  # standard deviation of one day's log return
+
+    def __init__(self, clock=bot.Clock.time, seed=1, extra_coins=0):
+        """The bot's built-in coins plus `extra_coins` synthetic ones (C0001, C0002, ...)"""
+        self.clock = clock
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.coins = FakeMarket.universe(extra_coins)  # rank order
+        self.by_gecko = {coin["coingecko"]: coin for coin in self.coins}
+        self.by_pair = {coin["binance"]: coin for coin in self.coins}
+        self.updated_at = clock()
+        self.prices = {coin["symbol"]: FakeMarket.START_PRICES.get(coin["symbol"], 10.0 / coin["rank"] ** 0.5)
+                       for coin in self.coins}
+        self.hourly = [(self.updated_at, dict(self.prices))]  # last day's hourly marks
+        self.skews = {}  # (provider, symbol) -> price multiplier, for a provider that's off
+        self.lags = {}   # provider -> seconds its quotes are behind (stamped older)
+
+    @staticmethod
+    def universe(extra_coins=0):
+        """CoinUniverse-shaped entries, ranked"""
+        coins = [bot.CoinUniverse.entry(*coin) for coin in bot.CoinUniverse.DEFAULT_COINS]
+        for n in range(1, extra_coins + 1):
+            coins.append(bot.CoinUniverse.entry(f"C{n:04d}", f"Coin {n:04d}", f"coin-{n:04d}",
+                                                f"C{n:04d}USDT", f"c{n:04d}-coin-{n:04d}"))
+        for rank, coin in enumerate(coins, 1):
+            coin["rank"] = rank
+        return coins
+
+    def quotes(self):
+        """symbol -> (price, % change over the past 24h) at the clock's time"""
+        with self.lock:
+            now = self.clock()
+            elapsed = now - self.updated_at
+            if elapsed > 0:
+                sigma = FakeMarket.DAILY_VOLATILITY * math.sqrt(elapsed / 86400)
+                for symbol in self.prices:
+                    self.prices[symbol] *= math.exp(self.rng.gauss(0, sigma))
+                self.updated_at = now
+                if now - self.hourly[-1][0] >= 3600:
+                    self.hourly.append((now, dict(self.prices)))
+                while len(self.hourly) > 1 and now - self.hourly[1][0] >= 86400:
+                    self.hourly.pop(0)
+            base = self.hourly[0][1]
+            return {symbol: (price, (price / base[symbol] - 1) * 100)
+                    for symbol, price in self.prices.items()}
+
+    def quote(self, provider, coin, quotes):
+        """(price, change, 24h volume, updated_at) as `provider` reports it"""
+        price, change = quotes[coin["symbol"]]
+        price *= self.skews.get((provider, coin["symbol"]), 1.0)
+        return price, change, price * 2e6 / coin["rank"], self.clock() - self.lags.get(provider, 0)
+
+    def coingecko(self, query):
+        quotes = self.quotes()
+        prices = {}
+        for coin_id in (query.get("ids") or [""])[0].split(","):
+            coin = self.by_gecko.get(coin_id)
+            if coin:
+                price, change, volume, updated = self.quote("coingecko", coin, quotes)
+                prices[coin_id] = {"usd": round(price, 6), "usd_24h_change": change,
+                                   "usd_24h_vol": volume, "last_updated_at": int(updated)}
+        return 200, prices
+
+    def binance(self, query):
+        quotes = self.quotes()
+        tickers = []
+        for pair in json.loads(query["symbols"][0]):
+            coin = self.by_pair.get(pair)
+            if coin is None:
+                return 400, {"code": -1121, "msg": "Invalid symbol."}
+            price, change, volume, updated = self.quote("binance", coin, quotes)
+            tickers.append({"symbol": pair, "lastPrice": f"{price:.8f}",
+                            "priceChangePercent": f"{change:.3f}",
+                            "quoteVolume": f"{volume:.2f}", "closeTime": int(updated * 1000)})
+        return 200, tickers
+
+    def paprika(self, query):
+        quotes = self.quotes()
+        tickers = []
+        for coin in self.coins:
+            price, change, volume, updated = self.quote("coinpaprika", coin, quotes)
+            stamp = datetime.fromtimestamp(updated, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+            tickers.append({"id": coin["paprika"], "name": coin["name"], "symbol": coin["symbol"],
+                            "rank": coin["rank"], "last_updated": stamp,
+                            "quotes": {"USD": {"price": price, "volume_24h": volume,
+                                               "percent_change_24h": change}}})
+        return 200, tickers
+
+    def coingecko_list(self, query):
+        return 200, [{"id": coin["coingecko"], "symbol": coin["symbol"].lower(), "name": coin["name"]}
+                     for coin in self.coins]
+
+    def binance_prices(self, query):
+        quotes = self.quotes()
+        return 200, [{"symbol": coin["binance"], "price": f"{quotes[coin['symbol']][0]:.8f}"}
+                     for coin in self.coins]
+
+    def fear_greed(self, query):
+        change = self.quotes()["BTC"][1]
+        value = int(min(max(50 + change * 5, 5), 95))
+        label = ("Extreme Fear" if value < 25 else "Fear" if value < 45 else
+                 "Neutral" if value < 55 else "Greed" if value < 75 else "Extreme Greed")
+        return 200, {"data": [{"value": str(value), "value_classification": label,
+                               "timestamp": str(int(self.clock()))}]}
+
+class FakeNewsFeed:
+    """CryptoPanic-shaped feed: stories arrive over time and gather votes; ETag/304 aware"""
+
+    SUBJECTS = ["Bitcoin", "Ethereum", "Solana", "BNB Chain", "XRP", "Cardano", "Dogecoin"]
+    ROUTINE = ["{} holds steady as traders eye macro data", "{} developers ship network upgrade",
+               "Analysts split on {} outlook for the quarter", "{} ETF sees record inflows",
+               "{} whale wallets grow for a third week", "{} funding rates turn positive"]
+    HOT = ["BREAKING: {} exchange halts withdrawals after exploit",
+           "URGENT: SEC approval lands for spot {} ETF",
+           "{} liquidations top $1B as price plunge deepens"]
+    DOMAINS = ["coindesk.com", "theblock.co", "decrypt.co", "cointelegraph.com", "example.com"]
+    BACKLOG = 6 * 3600  # seconds of stories already published at start
+
+    def __init__(self, clock=bot.Clock.time, stories_per_hour=4.0, hot_share=0.03, page_size=20, seed=2):
+        self.clock = clock
+        self.rate = stories_per_hour
+        self.hot_share = hot_share
+        self.page_size = page_size
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stories = []
+        self.next_at = None  # set on the first request, so a clock swapped in later still works
+        self.not_modified = 0
+
+    def arrivals(self, now):
+        """Publish the stories due by now (Poisson arrivals)"""
+        if self.next_at is None:
+            self.next_at = now - FakeNewsFeed.BACKLOG  # a feed that already has stories
+        while self.next_at <= now:
+            hot = self.rng.random() < self.hot_share
+            title = self.rng.choice(FakeNewsFeed.HOT if hot else FakeNewsFeed.ROUTINE)
+            self.stories.append({
+                "id": len(self.stories) + 1,
+                "title": title.format(self.rng.choice(FakeNewsFeed.SUBJECTS)),
+                "domain": self.rng.choice(FakeNewsFeed.DOMAINS),
+                "published": self.next_at,
+                "pace": self.rng.uniform(40, 400) if hot else self.rng.uniform(0.5, 6)  # votes per hour
+            })
+            self.next_at += self.rng.expovariate(self.rate / 3600)
+
+    def page(self, now):
+        latest = self.stories[-self.page_size:][::-1]
+        results = []
+        for story in latest:
+            hours = max(now - story["published"], 0) / 3600
+            votes = int(story["pace"] * min(hours, 3))  # interest plateaus after a few hours
+            results.append({
+                "id": story["id"], "title": story["title"], "url": f"https://{story['domain']}/{story['id']}",
+                "source": {"title": story["domain"].split(".")[0].title(), "domain": story["domain"]},
+                "published_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(story["published"])),
+                "votes": {"positive": votes, "important": votes // 10}
+            })
+        return {"results": results, "next": None}
+
+    def posts(self, query, headers):
+        with self.lock:
+            now = self.clock()
+            self.arrivals(now)
+            page = self.page(now)
+        if "q" in query:
+            needle = query["q"][0].upper()
+            page["results"] = [r for r in page["results"] if needle in r["title"].upper()]
+        body = json.dumps(page).encode()
+        etag = '"%s"' % hashlib.md5(body).hexdigest()[:16]
+        if headers.get("If-None-Match") == etag:
+            self.not_modified += 1
+            return 304, b"", {"ETag": etag}
+        return 200, body, {"ETag": etag}
+
+class FakeTelegram:
+    """Bot API sendMessage that records what was posted"""
+
+    def __init__(self, clock=bot.Clock.time):
+        self.clock = clock
+        self.messages = []
+        self.lock = threading.Lock()
+
+    def send_message(self, body):
+        try:
+            message = json.loads(body or b"{}")
+        except ValueError:
+            message = {k: v[0] for k, v in parse_qs(body.decode()).items()}
+        with self.lock:
+            message_id = len(self.messages) + 1
+            self.messages.append({"id": message_id, "chat_id": message.get("chat_id"),
+                                  "text": message.get("text", ""), "at": self.clock()})
+        return 200, {"ok": True, "result": {"message_id": message_id}}
+
+class BotClock:
+    """Clock for fakes serving a bot in another process
+    
+    The bot's time from the request being answered (HttpTransport.CLOCK_HEADER,
+    sent on a virtual clock), else this process's wall clock.
+    """
+
+    def __init__(self, stub=None):
+        self.stub = stub
+
+    def __call__(self):
+        stamp = self.stub.last_headers.get(bot.HttpTransport.CLOCK_HEADER) if self.stub else None
+        return float(stamp) if stamp else time.time()
+
+class FakeUpstreams:
+    """Every upstream API on one local server, each under its own path prefix"""
+
+    PREFIXES = {
+        "COINGECKO_API": "/coingecko/api/v3",
+        "BINANCE_API": "/binance/api/v3",
+        "COINPAPRIKA_API": "/coinpaprika/v1",
+        "FGI_API": "/fgi",
+        "CRYPTOPANIC_API": "/cryptopanic/api/v1",
+        "TELEGRAM_API": "/telegram"
+    }
+
+    def __init__(self, clock=bot.Clock.time, latency=None, faults=None, token="TEST",
+                 stories_per_hour=4.0, seed=1, extra_coins=0):
+        """latency and faults: {config name: seconds / Faults}, e.g. {"TELEGRAM_API": Faults(throttle_every=20)}"""
+        latency = latency or {}
+        faults = faults or {}
+        self.token = token
+        self.stub = StubServer()
+        self.market = FakeMarket(clock, seed, extra_coins)
+        self.news = FakeNewsFeed(clock, stories_per_hour, seed=seed + 1)
+        self.telegram = FakeTelegram(clock)
+
+        routes = [
+            ("COINGECKO_API", "/simple/price", self.market.coingecko),
+            ("BINANCE_API", "/ticker/24hr", self.market.binance),
+            ("COINPAPRIKA_API", "/tickers", self.market.paprika),
+            ("COINGECKO_API", "/coins/list", self.market.coingecko_list),
+            ("BINANCE_API", "/ticker/price", self.market.binance_prices),
+            ("FGI_API", "/fng/", self.market.fear_greed),
+            ("CRYPTOPANIC_API", "/posts/", lambda query: self.news.posts(query, self.stub.last_headers)),
+            ("TELEGRAM_API", f"/bot{token}/sendMessage",
+             lambda query: self.telegram.send_message(self.stub.last_body))
+        ]
+        for name, path, responder in routes:
+            self.stub.route(FakeUpstreams.PREFIXES[name] + path, responder,
+                            latency=latency.get(name, 0.0), faults=faults.get(name))
+
+    def env(self):
+        """Environment variables pointing the bot at these fakes"""
+        env = {name: self.stub.url + prefix for name, prefix in FakeUpstreams.PREFIXES.items()}
+        env["BOT_TOKEN"] = self.token
+        return env
+
+    def apply(self):
+        """Point an imported bot's config at these fakes"""
+        for name, value in self.env().items():
+            setattr(bot.ProductionConfig, name, value)
+
+    def request_counts(self):
+        """Requests served per upstream, keyed by config name"""
+        counts = Counter()
+        for path in list(self.stub.requests):
+            for name, prefix in FakeUpstreams.PREFIXES.items():
+                if path.startswith(prefix + "/"):
+                    counts[name] += 1
+                    break
+        return counts
+
+    def close(self):
+        self.stub.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve fake upstream APIs for the bot")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 503 answers per API")
+    parser.add_argument("--throttle-every", type=int, default=0, help="429 on every Nth Telegram send")
+    parser.add_argument("--stories-per-hour", type=float, default=4.0)
+    parser.add_argument("--extra-coins", type=int, default=0, help="synthetic coins beyond the built-in list")
+    args = parser.parse_args()
+
+    latency = {name: args.latency for name in FakeUpstreams.PREFIXES}
+    faults = {name: Faults(error_rate=args.error_rate, seed=n)
+              for n, name in enumerate(FakeUpstreams.PREFIXES)}
+    faults["TELEGRAM_API"].throttle_every = args.throttle_every
+    if args.port:
+        StubServer.PORT = args.port
+    clock = BotClock()  # follows a bot on a virtual clock (CLOCK=virtual) as well as a live one
+    fakes = FakeUpstreams(clock=clock, latency=latency, faults=faults, stories_per_hour=args.stories_per_hour,
+                          extra_coins=args.extra_coins)
+    clock.stub = fakes.stub
+
+    print("# Fake upstreams running; point the bot at them with:")
+    for name, value in fakes.env().items():
+        print(f"export {name}={value}")
+    print("export CHANNEL_ID=-1000000000000")
+    sys.stdout.flush()
+    try:
+        while True:
+            time.sleep(60)
+            print(f"# requests: {dict(fakes.request_counts())}, telegram messages: {len(fakes.telegram.messages)}")
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        fakes.close()
+
+if __name__ == "__main__":
+    main()
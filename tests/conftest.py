@@ -0,0 +1,82 @@
+"""
+Shared fixtures: every test gets its own state files and fresh process-wide singletons
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bot
+from harness import FakeUpstreams, StubServer, point_price_apis
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path):
+    """Point every state path at tmp_path; restore config and singletons afterwards"""
+    config = {name: value for name, value in vars(bot.ProductionConfig).items() if name.isupper()}
+    bot.ProductionConfig.STATE_PATH = str(tmp_path / "bot_state.json")
+    bot.ProductionConfig.OUTBOX_PATH = str(tmp_path / "outbox.db")
+    bot.ProductionConfig.SEEN_PATH = str(tmp_path / "seen_stories.db")
+    bot.ProductionConfig.HISTORY_DIR = str(tmp_path / "price_history")
+    bot.ProductionConfig.COIN_INDEX_PATH = str(tmp_path / "coin_index.json")
+    bot.ProductionConfig.COIN_UNIVERSE = ""
+    bot.ProductionConfig.CHANNEL_ID = "-1001"
+    bot.ProductionConfig.CHANNEL_IDS = ""
+    clock = bot.Clock.use(bot.WallClock())
+    reset_singletons()
+    yield tmp_path
+    reset_singletons()
+    bot.Clock.use(clock)
+    for name, value in config.items():
+        setattr(bot.ProductionConfig, name, value)
+
+
+def reset_singletons():
+    """Flush and drop everything bot.py keeps per process"""
+    if bot.StateStore._default is not None:
+        bot.StateStore._default.flush()  # cancels the pending write timer
+        bot.StateStore._default = None
+    if bot.OutboundQueue._default is not None:
+        bot.OutboundQueue._default.stop_worker()
+        bot.OutboundQueue._default = None
+    if bot.BreakingNewsMonitor._seen is not None and bot.BreakingNewsMonitor._seen.journal:
+        bot.BreakingNewsMonitor._seen.journal.close()
+    bot.BreakingNewsMonitor._seen = None
+    for ring in bot.PriceHistory._rings.values():
+        ring.close()
+    bot.PriceHistory._rings.clear()
+    bot.IndicatorEngine._sets.clear()
+    bot.RealTimeAPIs.cache.clear()
+    bot.RealTimeAPIs._news_validators = {}
+    bot.RealTimeAPIs._refreshing.clear()
+    bot.CoinUniverse.reset()
+    bot.AdaptivePoller.current = None
+    bot.HttpTransport.reset()
+    bot.Metrics.reset()
+
+
+@pytest.fixture
+def fakes():
+    """Every upstream API on one loopback server, with ProductionConfig pointed at it"""
+    upstreams = FakeUpstreams()
+    upstreams.apply()
+    yield upstreams
+    upstreams.close()
+
+
+@pytest.fixture
+def stub():
+    """An empty loopback stub server; routes are added by the test"""
+    server = StubServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def price_stub(stub):
+    """The stub server with every price API pointed at it"""
+    point_price_apis(stub)
+    return stub
@@ -0,0 +1,58 @@
+"""
+Price alerts: provenance line, bot-timezone timestamps and virtual-clock replays
+"""
+
+import json
+
+import bot
+
+START = 1_700_000_000  # 2023-11-14 22:13:20 UTC, 03:43 in Asia/Kolkata
+
+
+def mini_ticker(price, ts):
+    return json.dumps({"stream": "btcusdt@miniTicker", "data": {
+        "e": "24hrMiniTicker", "E": int(ts * 1000), "s": "BTCUSDT", "c": f"{price:.2f}",
+        "o": "0", "h": "0", "l": "0", "v": "0", "q": "0"}})
+
+
+def replay_file(tmp_path, prices):
+    path = tmp_path / "ticks.jsonl"
+    path.write_text("\n".join(mini_ticker(price, START + i) for i, price in enumerate(prices)))
+    return str(path)
+
+
+def test_replay_is_labelled_as_recorded(tmp_path):
+    path = replay_file(tmp_path, [69000.0, 69500.0, 70500.0])
+    posts = []
+    bot.PriceAlertStream.consume(path, bot.PriceAlertEngine(levels={"BTC": [70000.0]}), posts.append)
+    assert len(posts) == 1
+    assert "Recorded ticks: ticks.jsonl (replay)" in posts[0]
+    assert "Live data" not in posts[0]
+
+
+def test_live_stream_label():
+    assert bot.PriceAlertStream.source_label("wss://stream.binance.com:9443/stream") == "Live data: Binance stream"
+
+
+def test_alert_time_is_in_the_bot_timezone():
+    engine = bot.PriceAlertEngine(levels={})
+    post = engine.create_alert_post({"symbol": "BTC", "kind": "level", "direction": "above", "level": 70000.0,
+                                     "price": 70123.0, "ts": START})
+    assert "03:43 IST" in post
+
+
+def test_virtual_replay_ends_at_the_last_tick(tmp_path):
+    path = replay_file(tmp_path, [69000.0 + 10 * i for i in range(50)])
+    bot.Clock.use(bot.VirtualClock(0))
+    bot.PriceAlertStream.consume(path, bot.PriceAlertEngine(levels={"BTC": [70000.0]}), lambda post: None)
+    assert bot.Clock.time() == START + 49
+
+
+def test_move_alert_fires_once_per_cooldown():
+    engine = bot.PriceAlertEngine(window=300, move_pct=2.0, cooldown=600, levels={})
+    alerts = []
+    for second in range(0, 900, 10):
+        alerts += engine.on_tick("ETH", 3000.0 * 1.001 ** (second / 10), START + second)
+    moves = [alert for alert in alerts if alert["kind"] == "move"]
+    assert len(moves) == 2  # one per 10-minute cooldown
+    assert moves[0]["change"] >= 2.0
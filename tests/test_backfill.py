@@ -0,0 +1,123 @@
+"""
+History backfill: timestamp units, rejected rows and dumps in any row order
+"""
+
+import gzip
+from datetime import datetime
+
+import pytest
+import pytz
+
+import bot
+
+T0 = 1_600_000_000  # 2020-09-13, whole minute
+
+
+def write_klines(path, stamps, price=lambda i: 100.0 + i):
+    """Header-less Binance-style kline rows: open_time, open, high, low, close, volume, ..."""
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "wt") as f:
+        for i, stamp in enumerate(stamps):
+            f.write(f"{stamp},1,1,1,{price(i)},{i % 5},{stamp},0,0,0,0,0\n")
+    return str(path)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1600000000", T0),
+    ("1600000000000", T0),
+    ("1600000000000000", T0),
+    ("1600000000.5", T0 + 0.5),
+    ("2020-09-13T12:26:40Z", T0),
+    ("2020-09-13 12:26:40", T0),
+    (datetime(2020, 9, 13, 12, 26, 40), T0),
+    (pytz.utc.localize(datetime(2020, 9, 13, 12, 26, 40)), T0),
+])
+def test_parse_ts_units(value, expected):
+    assert bot.HistoryImporter.parse_ts(value) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("scale", [1, 1000, 1_000_000])
+def test_numeric_columns_in_any_unit(scale):
+    ts, price, volume, bad = bot.HistoryImporter.to_arrays(
+        [str((T0 + i * 60) * scale) for i in range(3)], ["1", "2", "3"], None)
+    assert list(ts) == [T0, T0 + 60, T0 + 120] and bad == 0
+    assert list(volume) == [0.0, 0.0, 0.0]
+
+
+def test_junk_rows_are_counted_not_imported():
+    ts, price, volume, bad = bot.HistoryImporter.to_arrays(
+        [str(T0), "", "2020-09-13T12:28:40Z", "soon"], ["1", "2", "3", "4"], ["1", "1", "", "1"])
+    assert list(ts) == [T0, T0 + 120] and list(volume) == [1.0, 0.0] and bad == 2
+
+
+def test_future_rows_are_rejected():
+    now = bot.Clock.time()
+    stamps = [str(int(T0 * 1000)), str(int((now + 2 * 86400) * 1000)), str(int(now * 1e6) * 1000)]
+    ts, price, volume, bad = bot.HistoryImporter.to_arrays(stamps, ["1", "2", "3"], None)
+    assert list(ts) == [T0] and list(price) == [1.0] and bad == 2
+
+
+def test_future_row_does_not_block_later_samples(tmp_path):
+    bot.Clock.use(bot.VirtualClock(T0 + 3600))
+    path = write_klines(tmp_path / "BTCUSDT.csv", [T0 * 1000, (T0 + 10 * 365 * 86400) * 1000])
+    stats = bot.HistoryImporter.run(path)
+    assert (stats["imported"], stats["bad"]) == (1, 1)
+    assert bot.PriceHistory.ring("BTC").append(T0 + 3600, 105.0)
+
+
+def test_descending_dump_imports_every_row(tmp_path, monkeypatch):
+    monkeypatch.setattr(bot.HistoryImporter, "CHUNK_ROWS", 1000)
+    count = 5000
+    path = write_klines(tmp_path / "BTCUSDT-1m.csv.gz", [(T0 + i * 60) * 1000 for i in reversed(range(count))],
+                        price=lambda i: 100.0 + (count - 1 - i))
+    stats = bot.HistoryImporter.run(path)
+    assert (stats["rows"], stats["imported"], stats["older"]) == (count, count, 0)
+    ring = bot.PriceHistory.ring("BTC")
+    assert [price for _, price, _ in ring.window(T0)] == [100.0 + i for i in range(count)]
+
+
+def test_descending_dump_larger_than_the_ring_keeps_the_newest(tmp_path, monkeypatch):
+    monkeypatch.setattr(bot.HistoryImporter, "CHUNK_ROWS", 1000)
+    count = 5000
+    path = write_klines(tmp_path / "BTCUSDT.csv", [T0 + i * 60 for i in reversed(range(count))],
+                        price=lambda i: 100.0 + (count - 1 - i))
+    stats = bot.HistoryImporter.run(path, capacity=1500)
+    assert (stats["imported"], stats["older"]) == (1500, count - 1500)
+    assert bot.PriceHistory.ring("BTC").window(T0)[0][:2] == (T0 + (count - 1500) * 60, 100.0 + count - 1500)
+
+
+def test_shuffled_chunks_are_merged(tmp_path, monkeypatch):
+    monkeypatch.setattr(bot.HistoryImporter, "CHUNK_ROWS", 100)
+    order = list(range(200, 300)) + list(range(100)) + list(range(100, 200))  # each chunk sorted, chunks not
+    path = write_klines(tmp_path / "ETHUSDT.csv", [T0 + i * 60 for i in order], price=lambda i: float(order[i]))
+    stats = bot.HistoryImporter.run(path)
+    assert stats["imported"] == 300
+    assert [price for _, price, _ in bot.PriceHistory.ring("ETH").window(T0)] == [float(i) for i in range(300)]
+
+
+def test_ascending_dump_writes_as_it_reads_and_reimport_is_a_no_op(tmp_path, monkeypatch):
+    monkeypatch.setattr(bot.HistoryImporter, "CHUNK_ROWS", 100)
+    path = write_klines(tmp_path / "SOLUSDT.csv", [T0 + i * 60 for i in range(250)])
+    assert bot.HistoryImporter.run(path)["imported"] == 250
+    again = bot.HistoryImporter.run(path)
+    assert (again["imported"], again["older"]) == (0, 250)
+
+
+def test_headered_multi_symbol_dump(tmp_path):
+    path = tmp_path / "mixed.csv"
+    with open(path, "w") as f:
+        f.write("date,symbol,open,high,low,close,volume\n")
+        for i in reversed(range(10)):
+            stamp = datetime.fromtimestamp(T0 + i * 60, pytz.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+            f.write(f"{stamp},BTCUSDT,1,1,1,{100 + i},{i}\n{stamp},ETH-USD,1,1,1,{10 + i},{i}\n")
+    stats = bot.HistoryImporter.run(str(path))
+    assert stats["symbols"] == {"BTC": 10, "ETH": 10}
+    assert bot.PriceHistory.ring("ETH").latest() == (T0 + 540, 19.0)
+
+
+def test_extend_sorts_unordered_rows(tmp_path):
+    from array import array
+    ring = bot.PriceRing(str(tmp_path / "X.ring"), 16)
+    assert ring.extend(array("d", [T0 + 120, T0, T0 + 60]), array("d", [3.0, 1.0, 2.0]), array("d", [0.0] * 3)) == 3
+    assert [price for _, price, _ in ring.window(T0)] == [1.0, 2.0, 3.0]
+    ring.close()
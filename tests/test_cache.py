@@ -0,0 +1,104 @@
+"""
+TTLCache and RealTimeAPIs.cached: expiry, LRU eviction, stats and stale-while-revalidate
+"""
+
+import threading
+import time
+
+import pytest
+
+import bot
+
+
+@pytest.fixture
+def clock():
+    clock = bot.VirtualClock(1_000)
+    bot.Clock.use(clock)
+    return clock
+
+
+def test_entry_expires_after_its_ttl(clock):
+    cache = bot.TTLCache(default_ttl=60)
+    cache.set("prices", {"BTC": 1})
+    clock.sleep(59)
+    assert cache.get("prices") == {"BTC": 1}
+    clock.sleep(1)
+    assert cache.get("prices") is None
+    assert cache.stats["expired"] == 1
+
+
+def test_per_entry_ttl_overrides_the_default(clock):
+    cache = bot.TTLCache(default_ttl=60)
+    cache.set("news", ["story"], ttl=300)
+    clock.sleep(120)
+    assert cache.get("news") == ["story"]
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = bot.TTLCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats["evictions"] == 1
+
+
+def test_snapshot_reports_hit_ratio(clock):
+    cache = bot.TTLCache()
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("a")
+    cache.get("missing")
+    snapshot = cache.snapshot()
+    assert snapshot["size"] == 1
+    assert snapshot["hits"] == 2 and snapshot["misses"] == 1
+    assert snapshot["hit_ratio"] == pytest.approx(0.667)
+
+
+class SteppedClock(bot.VirtualClock):
+    """Hand-moved time that still takes the wall-clock paths (background refreshes)"""
+
+    virtual = False
+
+
+def test_stale_value_is_served_while_it_refreshes():
+    clock = SteppedClock(1_000)
+    bot.Clock.use(clock)
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(clock.time())
+        if len(calls) > 1:
+            release.wait(5)
+        return {"BTC": len(calls)}
+
+    assert bot.RealTimeAPIs.cached("crypto_prices", fetch) == {"BTC": 1}
+    clock.sleep(bot.RealTimeAPIs.CACHE_TTLS["crypto_prices"] + 1)
+    assert bot.RealTimeAPIs.cached("crypto_prices", fetch) == {"BTC": 1}  # answered before the refresh lands
+    assert bot.RealTimeAPIs.cached("crypto_prices", fetch) == {"BTC": 1}
+    release.set()
+    deadline = time.monotonic() + 5
+    while bot.RealTimeAPIs.cache.get("crypto_prices") != {"BTC": 2} and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert bot.RealTimeAPIs.cache.get("crypto_prices") == {"BTC": 2}
+    assert len(calls) == 2  # one background refresh, however many stale reads
+
+
+def test_value_past_its_stale_window_is_fetched_inline(clock):
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return {"BTC": len(calls)}
+
+    bot.RealTimeAPIs.cached("crypto_prices", fetch)
+    clock.sleep(bot.RealTimeAPIs.CACHE_TTLS["crypto_prices"] + bot.RealTimeAPIs.STALE_TTLS["crypto_prices"])
+    assert bot.RealTimeAPIs.cached("crypto_prices", fetch) == {"BTC": 2}
+
+
+def test_failed_fetch_is_not_cached(clock):
+    assert bot.RealTimeAPIs.cached("crypto_prices", lambda: None) is None
+    assert bot.RealTimeAPIs.cached("crypto_prices", lambda: {"BTC": 1}) == {"BTC": 1}
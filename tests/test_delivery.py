@@ -0,0 +1,113 @@
+"""
+Delivery: channel list, rate-limited fan-out and the persistent outbox
+"""
+
+import json
+import time
+
+import bot
+from harness import telegram_fixture, telegram_flaky_fixture
+
+CHANNELS = [{"chat_id": f"-100{i}", "label": f"ch{i}"} for i in range(10)]
+
+
+def point_telegram(stub, responder):
+    stub.route("/botTEST/sendMessage", responder)
+    bot.ProductionConfig.TELEGRAM_API = stub.url
+    bot.ProductionConfig.BOT_TOKEN = "TEST"
+    bot.FanOutDispatcher.global_bucket = bot.TokenBucket(bot.ProductionConfig.TELEGRAM_GLOBAL_RATE)
+    bot.FanOutDispatcher.chat_buckets.clear()
+
+
+def drain(queue, timeout=10):
+    queue.start_worker()
+    deadline = time.monotonic() + timeout
+    while queue.delivery_stats()["pending"] and time.monotonic() < deadline:
+        time.sleep(0.02)
+    queue.stop_worker()
+    return queue.delivery_stats()
+
+
+def test_channel_list_merges_and_dedupes():
+    bot.ProductionConfig.CHANNEL_ID = "-1001"
+    bot.ProductionConfig.CHANNEL_IDS = "-1002:alerts, -1001:main ,,-1003"
+    assert bot.ChannelRegistry.channels() == [
+        {"chat_id": "-1001", "label": "-1001"},
+        {"chat_id": "-1002", "label": "alerts"},
+        {"chat_id": "-1003", "label": "-1003"}
+    ]
+
+
+def test_one_post_reaches_every_channel(stub, tmp_path):
+    point_telegram(stub, telegram_fixture)
+    queue = bot.OutboundQueue(str(tmp_path / "outbox.db"))
+    queue.enqueue("Fan-out test", "news", CHANNELS)
+    assert queue.drain_once() == len(CHANNELS)
+    assert len(stub.requests) == len(CHANNELS)
+    assert queue.delivery_stats()["sent"] == len(CHANNELS)
+
+
+def test_chat_rate_defaults_to_telegram_channel_limit():
+    assert bot.ProductionConfig.TELEGRAM_CHAT_RATE * 60 <= 20
+
+
+def test_sends_to_one_chat_are_spaced_by_its_bucket(stub, tmp_path):
+    point_telegram(stub, telegram_fixture)
+    bot.ProductionConfig.TELEGRAM_CHAT_RATE = 2  # bucket holds 2 tokens
+    queue = bot.OutboundQueue(str(tmp_path / "outbox.db"))
+    for n in range(3):
+        queue.enqueue(f"Post {n}", "news", CHANNELS[:1])
+    started = time.monotonic()
+    queue.drain_once()
+    assert time.monotonic() - started >= 0.5 - 0.01  # the third send waits for a token
+    assert len(stub.requests) == 3
+
+
+def test_token_bucket_waits_for_a_token():
+    bucket = bot.TokenBucket(20)
+    waits = [bucket.acquire() for _ in range(22)]
+    assert waits[:20] == [0.0] * 20
+    assert 0 < waits[21] <= 0.1
+
+
+def test_outbox_retries_throttled_sends_and_skips_duplicates(stub, tmp_path):
+    point_telegram(stub, telegram_flaky_fixture(every=3))
+    bot.ProductionConfig.TELEGRAM_CHAT_RATE = 100  # two posts per chat back to back
+    queue = bot.OutboundQueue(str(tmp_path / "outbox.db"))
+    queue.enqueue("Outbox post 0", "news", CHANNELS)
+    queue.enqueue("Outbox post 1", "news", CHANNELS)
+    assert queue.enqueue("Outbox post 0", "news", CHANNELS) == 0
+    stats = drain(queue)
+    assert stats["pending"] == 0
+    assert stats["sent"] == 2 * len(CHANNELS)
+    assert stats["duplicates"] == len(CHANNELS)
+    assert stats["retried"] > 0
+
+
+def test_pending_rows_survive_a_restart(stub, tmp_path):
+    point_telegram(stub, telegram_fixture)
+    path = str(tmp_path / "outbox.db")
+    bot.OutboundQueue(path).enqueue("Survives restart", "news", CHANNELS[:3])
+    stats = drain(bot.OutboundQueue(path))
+    assert stats["pending"] == 0 and stats["sent"] == 3
+
+
+def test_delivery_latency_and_failures_are_exported_per_chat(stub, tmp_path):
+    def kicked_from_one_chat(query):
+        if json.loads(stub.last_body)["chat_id"] == "-1003":
+            return 403, {"ok": False, "error_code": 403, "description": "Forbidden: bot was kicked"}
+        return telegram_fixture(query)
+    point_telegram(stub, kicked_from_one_chat)
+    queue = bot.OutboundQueue(str(tmp_path / "outbox.db"))
+    queue.enqueue("Per-chat metrics", "news", CHANNELS[:5])
+    queue.drain_once()
+
+    delivered = {dict(labels)["chat"] for name, labels in bot.Metrics.histograms
+                 if name == "outbox_delivery_seconds"}
+    assert delivered == {"-1000", "-1001", "-1002", "-1004"}
+    failures = {dict(labels)["chat"]: dict(labels) for (name, labels), count in bot.Metrics.counters.items()
+                if name == "outbox_failures_total"}
+    assert failures == {"-1003": {"chat": "-1003", "reason": "403", "outcome": "dead"}}
+    scrape = bot.Metrics.render()
+    assert 'vci_outbox_delivery_seconds_count{chat="-1000"} 1' in scrape
+    assert 'vci_outbox_failures_total{chat="-1003",outcome="dead",reason="403"} 1' in scrape
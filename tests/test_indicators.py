@@ -0,0 +1,104 @@
+"""
+Incremental indicators: reference matching, resampling to fixed bars, warm-up from history
+"""
+
+import random
+
+import pytest
+
+import bot
+from benchmarks import full_indicators
+
+HOUR = 3600
+T0 = 1_699_999_200  # on an hour boundary
+
+
+def random_walk(count, seed=2):
+    rng = random.Random(seed)
+    price, closes = 40000.0, []
+    for _ in range(count):
+        price *= 1 + rng.gauss(0, 0.004)
+        closes.append(price)
+    return closes
+
+
+def assert_matches(snapshot, reference):
+    assert snapshot["sma20"] == pytest.approx(reference["sma20"], rel=1e-9)
+    assert snapshot["ema50"] == pytest.approx(reference["ema50"], rel=1e-9)
+    assert snapshot["rsi14"] == pytest.approx(reference["rsi14"], rel=1e-9)
+    assert snapshot["macd"]["histogram"] == pytest.approx(reference["macd"], rel=1e-6)
+    assert snapshot["bollinger"]["upper"] == pytest.approx(reference["upper"], rel=1e-9)
+
+
+def test_hourly_samples_match_the_full_recompute():
+    closes = random_walk(500)
+    indicators = bot.IndicatorSet()
+    for i, close in enumerate(closes):
+        indicators.update(T0 + i * HOUR, close)
+    assert indicators.snapshot()["bars"] == len(closes) - 1  # the last bar is still open
+    assert_matches(indicators.snapshot(), full_indicators(closes[:-1]))
+
+
+def test_irregular_samples_are_resampled_to_hourly_closes():
+    rng = random.Random(5)
+    closes = random_walk(300)
+    indicators = bot.IndicatorSet()
+    for hour, close in enumerate(closes):
+        offsets = sorted(rng.sample(range(1, HOUR), rng.randint(1, 30)))
+        for offset in offsets[:-1]:
+            indicators.update(T0 + hour * HOUR + offset, close * (1 + rng.gauss(0, 0.01)))
+        indicators.update(T0 + hour * HOUR + offsets[-1], close)  # the bar's last sample is its close
+    snapshot = indicators.snapshot()
+    assert snapshot["bars"] == len(closes) - 1 and snapshot["samples"] > snapshot["bars"]
+    assert_matches(snapshot, full_indicators(closes[:-1]))
+
+
+def test_empty_bars_repeat_the_previous_close():
+    indicators = bot.IndicatorSet()
+    indicators.update(T0, 100.0)
+    indicators.update(T0 + 3 * HOUR, 130.0)
+    assert indicators.bars == 3
+    assert list(indicators.sma.values) == [100.0, 100.0, 100.0]
+
+
+def test_long_outage_fills_at_most_max_fill_bars():
+    indicators = bot.IndicatorSet()
+    indicators.update(T0, 100.0)
+    indicators.update(T0 + 30 * 24 * HOUR, 130.0)
+    assert indicators.bars == bot.IndicatorSet.MAX_FILL
+
+
+def test_out_of_order_samples_are_ignored():
+    indicators = bot.IndicatorSet()
+    assert indicators.update(T0 + 60, 100.0)
+    assert not indicators.update(T0, 90.0)
+    assert not indicators.update(T0 + 60, 95.0)
+    assert indicators.samples == 1 and indicators.close == 100.0
+
+
+def test_pivots_come_from_the_previous_day():
+    indicators = bot.IndicatorSet()
+    midnight = bot.DailyPivots.next_midnight(T0)
+    for ts, price in ((midnight - 3 * HOUR, 100.0), (midnight - 2 * HOUR, 120.0),
+                      (midnight - HOUR, 90.0), (midnight - 60, 110.0)):
+        indicators.update(ts, price)
+    assert indicators.snapshot()["pivots"] is None
+    indicators.update(midnight + 60, 111.0)
+    pivots = indicators.snapshot()["pivots"]
+    assert pivots["pivot"] == pytest.approx((120.0 + 90.0 + 110.0) / 3)
+    assert pivots["r2"] - pivots["s2"] == pytest.approx(2 * 30.0)
+
+
+def test_engine_warms_from_history_then_follows_live_samples():
+    closes = random_walk(100)
+    bot.Clock.use(bot.VirtualClock(T0 + len(closes) * HOUR))
+    ring = bot.PriceHistory.ring("BTC")
+    for i, close in enumerate(closes):
+        ring.append(T0 + i * HOUR + 30, close)
+        ring.append(T0 + i * HOUR + 1800, close)
+    snapshot = bot.IndicatorEngine.snapshot("BTC")
+    assert snapshot["bars"] == len(closes) - 1
+    assert_matches(snapshot, full_indicators(closes[:-1]))
+
+    bot.PriceHistory.record({"BTC": {"price": closes[-1] * 1.01}}, ts=T0 + len(closes) * HOUR)
+    assert bot.IndicatorEngine.snapshot("BTC")["bars"] == len(closes)
@@ -0,0 +1,79 @@
+"""
+Metrics: label handling, Prometheus rendering, spans and the /metrics endpoint
+"""
+
+import pytest
+
+import bot
+
+
+def test_mixed_type_label_values_render():
+    bot.Metrics.inc("telegram_errors_total", status=500, msg_type="news")
+    bot.Metrics.inc("telegram_errors_total", status="exception", msg_type="news")
+    bot.Metrics.inc("telegram_errors_total", status=429, msg_type="news")
+    bot.Metrics.observe("send_seconds", 0.2, attempt=1)
+    bot.Metrics.observe("send_seconds", 0.3, attempt="final")
+    scrape = bot.Metrics.render()
+    assert 'vci_telegram_errors_total{msg_type="news",status="500"} 1' in scrape
+    assert 'vci_telegram_errors_total{msg_type="news",status="exception"} 1' in scrape
+    assert 'vci_send_seconds_count{attempt="final"} 1' in scrape
+
+
+def test_int_and_str_label_values_share_a_series():
+    bot.Metrics.inc("telegram_errors_total", status=500)
+    bot.Metrics.inc("telegram_errors_total", status="500")
+    assert bot.Metrics.counters == {("telegram_errors_total", (("status", "500"),)): 2}
+
+
+def test_telegram_errors_of_both_kinds_render(stub):
+    stub.route("/botTEST/sendMessage", lambda query: (500, {"ok": False, "description": "Internal"}))
+    bot.ProductionConfig.TELEGRAM_API = stub.url
+    bot.ProductionConfig.BOT_TOKEN = "TEST"
+    assert bot.TelegramPoster.post("status 500", "news", "-1001")["status"] == 500
+    bot.ProductionConfig.TELEGRAM_API = "http://127.0.0.1:9"  # nothing listens: a connection error
+    assert bot.TelegramPoster.post("exception", "news", "-1001")["status"] is None
+    scrape = bot.Metrics.render()
+    assert 'status="500"' in scrape and 'status="exception"' in scrape
+
+
+def test_histogram_buckets_are_cumulative():
+    for value in (0.004, 0.02, 0.02, 30.0):
+        bot.Metrics.observe("fetch_seconds", value)
+    scrape = bot.Metrics.render()
+    assert 'vci_fetch_seconds_bucket{le="0.005"} 1' in scrape
+    assert 'vci_fetch_seconds_bucket{le="0.025"} 3' in scrape
+    assert 'vci_fetch_seconds_bucket{le="10.0"} 3' in scrape
+    assert 'vci_fetch_seconds_bucket{le="+Inf"} 4' in scrape
+    assert "vci_fetch_seconds_count 4" in scrape
+
+
+def test_label_values_are_escaped():
+    bot.Metrics.inc("odd_total", reason='say "hi" \\ bye')
+    assert 'vci_odd_total{reason="say \\"hi\\" \\\\ bye"} 1' in bot.Metrics.render()
+
+
+def test_span_counts_errors_and_passes_fallbacks_up():
+    with bot.Metrics.span("outer"):
+        with bot.Metrics.span("inner"):
+            bot.Metrics.fallback("sentiment")
+    with pytest.raises(RuntimeError):
+        with bot.Metrics.span("failing"):
+            raise RuntimeError("boom")
+    counters = bot.Metrics.counters
+    assert counters[bot.Metrics.key("fallback_total", {"source": "sentiment"})] == 1
+    assert counters[bot.Metrics.key("spans_with_fallback_total", {"span": "inner"})] == 1
+    assert counters[bot.Metrics.key("spans_with_fallback_total", {"span": "outer"})] == 1
+    assert counters[bot.Metrics.key("span_errors_total", {"span": "failing"})] == 1
+    assert bot.Metrics.histograms[bot.Metrics.key("span_seconds", {"span": "outer"})].count == 1
+
+
+def test_metrics_endpoint_serves_the_scrape():
+    bot.Metrics.inc("scraped_total", status=200)
+    server = bot.MetricsServer.start(port=0)
+    try:
+        response = bot.requests.get(f"http://127.0.0.1:{server.server_address[1]}/metrics", timeout=5)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert response.status_code == 200
+    assert 'vci_scraped_total{status="200"} 1' in response.text
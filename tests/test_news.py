@@ -0,0 +1,202 @@
+"""
+Breaking news: feed scoring, adaptive polling, conditional feed requests, seen-story index and its store
+"""
+
+import sqlite3
+
+import pytest
+
+import bot
+from harness import cryptopanic_fixture
+
+NOW = 1_700_000_000
+
+
+def story(id, title, votes, domain="reuters.com"):
+    return {"id": id, "title": title, "votes": votes, "domain": domain}
+
+
+@pytest.mark.parametrize("votes", range(6))
+def test_keywords_alone_are_not_a_candidate(votes):
+    loud = story(f"loud-{votes}", "BREAKING: exchange hack, withdrawals halt", votes)
+    assert bot.BreakingNewsScorer().rank([loud], NOW) == []
+
+
+def test_vote_floor_still_holds_at_twenty():
+    loud = story("loud", "BREAKING: exchange hack, withdrawals halt", bot.BreakingNewsScorer.CANDIDATE_MIN_VOTES)
+    assert bot.BreakingNewsScorer().rank([loud], NOW) == []
+
+
+def test_voted_breaking_story_is_a_candidate():
+    loud = story("loud", "BREAKING: exchange hack, withdrawals halt", 60)
+    ranked = bot.BreakingNewsScorer().rank([loud], NOW)
+    assert [candidate["item"]["id"] for candidate in ranked] == ["loud"]
+    assert ranked[0]["critical"]
+
+
+def test_whole_feed_is_ranked_not_just_the_first_item():
+    feed = [story("routine", "Weekly market wrap", 30),
+            story("hack", "Exchange hack drains hot wallet", 45),
+            story("etf", "SEC approval for ETF expected", 90)]
+    ranked = bot.BreakingNewsScorer().rank(feed, NOW)
+    assert [candidate["item"]["id"] for candidate in ranked][:2] == ["etf", "hack"]
+
+
+def test_vote_velocity_lifts_a_story_between_polls():
+    scorer = bot.BreakingNewsScorer()
+    feed = [story("slow", "Exchange hack drains hot wallet", 30), story("fast", "Exchange hack drains cold wallet", 30)]
+    scorer.rank(feed, NOW)
+    feed[1]["votes"] += 60
+    ranked = scorer.rank(feed, NOW + 1800)
+    assert ranked[0]["item"]["id"] == "fast" and ranked[0]["velocity"] == 120.0
+
+
+class PollerClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def poller():
+    clock = PollerClock()
+    poller = bot.AdaptivePoller(clock=clock)
+    poller.test_clock = clock
+    return poller
+
+
+def observe(poller, items, prices):
+    interval = poller.observe(items, prices)
+    poller.test_clock.now += interval
+    return interval
+
+
+FLAT = {"BTC": {"price": 65000.0, "change": 0.2}}
+QUIET = [{"id": i, "title": f"story {i}"} for i in range(20)]
+
+
+def burst(poller):
+    """Six polls with 30 new stories each and a 3% slide each time; returns the intervals"""
+    items = list(QUIET)
+    intervals = []
+    for step in range(6):
+        items += [{"id": f"hot-{step}-{i}", "title": f"hot {step} {i}"} for i in range(30)]
+        move = {"BTC": {"price": 65000.0 * 0.97 ** (step + 1), "change": -3.0 * (step + 1)}}
+        intervals.append(observe(poller, items, move))
+    return items, intervals
+
+
+def test_quiet_feed_polls_at_the_ceiling(poller):
+    intervals = [observe(poller, QUIET, FLAT) for _ in range(3)]
+    assert intervals[-1] == bot.ProductionConfig.NEWS_CHECK_INTERVAL
+
+
+def test_burst_tightens_to_the_floor(poller):
+    for _ in range(3):
+        observe(poller, QUIET, FLAT)
+    _, intervals = burst(poller)
+    assert intervals[0] < bot.ProductionConfig.NEWS_CHECK_INTERVAL
+    assert intervals[-1] == bot.ProductionConfig.NEWS_CHECK_MIN_INTERVAL
+    assert poller.stats["tightened"] > 0
+
+
+def test_calm_relaxes_gradually(poller):
+    items, _ = burst(poller)
+    calm = {"BTC": {"price": 65000.0 * 0.97 ** 6, "change": 0.2}}
+    relaxing = [observe(poller, items, calm) for _ in range(12)]
+    steps = [later / earlier for earlier, later
+             in zip([bot.ProductionConfig.NEWS_CHECK_MIN_INTERVAL] + relaxing, relaxing)]
+    assert relaxing[-1] == bot.ProductionConfig.NEWS_CHECK_INTERVAL
+    assert max(steps) <= bot.AdaptivePoller.RELAX_FACTOR + 0.01
+
+
+def test_errors_back_off_then_reset(poller):
+    backoff = [poller.on_error() for _ in range(6)]
+    assert backoff[0] == bot.ProductionConfig.NEWS_ERROR_BACKOFF
+    assert backoff == sorted(backoff)
+    assert backoff[-1] == bot.ProductionConfig.NEWS_CHECK_INTERVAL
+    observe(poller, QUIET, FLAT)
+    assert poller.errors == 0
+
+
+def test_poll_decisions_are_exported(poller):
+    bot.AdaptivePoller.current = poller
+    burst(poller)
+    poller.on_error()
+    scrape = bot.Metrics.render()
+    for name in ('news_poll_decisions_total{decision="tightened"}', "news_poll_errors_total",
+                 "news_poll_interval_seconds", "news_poll_heat"):
+        assert f"vci_{name}" in scrape
+
+
+def test_unchanged_feed_answers_not_modified(stub):
+    _, feed = cryptopanic_fixture({})
+    etag = '"feed-v1"'
+
+    def conditional_feed(query):
+        if stub.last_headers.get("If-None-Match") == etag:
+            return 304, b"", {"ETag": etag}
+        return 200, feed, {"ETag": etag}
+    stub.route("/posts/", conditional_feed)
+    bot.ProductionConfig.CRYPTOPANIC_API = stub.url
+    for _ in range(5):
+        items = bot.RealTimeAPIs.poll_news_feed()
+    assert len(stub.requests) == 5
+    assert bot.HttpTransport.stats.get("news_not_modified", 0) == 4
+    assert len(items) == len(feed["results"])  # a 304 serves the previous items
+
+
+def test_rephrased_headline_is_a_near_duplicate():
+    index = bot.SeenStoryIndex()
+    assert index.check_and_add("SEC approves spot Ethereum ETF applications from major issuers", NOW) is None
+    assert index.check_and_add("SEC approves spot Ethereum ETF applications from several major issuers",
+                               NOW + 60) == "near"
+    assert index.check_and_add("Dogecoin rallies after payments integration announced", NOW + 120) is None
+
+
+def test_story_is_forgotten_after_the_window():
+    index = bot.SeenStoryIndex(window=3600)
+    index.check_and_add("Bitcoin hashrate hits a new record high", NOW)
+    assert index.check_and_add("Bitcoin hashrate hits a new record high", NOW + 3 * 3600) is None
+
+
+def test_index_stays_near_max_entries():
+    index = bot.SeenStoryIndex(max_entries=500)
+    for i in range(5000):
+        index.check_and_add(f"Token {i} lists on exchange {i % 97} after vote {i * 7}", NOW + (i // 100) * 3600)
+    assert len(index) <= 500 + 100  # expiry drops whole hour buckets
+
+
+def test_seen_stories_survive_a_restart():
+    seen = bot.BreakingNewsMonitor.seen_index()
+    assert seen.check_and_add("Bitcoin ETF sees record inflows on Monday", NOW) is None
+    seen.journal.close()
+    bot.BreakingNewsMonitor._seen = None
+
+    restored = bot.BreakingNewsMonitor.seen_index()
+    assert len(restored) == 1
+    assert restored.check_and_add("Bitcoin ETF sees record inflows on Monday", NOW + 60) == "exact"
+
+
+def test_expired_stories_leave_the_store(tmp_path):
+    store = bot.SeenStoryStore(str(tmp_path / "seen.db"))
+    index = bot.SeenStoryIndex(window=3600)
+    index.journal = store
+    index.check_and_add("Ethereum upgrade ships to mainnet", NOW)
+    index.check_and_add("Solana validators vote on fee change", NOW + 3 * 3600)
+    assert len(store.rows()) == len(index) == 1
+    store.close()
+
+
+def test_legacy_state_entries_are_migrated_once():
+    old = bot.SeenStoryIndex()
+    old.check_and_add("Ripple wins another court ruling", NOW)
+    bot.StateStore.default().set("seen_stories", old.export())
+
+    seen = bot.BreakingNewsMonitor.seen_index()
+    assert seen.check_and_add("Ripple wins another court ruling", NOW + 60) == "exact"
+    assert bot.StateStore.default().get("seen_stories") is None
+    with sqlite3.connect(bot.ProductionConfig.SEEN_PATH) as db:
+        assert db.execute("SELECT COUNT(*) FROM seen").fetchone()[0] == 1
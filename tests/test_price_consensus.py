@@ -0,0 +1,135 @@
+"""
+PriceConsensus: provider quotes combined into one price per coin, or none
+"""
+
+import time
+
+import pytest
+
+import bot
+from harness import BotClock, FakeUpstreams, failing, point_price_apis
+
+
+def q(price, now, change=1.0, volume=0, age=0):
+    return {"price": price, "change": change, "volume_24h": volume, "updated": now - age}
+
+
+NOW = 1_700_000_000
+
+# (name, {provider: quotes}, expected consensus, expected flags)
+CASES = [
+    ("agree", {"CoinGecko": {"BTC": q(65000, NOW)}, "Binance": {"BTC": q(65020, NOW)},
+               "CoinPaprika": {"BTC": q(64990, NOW)}},
+     {"BTC": (65000, "ok", 3)}, {}),
+    ("outlier", {"CoinGecko": {"BTC": q(65000, NOW)}, "Binance": {"BTC": q(65040, NOW)},
+                 "CoinPaprika": {"BTC": q(71500, NOW)}},
+     {"BTC": (65020, "ok", 2)}, {"CoinPaprika": {"outlier": ["BTC"]}}),
+    ("stale", {"CoinGecko": {"ETH": q(3400, NOW)}, "Binance": {"ETH": q(3300, NOW, age=3600)},
+               "CoinPaprika": {"ETH": q(3402, NOW)}},
+     {"ETH": (3401, "ok", 2)}, {"Binance": {"stale": ["ETH"]}}),
+    ("disputed", {"Binance": {"SOL": q(170, NOW)}, "CoinPaprika": {"SOL": q(180, NOW)}},
+     {}, {"Binance": {"disputed": ["SOL"]}, "CoinPaprika": {"disputed": ["SOL"]}}),
+    ("single", {"CoinGecko": {"BNB": q(580, NOW)}, "Binance": {}}, {"BNB": (580, "single", 1)}, {}),
+    ("wide", {"CoinGecko": {"XRP": q(0.520, NOW)}, "Binance": {"XRP": q(0.524, NOW)},
+              "CoinPaprika": {"XRP": q(0.526, NOW)}},
+     {"XRP": (0.524, "wide", 3)}, {}),
+    ("junk", {"CoinGecko": {"ADA": q(0, NOW)}, "Binance": {"ADA": q(-1, NOW)}}, {}, {})
+]
+
+
+@pytest.mark.parametrize("name, quotes, expected, expected_flags", CASES, ids=[case[0] for case in CASES])
+def test_combine(name, quotes, expected, expected_flags):
+    prices, flags = bot.PriceConsensus.combine(quotes, now=NOW, method="median")
+    got = {symbol: (round(p["price"], 6), p["status"], p["sources"]) for symbol, p in prices.items()}
+    got_flags = {provider: {flag: symbols for flag, symbols in kinds.items() if symbols}
+                 for provider, kinds in flags.items()}
+    assert got == expected
+    assert {provider: kinds for provider, kinds in got_flags.items() if kinds} == expected_flags
+
+
+def test_vwap_weights_by_volume():
+    prices, _ = bot.PriceConsensus.combine({"A": {"BTC": {"price": 100.0, "volume_24h": 3}},
+                                            "B": {"BTC": {"price": 101.0, "volume_24h": 1}}},
+                                           now=NOW, method="vwap")
+    assert prices["BTC"]["price"] == pytest.approx(100.25)
+
+
+def test_outlier_provider_is_dropped(fakes):
+    bot.ProductionConfig.PRICE_FETCH_MODE = "consensus"
+    fakes.market.skews[("coinpaprika", "BTC")] = 1.10
+    prices = bot.RealTimeAPIs.get_crypto_prices()
+    truth = fakes.market.quotes()["BTC"][0]
+    assert prices["BTC"]["sources"] == 2
+    assert prices["BTC"]["price"] == pytest.approx(truth, rel=1e-4)
+
+
+def test_disputed_coin_is_left_out_of_the_post(fakes):
+    bot.ProductionConfig.PRICE_FETCH_MODE = "consensus"
+    fakes.market.skews[("coinpaprika", "BTC")] = 1.10
+    fakes.market.lags["binance"] = 3600
+    prices = bot.RealTimeAPIs.get_crypto_prices()
+    post = bot.ContentGenerator.market_open()
+    assert "BTC" not in prices
+    assert "BTC:" not in post
+    flags = {(dict(labels)["provider"], dict(labels)["flag"])
+             for name, labels in bot.Metrics.counters if name == "price_source_flags_total"}
+    assert ("Binance", "stale") in flags
+
+
+def test_all_providers_down_serves_recorded_prices(fakes, price_stub):
+    bot.ProductionConfig.PRICE_FETCH_MODE = "consensus"
+    for path in ("/simple/price", "/ticker/24hr", "/tickers"):
+        price_stub.route(path, failing)
+    fakes.apply()
+    assert bot.RealTimeAPIs.get_crypto_prices()  # recorded in PriceHistory
+
+    point_price_apis(price_stub)
+    bot.RealTimeAPIs.cache.clear()
+    post = bot.ContentGenerator.market_open()
+    recorded = bot.RealTimeAPIs.get_crypto_prices()
+    assert "Live data" not in post
+    assert recorded["BTC"]["status"] == "last_known"
+
+
+def test_all_providers_down_without_history_makes_nothing_up(price_stub):
+    bot.ProductionConfig.PRICE_FETCH_MODE = "consensus"
+    for path in ("/simple/price", "/ticker/24hr", "/tickers"):
+        price_stub.route(path, failing)
+    post = bot.ContentGenerator.market_open()
+    assert "Live data" not in post
+    assert "$" not in post
+
+
+def flagged(flag):
+    return {dict(labels)["provider"] for (name, labels), count in bot.Metrics.counters.items()
+            if name == "price_source_flags_total" and dict(labels)["flag"] == flag}
+
+
+def test_fakes_follow_a_virtual_clock(fakes):
+    bot.Clock.use(bot.VirtualClock(time.time() + 30 * 86400))
+    bot.ProductionConfig.PRICE_FETCH_MODE = "consensus"
+    prices = bot.RealTimeAPIs.get_crypto_prices()
+    assert prices["BTC"]["sources"] == 3
+    assert flagged("stale") == set()
+
+
+def test_fakes_in_another_process_follow_the_bot_clock():
+    clock = BotClock()
+    upstreams = FakeUpstreams(clock=clock)  # as harness.py main() builds them: no access to the bot's clock
+    clock.stub = upstreams.stub
+    upstreams.apply()
+    try:
+        bot.Clock.use(bot.VirtualClock(time.time() + 30 * 86400))
+        bot.ProductionConfig.PRICE_FETCH_MODE = "consensus"
+        prices = bot.RealTimeAPIs.get_crypto_prices()
+    finally:
+        upstreams.close()
+    assert prices["BTC"]["sources"] == 3
+    assert flagged("stale") == set()
+
+
+def test_clock_header_is_only_sent_to_loopback_on_a_virtual_clock(stub):
+    stub.route("/echo", lambda query: (200, {"clock": stub.last_headers.get(bot.HttpTransport.CLOCK_HEADER)}))
+    assert bot.HttpTransport.get("fgi", stub.url + "/echo").json()["clock"] is None
+    bot.Clock.use(bot.VirtualClock(NOW))
+    assert float(bot.HttpTransport.get("fgi", stub.url + "/echo").json()["clock"]) == NOW
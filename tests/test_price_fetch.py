@@ -0,0 +1,225 @@
+"""
+Price fetchers: hedging, the coin universe, per-provider batching, single-flight and HTTP retries
+"""
+
+import json
+import threading
+import time
+
+import pytest
+
+import bot
+from harness import FakeUpstreams, binance_fixture, coingecko_fixture, cryptopanic_fixture, failing, fgi_fixture, paprika_fixture, \
+    paprika_large_fixture, point_all_apis
+
+
+def install_universe(coins):
+    with bot.CoinUniverse._lock:
+        bot.CoinUniverse._index = bot.CoinUniverse.index(coins, "test")
+
+
+def numbered_coins(count):
+    return [bot.CoinUniverse.entry(f"C{i}", f"Coin {i}", None, f"C{i}USDT", None) for i in range(count)]
+
+
+@pytest.mark.parametrize("mode", ["sequential", "hedged"])
+def test_partial_answer_does_not_win(price_stub, mode):
+    # Paprika answers first with 2 coins; Binance's full list must still be used
+    price_stub.route("/simple/price", failing, latency=0.3)
+    price_stub.route("/ticker/24hr", binance_fixture, latency=0.15)
+    price_stub.route("/tickers", paprika_fixture, latency=0.02)
+    bot.ProductionConfig.PRICE_FETCH_MODE = mode
+    prices = bot.RealTimeAPIs.get_crypto_prices()
+    assert sorted(prices) == sorted(coin["symbol"] for coin in bot.CoinUniverse.coins())
+
+
+def test_hedged_first_full_answer_wins(price_stub):
+    price_stub.route("/simple/price", failing, latency=1.0)
+    price_stub.route("/ticker/24hr", binance_fixture, latency=0.05)
+    price_stub.route("/tickers", paprika_fixture, latency=0.5)
+    bot.ProductionConfig.PRICE_FETCH_MODE = "hedged"
+    prices = bot.RealTimeAPIs.get_crypto_prices()
+    assert len(prices) == len(bot.CoinUniverse.coins())
+    assert bot.Metrics.counters[("price_provider_wins_total", (("provider", "Binance"),))] == 1
+
+
+@pytest.mark.parametrize("count", [6, 24, 96])
+def test_binance_prices_in_one_request(price_stub, count):
+    price_stub.route("/ticker/24hr", binance_fixture)
+    install_universe(numbered_coins(count))
+    prices = bot.RealTimeAPIs.get_binance_prices()
+    assert len(prices) == count
+    assert price_stub.requests == ["/ticker/24hr"]
+
+
+def test_binance_batches_per_limit(price_stub):
+    price_stub.route("/ticker/24hr", binance_fixture)
+    install_universe(numbered_coins(300))
+    prices = bot.RealTimeAPIs.get_binance_prices()
+    assert len(prices) == 300
+    assert len(price_stub.requests) == -(-300 // bot.CoinUniverse.BATCH_LIMITS["binance"])
+
+
+def delisted(query):
+    """One delisted pair fails its whole batch (400 -1121)"""
+    if "C7USDT" in json.loads(query["symbols"][0]):
+        return 400, {"code": -1121, "msg": "Invalid symbol."}
+    return binance_fixture(query)
+
+
+def test_failed_batch_keeps_the_others(price_stub):
+    price_stub.route("/ticker/24hr", delisted)
+    install_universe(numbered_coins(300))
+    prices = bot.RealTimeAPIs.get_binance_prices()
+    assert len(prices) == 200 and "C7" not in prices and "C150" in prices
+    assert bot.Metrics.counters[("price_batch_failures_total", (("provider", "Binance"),))] == 1
+
+
+def test_every_batch_failing_returns_none(price_stub):
+    price_stub.route("/ticker/24hr", failing)
+    install_universe(numbered_coins(300))
+    assert bot.RealTimeAPIs.get_binance_prices() is None
+
+
+@pytest.fixture
+def universe(tmp_path):
+    upstreams = FakeUpstreams(extra_coins=192)
+    upstreams.apply()
+    bot.ProductionConfig.COIN_UNIVERSE = "top:200"
+    yield upstreams
+    upstreams.close()
+
+
+def test_universe_is_built_once_then_loaded_from_the_index(universe):
+    coins = bot.CoinUniverse.coins()
+    assert len(coins) == 200
+    assert all(coin["coingecko"] and coin["binance"] and coin["paprika"] for coin in coins)
+    bot.CoinUniverse.reset()
+    universe.stub.requests.clear()
+    assert bot.CoinUniverse.coins() == coins
+    assert universe.stub.requests == []
+
+
+def test_universe_lookups_by_provider_id(universe):
+    bitcoin = bot.CoinUniverse.lookup("binance", "BTCUSDT")
+    assert bitcoin["symbol"] == "BTC"
+    assert bot.CoinUniverse.lookup("coingecko", bitcoin["coingecko"]) == bitcoin
+
+
+@pytest.mark.parametrize("provider, fetch", [("coingecko", "get_coingecko_prices"),
+                                             ("binance", "get_binance_prices")])
+def test_requests_grow_with_the_universe_by_batch(universe, provider, fetch):
+    bot.CoinUniverse.coins()
+    universe.stub.requests.clear()
+    prices = getattr(bot.RealTimeAPIs, fetch)()
+    assert len(prices) == 200
+    assert len(universe.stub.requests) == -(-200 // bot.CoinUniverse.BATCH_LIMITS[provider])
+
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+def test_json_array_is_parsed_across_chunks(chunk_size):
+    items = [{"symbol": "BTC", "name": "Bitcoin ₿"}, {"nested": [1, {"a": "]"}]}, 3, "x,y"]
+    payload = json.dumps(items).encode()
+    chunks = [payload[i:i + chunk_size] for i in range(0, len(payload), chunk_size)]
+    assert list(bot.RealTimeAPIs.iter_json_array(chunks)) == items
+
+
+def test_paprika_stream_stops_once_the_universe_is_found(price_stub):
+    payload = paprika_large_fixture(5000)
+    price_stub.route("/tickers", lambda query: (200, payload))
+    install_universe([bot.CoinUniverse.entry("BTC", "Bitcoin", None, None, "btc-coin"),
+                      bot.CoinUniverse.entry("ETH", "Ethereum", None, None, "eth-coin")])
+    prices = bot.RealTimeAPIs.get_coinpaprika_prices()
+    assert sorted(prices) == ["BTC", "ETH"]
+    assert prices["ETH"]["price"] == 32500.0
+
+def test_requests_share_one_connection(stub):
+    stub.route("/fng/", fgi_fixture)
+    for _ in range(10):
+        bot.HttpTransport.get("fgi", f"{stub.url}/fng/")
+    assert stub.connections == 1
+    assert bot.HttpTransport.connection_stats()["connections_opened"] == 1
+
+
+def test_price_endpoints_are_not_retried(price_stub):
+    price_stub.route("/simple/price", failing)
+    bot.HttpTransport.get("coingecko", f"{price_stub.url}/simple/price")
+    assert price_stub.requests == ["/simple/price"]
+    assert bot.HttpTransport.stats.get("retries", 0) == 0
+
+
+def test_fgi_is_retried_once(stub):
+    calls = []
+
+    def flaky(query):
+        calls.append(query)
+        return failing(query) if len(calls) == 1 else fgi_fixture(query)
+    stub.route("/fng/", flaky)
+    response = bot.HttpTransport.get("fgi", f"{stub.url}/fng/")
+    assert response.status_code == 200
+    assert len(calls) == 2 and bot.HttpTransport.stats["retries"] == 1
+
+
+def test_timeout_caps_the_whole_call(stub):
+    stub.route("/fng/", failing, latency=0.6)
+    started = time.perf_counter()
+    response = bot.HttpTransport.get("fgi", f"{stub.url}/fng/", timeout=1.5)
+    # Not enough time left after the first attempt and backoff: no retry
+    assert response.status_code >= 500
+    assert time.perf_counter() - started < 1.5
+    assert stub.requests == ["/fng/"]
+
+
+@pytest.mark.parametrize("getter", ["get_news_feed", "get_crypto_prices"])
+def test_concurrent_callers_share_one_request(stub, getter):
+    stub.route("/simple/price", coingecko_fixture, latency=0.2)
+    stub.route("/ticker/24hr", binance_fixture, latency=0.2)
+    stub.route("/tickers", paprika_fixture, latency=0.2)
+    stub.route("/posts/", cryptopanic_fixture, latency=0.2)
+    point_all_apis(stub)
+    callers = 16
+    barrier = threading.Barrier(callers)
+    results = []
+
+    def call():
+        barrier.wait()
+        results.append(getattr(bot.RealTimeAPIs, getter)())
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(stub.requests.count(path) == 1 for path in set(stub.requests)), stub.requests
+    assert all(result is results[0] for result in results)
+
+
+def test_single_flight_shares_the_error():
+    flights = bot.SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    errors = []
+
+    def boom():
+        started.set()
+        release.wait(5)
+        raise ValueError("upstream down")
+
+    def call():
+        try:
+            flights.do("key", boom)
+        except ValueError as e:
+            errors.append(e)
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=call)
+    follower.start()
+    while flights.stats["coalesced"] == 0:
+        time.sleep(0.001)
+    release.set()
+    leader.join()
+    follower.join()
+    assert len(errors) == 2 and errors[0] is errors[1]
+    assert flights.stats == {"calls": 1, "coalesced": 1}
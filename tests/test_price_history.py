@@ -0,0 +1,98 @@
+"""
+Price history: the memory-mapped PriceRing and the per-symbol PriceHistory fed by live fetches
+"""
+
+from array import array
+
+import pytest
+
+import bot
+
+T0 = 1_700_000_000
+
+
+@pytest.fixture
+def ring(tmp_path):
+    ring = bot.PriceRing(str(tmp_path / "BTC.ring"), 8)
+    yield ring
+    ring.close()
+
+
+def test_latest_and_price_at(ring):
+    assert ring.latest() is None
+    for i, price in enumerate([100.0, 101.0, 103.0]):
+        ring.append(T0 + i * 60, price)
+    assert ring.latest() == (T0 + 120, 103.0)
+    assert ring.price_at(T0 + 90) == 101.0
+    assert ring.price_at(T0 - 1) is None
+
+
+def test_older_sample_is_rejected(ring):
+    assert ring.append(T0 + 60, 100.0)
+    assert not ring.append(T0, 99.0)
+    assert len(ring) == 1
+
+
+def test_wraps_around_and_keeps_the_newest(ring):
+    for i in range(20):
+        ring.append(T0 + i * 60, 100.0 + i)
+    assert len(ring) == 8
+    assert [price for _, price, _ in ring.window(T0)] == [112.0 + i for i in range(8)]
+    stats = ring.stats(T0 + 15 * 60)
+    assert (stats["open"], stats["close"], stats["samples"]) == (115.0, 119.0, 5)
+    assert stats["low"] == 115.0 and stats["high"] == 119.0
+
+
+def test_vwap_weighs_by_sample_volume(ring):
+    ring.append(T0, 100.0, 1.0)
+    ring.append(T0 + 60, 200.0, 3.0)
+    assert ring.stats(T0)["vwap"] == pytest.approx(175.0)
+
+
+def test_without_volume_vwap_is_the_mean(ring):
+    ring.append(T0, 100.0)
+    ring.append(T0 + 60, 200.0)
+    assert ring.stats(T0)["vwap"] == pytest.approx(150.0)
+
+
+def test_extend_matches_appends(tmp_path):
+    appended = bot.PriceRing(str(tmp_path / "a.ring"), 8)
+    extended = bot.PriceRing(str(tmp_path / "b.ring"), 8)
+    rows = [(T0 + i * 60, 100.0 + i, float(i % 3)) for i in range(13)]
+    for row in rows[:2]:
+        appended.append(*row)
+        extended.append(*row)
+    for row in rows[2:]:
+        appended.append(*row)
+    ts, price, volume = (array("d", column) for column in zip(*rows[2:]))
+    assert extended.extend(ts, price, volume) == 11
+    assert extended.extend(ts, price, volume) == 0  # re-import is a no-op
+    assert extended.window(T0) == appended.window(T0)
+    assert extended.stats(T0 + 6 * 60) == pytest.approx(appended.stats(T0 + 6 * 60))
+    appended.close()
+    extended.close()
+
+
+def test_ring_survives_a_reopen(tmp_path):
+    path = str(tmp_path / "ETH.ring")
+    ring = bot.PriceRing(path, 8)
+    for i in range(11):
+        ring.append(T0 + i * 60, 3000.0 + i)
+    ring.close()
+
+    reopened = bot.PriceRing(path, 64)  # capacity comes from the file
+    assert reopened.capacity == 8 and len(reopened) == 8
+    assert reopened.latest() == (T0 + 600, 3010.0)
+    assert reopened.append(T0 + 660, 3011.0)
+    assert reopened.stats(T0)["open"] == 3004.0
+    reopened.close()
+
+
+def test_live_record_stores_no_volume():
+    bot.PriceHistory.record({"BTC": {"price": 65000.0, "volume_24h": 3.2e10},
+                             "ETH": {"price": 0}}, ts=T0)
+    bot.PriceHistory.record({"BTC": {"price": 65100.0, "volume_24h": 3.3e10}}, ts=T0 + 60)
+    ring = bot.PriceHistory.ring("BTC")
+    assert [volume for _, _, volume in ring.window(T0)] == [0.0, 0.0]  # a rolling 24h total is not per-sample volume
+    assert bot.PriceHistory.since("BTC", T0)["vwap"] == pytest.approx(65050.0)
+    assert len(bot.PriceHistory.ring("ETH")) == 0
@@ -0,0 +1,54 @@
+"""
+AsyncRuntime: timer-driven slots fire once per slot per day
+"""
+
+import asyncio
+from collections import Counter
+from datetime import datetime
+
+import pytest
+
+import bot
+
+DAYS = 30
+
+
+def run_slot_for(days, schedule_key, seed, monkeypatch):
+    """Drive run_slot on a VirtualClock for `days`; returns the local datetimes it fired at"""
+    clock = bot.VirtualClock(datetime(2023, 11, 14, 12, 0).timestamp())
+    bot.Clock.use(clock)
+    bot.Clock.rng.seed(seed)
+    end = clock.time() + days * 86400
+    fired = []
+    monkeypatch.setattr(bot.PostStager, "stage", lambda *args: None)
+    monkeypatch.setattr(bot.PostStager, "fire", lambda *args: fired.append(bot.Clock.now()))
+
+    async def drive():
+        task = asyncio.create_task(bot.AsyncRuntime.run_slot(schedule_key, None, "news"))
+        while bot.Clock.time() < end and not task.done():
+            await asyncio.sleep(0.001)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    asyncio.run(drive())
+    return [at for at in fired if at.timestamp() < end]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_each_slot_fires_once_a_day(seed, monkeypatch):
+    fired = run_slot_for(DAYS, "good_morning", seed, monkeypatch)
+    per_day = Counter(at.date() for at in fired)
+    assert set(per_day.values()) == {1}, per_day
+    assert len(per_day) == DAYS
+
+
+def test_fires_stay_within_the_jitter_window(monkeypatch):
+    base = datetime.strptime(bot.ProductionConfig.SCHEDULE["good_morning"][0], "%H:%M")
+    for at in run_slot_for(7, "good_morning", 1, monkeypatch):
+        offset = (at.hour * 60 + at.minute) - (base.hour * 60 + base.minute)
+        assert -5 <= offset <= 5
+
+
+def test_next_occurrence_rolls_over_to_tomorrow():
+    now = datetime(2023, 11, 17, 9, 0)
+    assert bot.AsyncRuntime.next_occurrence("08:57", now) == datetime(2023, 11, 18, 8, 57)
+    assert bot.AsyncRuntime.next_occurrence("09:04", now) == datetime(2023, 11, 17, 9, 4)
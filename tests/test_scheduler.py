@@ -0,0 +1,123 @@
+"""
+Slot staging and firing: data is refreshed before rendering, series days move on only when a post is queued;
+virtual runs stay local
+"""
+
+from datetime import datetime
+
+import pytest
+
+import bot
+from harness import FakeUpstreams
+
+SLOT = "learning_series"
+
+
+def lesson(day):
+    return bot.LearningSeries.SERIES[day - 1]["title"]
+
+
+@pytest.fixture
+def virtual():
+    clock = bot.VirtualClock(1_700_000_000)
+    bot.Clock.use(clock)
+    return clock
+
+
+def test_staging_refreshes_the_slot_data_first(virtual, fakes):
+    bot.PostStager.stage("market_open", bot.ContentGenerator.market_open, "market")
+    for key in bot.MarketDataRefresher.SLOT_DATA["market_open"]:
+        assert bot.RealTimeAPIs.cache.get(key) is not None
+
+
+def test_staging_leaves_the_series_day_alone(virtual):
+    staged = bot.PostStager.stage(SLOT, bot.ContentGenerator.learning_series, "education")
+    assert lesson(1) in staged["content"]
+    assert bot.LearningSeries.current_day() == 1
+
+
+def test_firing_a_staged_post_advances_once(virtual):
+    for day in (1, 2):
+        bot.PostStager.stage(SLOT, bot.ContentGenerator.learning_series, "education")
+        timing = bot.PostStager.fire(SLOT, bot.ContentGenerator.learning_series, "education")
+        assert timing["staged"] and lesson(day) in timing["content"]
+        virtual.advance_to(virtual.time() + 86400)
+    assert bot.LearningSeries.current_day() == 3
+
+
+def test_restart_between_stage_and_fire_skips_no_lesson(virtual):
+    bot.PostStager.stage(SLOT, bot.ContentGenerator.learning_series, "education")
+    bot.PostStager._staged.clear()  # the process restarted; the staged post is gone
+    timing = bot.PostStager.fire(SLOT, bot.ContentGenerator.learning_series, "education")
+    assert not timing["staged"] and lesson(1) in timing["content"]
+    assert bot.LearningSeries.current_day() == 2
+
+
+def test_stale_staged_post_is_rebuilt_for_the_same_day(virtual):
+    bot.PostStager.stage(SLOT, bot.ContentGenerator.learning_series, "education")
+    virtual.advance_to(virtual.time() + bot.PostStager.MAX_AGE + 60)
+    timing = bot.PostStager.fire(SLOT, bot.ContentGenerator.learning_series, "education")
+    assert not timing["staged"] and lesson(1) in timing["content"]
+    assert bot.LearningSeries.current_day() == 2
+
+
+def test_unqueued_post_does_not_advance(virtual):
+    bot.ProductionConfig.CHANNEL_ID = ""  # no channel: nothing is queued
+    bot.PostStager.stage(SLOT, bot.ContentGenerator.learning_series, "education")
+    bot.PostStager.fire(SLOT, bot.ContentGenerator.learning_series, "education")
+    assert bot.LearningSeries.current_day() == 1
+
+
+
+def test_virtual_clock_moves_only_when_told(virtual):
+    start = virtual.time()
+    virtual.sleep(3600)
+    virtual.advance_to(start)  # never backwards
+    assert virtual.time() == virtual.monotonic() == start + 3600
+    assert bot.Clock.is_virtual() and bot.Clock.time() == start + 3600
+
+
+@pytest.mark.parametrize("url, local", [
+    ("http://127.0.0.1:8081/telegram", True),
+    ("http://localhost:8081", True),
+    ("http://[::1]:8081", True),
+    ("https://api.telegram.org", False),
+    ("http://10.0.0.5:8081", False)
+])
+def test_sandboxed_means_loopback(url, local):
+    assert bot.VirtualClock.sandboxed(url) is local
+
+
+def test_virtual_run_refuses_the_real_bot_api():
+    bot.ProductionConfig.TELEGRAM_API = "https://api.telegram.org"
+    with pytest.raises(RuntimeError):
+        bot.run_virtual(1)
+
+
+def virtual_days(days, seed):
+    """run_virtual over fakes on the virtual clock; (summary, fire schedule)"""
+    start = bot.ProductionConfig.TIMEZONE.localize(datetime(2024, 5, 1)).timestamp()
+    upstreams = FakeUpstreams(clock=bot.Clock.time, seed=seed)
+    upstreams.apply()
+    bot.ProductionConfig.TELEGRAM_CHAT_RATE = 1000
+    bot.PostStager.timings.clear()
+    try:
+        summary = bot.run_virtual(days, start=start, seed=seed)
+    finally:
+        upstreams.close()
+    return summary, [(t["slot"], round(t["fired_at"] - start)) for t in bot.PostStager.timings]
+
+
+def test_virtual_run_fires_every_slot_each_day():
+    days = 2
+    summary, fires = virtual_days(days, seed=7)
+    assert summary["slots_fired"] == days * len(bot.ProductionConfig.SCHEDULE) == len(fires)
+    assert summary["wall_seconds"] < 60 and summary["polls"] > 0
+    assert bot.Clock.is_virtual() is False  # the previous clock is back
+    assert bot.LearningSeries.current_day() == bot.ProductionConfig.LEARNING_SERIES_DAY + days
+
+
+def test_same_seed_same_schedule():
+    _, first = virtual_days(1, seed=3)
+    _, second = virtual_days(1, seed=3)
+    assert first == second
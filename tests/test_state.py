@@ -0,0 +1,48 @@
+"""
+StateStore: series progress and other small state kept across restarts
+"""
+
+import os
+
+import bot
+
+
+def test_changes_are_batched_then_written(tmp_path):
+    path = str(tmp_path / "state.json")
+    store = bot.StateStore(path)
+    store.set("learning_series_day", 3)
+    assert not os.path.exists(path)  # written FLUSH_DELAY later, or at exit
+    store.flush()
+    assert bot.StateStore(path).get("learning_series_day") == 3
+    assert not os.path.exists(f"{path}.tmp")
+
+
+def test_unreadable_file_starts_fresh(tmp_path):
+    path = tmp_path / "state.json"
+    path.write_text("{not json")
+    store = bot.StateStore(str(path))
+    assert store.get("learning_series_day", 1) == 1
+    store.set("learning_series_day", 2)
+    store.flush()
+    assert bot.StateStore(str(path)).get("learning_series_day") == 2
+
+
+def test_delete_is_persisted(tmp_path):
+    path = str(tmp_path / "state.json")
+    store = bot.StateStore(path)
+    store.set("seen_stories", [1, 2])
+    store.set("technical_series_day", 4)
+    store.flush()
+    store.delete("seen_stories")
+    store.flush()
+    restored = bot.StateStore(path)
+    assert restored.get("seen_stories") is None and restored.get("technical_series_day") == 4
+
+
+def test_series_progress_survives_a_restart():
+    bot.LearningSeries.get_todays_lesson()
+    bot.TechnicalAnalysisSeries.advance(bot.TechnicalAnalysisSeries.current_day())
+    bot.StateStore.default().flush()
+    bot.StateStore._default = None
+    assert bot.LearningSeries.current_day() == 2
+    assert bot.TechnicalAnalysisSeries.current_day() == 2
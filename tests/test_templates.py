@@ -0,0 +1,107 @@
+"""
+Post templates: escaping, Telegram's length limit, tag balancing and compile/render errors
+"""
+
+import pytest
+
+import bot
+
+
+def render(source, context):
+    return bot.Template("test", source).render(context)
+
+
+def test_interpolated_values_are_escaped():
+    text = render("<b>{{ title }}</b> via {{ source }}", {"title": "<script>alert(1)</script> & <b>", "source": "A&B"})
+    assert text == "<b>&lt;script&gt;alert(1)&lt;/script&gt; &amp; &lt;b&gt;</b> via A&amp;B"
+    assert bot.TelegramHTML.errors(text) == []
+
+
+def test_raw_filter_skips_escaping():
+    assert render("{{ link | raw }}", {"link": '<a href="https://x.io">x</a>'}) == '<a href="https://x.io">x</a>'
+
+
+def test_filters_and_loops():
+    source = "{% for coin in coins %}\n{{ coin.symbol | upper }} {{ coin.price | money }} {{ coin.change | pct }}\n{% endfor %}\n"
+    text = render(source, {"coins": [{"symbol": "btc", "price": 65123.4, "change": 1.23},
+                                     {"symbol": "eth", "price": 3456.7, "change": -0.45}]})
+    assert text == "BTC $65,123 +1.2%\nETH $3,457 -0.5%\n"
+
+
+def test_hostile_headline_renders_a_valid_post():
+    text = bot.Templates.render("global_news", {
+        "headline": {"title": "<script>alert(1)</script> & <b>unclosed", "source": "A&B"},
+        "etf": {"update": "x" * 5000, "source": "y"}})
+    assert "<script>" not in text
+    assert bot.TelegramHTML.errors(text) == []
+
+
+def test_length_counts_visible_utf16_units():
+    assert bot.TelegramHTML.visible_length("<b>a&amp;b</b>") == 3
+    assert bot.TelegramHTML.visible_length("🚀") == 2
+
+
+def test_long_post_is_cut_at_a_line_under_the_limit():
+    lesson = {"day": 1, "title": "LONG", "points": ["point " * 40] * 60, "tip": "t"}
+    text = bot.Templates.render("learning_series", {"lesson": lesson})
+    assert bot.TelegramHTML.visible_length(text) <= bot.TelegramHTML.MAX_LENGTH
+    assert text.endswith("\n…")
+    assert bot.TelegramHTML.errors(text) == []
+
+
+def test_text_at_the_limit_is_left_alone():
+    text = "x" * bot.TelegramHTML.MAX_LENGTH
+    assert bot.TelegramHTML.fit(text) == text
+    assert bot.TelegramHTML.errors(text) == []
+    assert bot.TelegramHTML.errors(text + "x") == [f"longer than {bot.TelegramHTML.MAX_LENGTH} characters"]
+
+
+@pytest.mark.parametrize("text, problem", [
+    ("<b>bold", "unclosed <b>"),
+    ("<b><i>x</b></i>", "unbalanced </b>"),
+    ("x</i>", "unbalanced </i>"),
+    ("<div>x</div>", "unsupported tag <div>"),
+    ("1 < 2", "unescaped '<' at 2"),
+    ("A & B", "unescaped '&' at 2"),
+])
+def test_unbalanced_or_unsupported_markup_is_reported(text, problem):
+    assert problem in bot.TelegramHTML.errors(text)
+
+
+def test_balanced_nested_tags_pass():
+    assert bot.TelegramHTML.errors('<b>a <i>b</i></b> <a href="https://x.io">c</a> &lt; &#128640;') == []
+
+
+def test_unbalanced_template_markup_is_rejected_at_render():
+    with pytest.raises(bot.TemplateError, match="unclosed <b>"):
+        render("<b>{{ x }}", {"x": 1})
+
+
+@pytest.mark.parametrize("source, message", [
+    ("{{ x | nope }}", "unknown filter 'nope'"),
+    ("{% for a in b %}", "unclosed {% for %}"),
+    ("{% endif %}", "bad tag"),
+    ("{{ x.__class__ + 1 }}", "bad expression"),
+])
+def test_bad_template_source_raises(source, message):
+    with pytest.raises(bot.TemplateError, match=message.replace("{", r"\{").replace("}", r"\}")):
+        bot.Template("bad", source)
+
+
+def test_missing_or_mistyped_field_raises():
+    template = bot.Template("typed", "{{ price | money }}", {"price": float})
+    with pytest.raises(bot.TemplateError, match="missing field 'price'"):
+        template.render({})
+    with pytest.raises(bot.TemplateError, match="'price' is str"):
+        template.render({"price": "65000"})
+
+
+def test_unknown_locale_falls_back_to_english():
+    ctx = {"coins": [], "trend": "", "sentiment": {"value": 50, "sentiment": "Neutral"},
+           "key_level": "$65K area", "footer": "Live data"}
+    batch = bot.Templates.render_batch("market_open", ctx, ["en", "ta"])
+    assert batch["ta"] == batch["en"]
+
+
+def test_every_post_template_compiles():
+    assert bot.Templates.compile_all() == sum(len(sources) for sources in bot.PostTemplates.SOURCES.values())